@@ -0,0 +1,317 @@
+"""Content addressed cache of render outputs shared between builds.
+
+Docker builds start without a build directory, so the build manifest (see
+:mod:`acederbergio.api.manifest`) cannot skip anything. Instead, the outputs
+of each render are archived under a key derived from the manifest digest of
+the target (its source and resolved dependencies) and the toolchain (see
+:func:`find_toolchain`). Before rendering, outputs with a matching key are
+restored into the build directory. After a successful render, they are
+uploaded.
+
+Outputs shared by every page (see :func:`find_shared`) are archived once per
+build under a key derived from the toolchain alone. ``quarto`` updates these
+(e.g. ``search.json``) when rendering part of a project, so restoring them
+before rendering keeps the entries of restored pages and provides
+``site_libs`` when every page is restored and nothing renders.
+
+Archives are stored either in a local directory (:class:`LocalStore`) or in an
+``S3`` compatible bucket (:class:`BucketStore`) using ``s3cmd``, see
+:func:`create_store`.
+"""
+
+import abc
+import hashlib
+import importlib.metadata
+import os
+import pathlib
+import platform
+import subprocess
+import tarfile
+import tempfile
+from typing import Iterable
+
+from acederbergio import env
+from acederbergio.api import manifest
+
+logger = env.create_logger(__name__)
+
+SUFFIX = ".tar.gz"
+PACKAGES = ("acederbergio",)
+SHARED = ("site_libs", "search.json", "sitemap.xml", "listings.json")
+KEY_SHARED = "shared"
+
+
+def find_toolchain() -> list[str]:
+    """Versions of the tools that affect the output of renders."""
+
+    out = [f"python={platform.python_version()}"]
+    try:
+        process = subprocess.run(
+            ["quarto", "--version"], capture_output=True, text=True, check=True
+        )
+        out.append(f"quarto={process.stdout.strip()}")
+    except (OSError, subprocess.CalledProcessError):
+        logger.warning("Could not determine the version of `quarto`.")
+        out.append("quarto=missing")
+
+    for name in PACKAGES:
+        try:
+            out.append(f"{name}={importlib.metadata.version(name)}")
+        except importlib.metadata.PackageNotFoundError:
+            out.append(f"{name}=missing")
+
+    return out
+
+
+def find_outputs(target: pathlib.Path) -> list[pathlib.Path]:
+    """Find the outputs of :param:`target` relative to ``env.BUILD``.
+
+    This is the output found by :func:`manifest.find_output` along with the
+    ``<name>_files`` directory of figures and the ``<name>.xml`` feed of
+    listings next to it, when there are any.
+    """
+
+    if (output := manifest.find_output(target)) is None:
+        return list()
+
+    out = [output.relative_to(env.BUILD)]
+    if (files := output.with_name(f"{output.stem}_files")).is_dir():
+        out.append(files.relative_to(env.BUILD))
+
+    if output.suffix == ".html" and (feed := output.with_suffix(".xml")).is_file():
+        out.append(feed.relative_to(env.BUILD))
+
+    return out
+
+
+def find_shared() -> list[pathlib.Path]:
+    """Find the outputs shared by every page relative to ``env.BUILD``, see
+    :data:`SHARED`."""
+
+    return [pathlib.Path(name) for name in SHARED if (env.BUILD / name).exists()]
+
+
+def pack(paths: Iterable[pathlib.Path], file: pathlib.Path) -> None:
+    """Archive :param:`paths`, relative to ``env.BUILD``, into :param:`file`."""
+
+    with tarfile.open(file, "w:gz") as archive:
+        for path in paths:
+            archive.add(env.BUILD / path, arcname=str(path))
+
+
+def unpack(file: pathlib.Path) -> None:
+    """Extract an archive from :func:`pack` into ``env.BUILD``."""
+
+    # NOTE: The ``data`` filter refuses absolute paths and links out of the
+    #       build directory, archives may come from a shared bucket.
+    with tarfile.open(file, "r:gz") as archive:
+        archive.extractall(env.BUILD, filter="data")
+
+
+class Store(abc.ABC):
+    """Where archives are kept. Methods raise ``OSError`` on failure."""
+
+    @abc.abstractmethod
+    def get(self, key: str, file: pathlib.Path) -> bool:
+        """Download the archive for :param:`key` into :param:`file`.
+
+        :returns: If there is an archive for :param:`key`.
+        """
+
+    @abc.abstractmethod
+    def put(self, key: str, file: pathlib.Path) -> None:
+        """Upload :param:`file` as the archive for :param:`key`."""
+
+
+class LocalStore(Store):
+    """Keep archives in a directory, e.g. one mounted as a build cache.
+
+    :ivar directory: Where archives are kept.
+    """
+
+    directory: pathlib.Path
+
+    def __init__(self, directory: pathlib.Path):
+        self.directory = directory
+
+    def path(self, key: str) -> pathlib.Path:
+        return self.directory / key[:2] / f"{key}{SUFFIX}"
+
+    def get(self, key: str, file: pathlib.Path) -> bool:
+        path = self.path(key)
+        if not os.path.isfile(path):
+            return False
+
+        file.write_bytes(path.read_bytes())
+        return True
+
+    def put(self, key: str, file: pathlib.Path) -> None:
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # NOTE: Write and rename so that concurrent builds never read a
+        #       partial archive.
+        path_tmp = path.with_name(f".{path.name}.{os.getpid()}")
+        path_tmp.write_bytes(file.read_bytes())
+        os.replace(path_tmp, path)
+
+
+class BucketStore(Store):
+    """Keep archives in an ``S3`` compatible bucket using ``s3cmd``, which
+    must be configured (e.g. ``~/.s3cfg``) with access to the bucket.
+
+    :ivar url: Bucket and prefix, e.g. ``s3://bucket/artifacts``.
+    """
+
+    url: str
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+
+    def object_url(self, key: str) -> str:
+        return f"{self.url}/{key}{SUFFIX}"
+
+    def s3cmd(self, *args: str) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            ["s3cmd", "--no-progress", *args], capture_output=True, text=True
+        )
+
+    def get(self, key: str, file: pathlib.Path) -> bool:
+        # NOTE: ``s3cmd`` cannot tell a missing object from other failures by
+        #       exit code alone, any failure to download is a miss.
+        process = self.s3cmd("get", "--force", self.object_url(key), str(file))
+        if process.returncode:
+            logger.debug("No artifact `%s`: %s", key, process.stderr.strip())
+            return False
+
+        return True
+
+    def put(self, key: str, file: pathlib.Path) -> None:
+        process = self.s3cmd("put", str(file), self.object_url(key))
+        if process.returncode:
+            raise OSError(f"Failed to upload `{key}`: {process.stderr.strip()}")
+
+
+def create_store(url: str) -> Store:
+    """Create a store from a directory or an ``s3://`` url."""
+
+    if url.startswith("s3://"):
+        return BucketStore(url)
+
+    return LocalStore(pathlib.Path(url.removeprefix("file://")).resolve())
+
+
+class Artifacts:
+    """Restore and upload the outputs of renders.
+
+    Failures to reach :ivar:`store` are logged and treated as misses, so that
+    the cache can only make a build faster.
+
+    :ivar store: Where archives are kept.
+    :ivar toolchain: Included in keys, see :func:`find_toolchain`.
+    """
+
+    store: Store
+    toolchain: list[str]
+
+    def __init__(self, store: Store, *, toolchain: list[str] | None = None):
+        self.store = store
+        self.toolchain = toolchain if toolchain is not None else find_toolchain()
+
+    def key(self, digest: str) -> str:
+        """Key of the outputs of a target with manifest digest :param:`digest`."""
+
+        hasher = hashlib.sha256(f"{digest}\n".encode())
+        for item in self.toolchain:
+            hasher.update(f"{item}\n".encode())
+
+        return hasher.hexdigest()
+
+    def get(self, key: str, name: str) -> bool:
+        """Download and unpack the archive for :param:`key`.
+
+        :param name: What is restored, for logs.
+        :returns: If there was an archive and it was unpacked.
+        """
+
+        with tempfile.TemporaryDirectory() as directory:
+            file = pathlib.Path(directory) / f"{key}{SUFFIX}"
+            try:
+                if not self.store.get(key, file):
+                    return False
+
+                unpack(file)
+            except (OSError, tarfile.TarError) as err:
+                logger.warning("Failed to restore `%s`: %s", name, err)
+                return False
+
+        return True
+
+    def put(self, key: str, paths: list[pathlib.Path], name: str) -> bool:
+        """Pack :param:`paths` and upload them as the archive for :param:`key`.
+
+        :param name: What is uploaded, for logs.
+        :returns: If the archive was uploaded.
+        """
+
+        with tempfile.TemporaryDirectory() as directory:
+            file = pathlib.Path(directory) / f"{key}{SUFFIX}"
+            try:
+                pack(paths, file)
+                self.store.put(key, file)
+            except OSError as err:
+                logger.warning("Failed to upload `%s`: %s", name, err)
+                return False
+
+        logger.debug("Uploaded `%s` as `%s`.", name, key)
+        return True
+
+    def restore(self, target: pathlib.Path, digest: str) -> bool:
+        """Restore the outputs of :param:`target` into ``env.BUILD``.
+
+        :returns: If the outputs were restored.
+        """
+
+        key = self.key(digest)
+        if not self.get(key, str(target)) or manifest.find_output(target) is None:
+            return False
+
+        logger.info("Restored `%s` from `%s`.", target, key)
+        return True
+
+    def upload(self, target: pathlib.Path, digest: str) -> bool:
+        """Upload the outputs of :param:`target` after a successful render.
+
+        :returns: If anything was uploaded.
+        """
+
+        if not (outputs := find_outputs(target)):
+            return False
+
+        return self.put(self.key(digest), outputs, str(target))
+
+    def restore_shared(self) -> bool:
+        """Restore the outputs shared by every page into ``env.BUILD``, see
+        :func:`find_shared`.
+
+        :returns: If the outputs were restored.
+        """
+
+        key = self.key(KEY_SHARED)
+        if not self.get(key, "shared outputs"):
+            return False
+
+        logger.info("Restored shared outputs from `%s`.", key)
+        return True
+
+    def upload_shared(self) -> bool:
+        """Upload the outputs shared by every page, replacing those of previous
+        builds. This should only happen after a complete build.
+
+        :returns: If anything was uploaded.
+        """
+
+        if not (outputs := find_shared()):
+            return False
+
+        return self.put(self.key(KEY_SHARED), outputs, "shared outputs")
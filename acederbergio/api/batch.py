@@ -0,0 +1,146 @@
+"""Attribution of output from ``quarto render`` with many inputs.
+
+``quarto render a.qmd b.qmd ...`` renders its inputs in order within a single
+process, which saves the fixed cost of starting ``quarto`` (``deno``, parsing
+the project configuration, etc.) for every document. It stops at the first
+input that fails. Every input rendered successfully reports its output with
+an ``Output created: ...`` line, which is used here to split output between
+targets and determine which targets succeeded.
+
+:seealso: :meth:`acederbergio.api.quarto.Handler.render_batch`.
+"""
+
+import os
+import pathlib
+import re
+from typing import Literal
+
+from acederbergio import env
+
+PATTERN_OUTPUT = re.compile(r"^\s*Output created:\s*(?P<path>\S.*?)\s*$")
+PROJECT_NAMES = ("_quarto.yaml", "_quarto.yml")
+
+
+def find_project(path: pathlib.Path) -> pathlib.Path | None:
+    """Find the quarto project directory containing :param:`path`."""
+
+    for directory in path.parents:
+        if any(os.path.isfile(directory / name) for name in PROJECT_NAMES):
+            return directory
+
+        if directory == env.WORKDIR:
+            break
+
+    return None
+
+
+def strip_suffix(path: pathlib.Path) -> tuple[str, ...]:
+    return path.with_suffix("").parts
+
+
+class Batch:
+    """Split the output of a single ``quarto render`` between its targets.
+
+    Lines are attributed to the target currently rendering. A target is
+    finished once its output is reported, after which the next unfinished
+    target is current.
+
+    :ivar targets: Render targets in the order passed to ``quarto render``.
+    :ivar project: Directory of the project containing :ivar:`targets`.
+    :ivar stdout: Lines of ``stdout`` for each target.
+    :ivar stderr: Lines of ``stderr`` for each target.
+    :ivar finished: Targets that reported their output.
+    """
+
+    targets: list[pathlib.Path]
+    project: pathlib.Path | None
+    stdout: dict[pathlib.Path, list[str]]
+    stderr: dict[pathlib.Path, list[str]]
+    finished: set[pathlib.Path]
+
+    def __init__(
+        self,
+        targets: list[pathlib.Path],
+        project: pathlib.Path | None = None,
+    ):
+        if not targets:
+            raise ValueError("Batch requires at least one target.")
+
+        self.targets = list(targets)
+        self.project = project
+        self.stdout = {target: list() for target in targets}
+        self.stderr = {target: list() for target in targets}
+        self.finished = set()
+
+    @property
+    def current(self) -> pathlib.Path:
+        """The target being rendered. Once every target is finished, this is
+        the last target so that trailing output is not lost."""
+
+        return next(
+            (item for item in self.targets if item not in self.finished),
+            self.targets[-1],
+        )
+
+    def match_output(self, output: str) -> pathlib.Path | None:
+        """Find the unfinished target that produced :param:`output`.
+
+        Output is typically in the projects output directory, e.g.
+        ``build/posts/foo/index.html`` for ``posts/foo/index.qmd``, so
+        targets are matched on the trailing parts of the path.
+        """
+
+        parts = strip_suffix(pathlib.Path(output))
+        for target in self.targets:
+            if target in self.finished:
+                continue
+
+            relpath = target
+            if self.project is not None and target.is_relative_to(self.project):
+                relpath = target.relative_to(self.project)
+
+            target_parts = strip_suffix(relpath)
+            if parts[-len(target_parts) :] == target_parts:
+                return target
+
+        return None
+
+    def feed(self, stream: Literal["stdout", "stderr"], line: str) -> pathlib.Path:
+        """Attribute :param:`line` to a target.
+
+        :returns: The target the line was attributed to.
+        """
+
+        target = self.current
+        if (match := PATTERN_OUTPUT.match(line)) is not None:
+            # NOTE: If the output cannot be matched, assume that it belongs to
+            #       the current target since inputs are rendered in order.
+            target = self.match_output(match.group("path")) or target
+            self.finished.add(target)
+
+        (self.stdout if stream == "stdout" else self.stderr)[target].append(line)
+        return target
+
+    def status_codes(
+        self, returncode: int
+    ) -> tuple[dict[pathlib.Path, int], list[pathlib.Path]]:
+        """Determine the exit status of each target once the process exits.
+
+        :param returncode: Exit code of ``quarto render``.
+        :returns: Exit codes of targets that were attempted, and targets
+            that were not attempted since ``quarto`` stopped at a failure.
+        """
+
+        if not returncode:
+            return {target: 0 for target in self.targets}, []
+
+        out = {target: 0 for target in self.targets if target in self.finished}
+        unfinished = [target for target in self.targets if target not in out]
+        if not unfinished:
+            # NOTE: Failed after reporting every output, e.g. in post render.
+            out[self.targets[-1]] = returncode
+            return out, []
+
+        failed, *remaining = unfinished
+        out[failed] = returncode
+        return out, remaining
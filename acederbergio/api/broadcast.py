@@ -0,0 +1,105 @@
+"""In process publish and subscribe.
+
+Websockets used to poll ``mongodb`` for new renders and log records, once per
+second for every open socket. Instead, each app has a single
+:class:`Broadcaster` for each kind of message, fed directly by whatever
+produces the messages (e.g. ``quarto.Handler`` for renders or
+``App.watch_logs`` for log records). Each websocket subscribes with its own
+bounded queue.
+
+Renders by other processes (e.g. ``acederbergio quarto render``) only reach
+``mongodb``, so the app also follows ``mongodb`` into the same broadcaster
+(see ``schemas.BaseLog.follow``). Messages can then arrive more than once, so
+websockets skip those they have :class:`Seen`.
+"""
+
+import asyncio
+import contextlib
+from typing import Generic, Hashable, Iterator, TypeVar
+
+from acederbergio import env
+
+logger = env.create_logger(__name__)
+
+T = TypeVar("T")
+
+
+class Broadcaster(Generic[T]):
+    """Fan out messages to subscribers such as websocket clients.
+
+    Use :meth:`publish` as a callback of the producer. Each subscriber gets
+    its own bounded queue. When a subscriber falls behind, its oldest
+    messages are dropped, so that it never holds up the producer or other
+    subscribers.
+
+    :ivar subscribers: Queues of current subscribers.
+    :ivar maxsize: Size of subscriber queues.
+    """
+
+    subscribers: set[asyncio.Queue[T]]
+    maxsize: int
+
+    def __init__(self, *, maxsize: int = 1024):
+        self.subscribers = set()
+        self.maxsize = maxsize
+
+    def publish(self, message: T) -> None:
+        for queue in self.subscribers:
+            if queue.full():
+                logger.debug("Dropping oldest message for slow subscriber.")
+                queue.get_nowait()
+
+            queue.put_nowait(message)
+
+    @contextlib.contextmanager
+    def subscribe(self) -> Iterator[asyncio.Queue[T]]:
+        queue: asyncio.Queue[T] = asyncio.Queue(maxsize=self.maxsize)
+        self.subscribers.add(queue)
+        try:
+            yield queue
+        finally:
+            self.subscribers.discard(queue)
+
+
+async def drain(queue: asyncio.Queue[T], count: int) -> list[T]:
+    """Wait for a message from :param:`queue`, then take any others that are
+    already waiting, up to :param:`count` in total."""
+
+    out = [await queue.get()]
+    while len(out) < count and not queue.empty():
+        out.append(queue.get_nowait())
+
+    return out
+
+
+class Seen:
+    """Remember the last :ivar:`size` keys, e.g. to skip messages that were
+    already sent.
+
+    :ivar keys: Keys in the order they were added, most recent last.
+    :ivar size: How many keys to remember.
+    """
+
+    keys: dict[Hashable, None]
+    size: int
+
+    def __init__(self, *, size: int = 4096):
+        self.keys = dict()
+        self.size = size
+
+    def add(self, key: Hashable | None) -> bool:
+        """Remember :param:`key`.
+
+        :returns: If :param:`key` is new. ``None`` is always new.
+        """
+
+        if key is None:
+            return True
+        elif key in self.keys:
+            return False
+
+        self.keys[key] = None
+        if len(self.keys) > self.size:
+            del self.keys[next(iter(self.keys))]
+
+        return True
@@ -0,0 +1,198 @@
+"""Execution cache of notebook documents.
+
+The project enables ``execute: cache`` (see ``blog/_quarto.yaml``), so
+``quarto`` stores the executed code cells of documents with ``python`` cells
+using ``jupyter-cache`` in a ``.jupyter_cache`` directory next to them. Entries
+are keyed by a hash of every code cell of a document, so that outputs are only
+reused along with the cells they depend on. They are reused by both the
+development server and ``acederbergio quarto build``, since the directories
+are part of the docker build context.
+
+Outputs are reused for whole documents only. Changing any code cell executes
+every cell of the document again, even those before the change. Reusing the
+outputs of unchanged leading cells would mean executing documents outside of
+the ``jupyter`` engine of ``quarto``, which is out of scope here. Changes to
+prose alone do not change the key.
+
+These caches grow with every change to the code of a document, so this module
+evicts least recently used entries across every cache once their total size
+exceeds a cap (see :func:`prune`, ``acederbergio quarto cache prune``).
+
+``jupyter-cache`` is only imported when caches are read, since it brings in
+``sqlalchemy``.
+"""
+
+import datetime
+import os
+import pathlib
+from typing import Annotated, Callable, Iterable
+
+import pydantic
+
+from acederbergio import env
+
+logger = env.create_logger(__name__)
+
+NAME = ".jupyter_cache"
+UNITS = {"": 1, "K": 2**10, "M": 2**20, "G": 2**30}
+
+
+def parse_size(v: str | int) -> int:
+    """Parse sizes like ``512M`` or ``2G`` into bytes."""
+
+    if isinstance(v, int):
+        return v
+
+    raw = v.strip().upper().removesuffix("B")
+    unit = raw[-1] if raw and raw[-1] in UNITS else ""
+    try:
+        return int(float(raw.removesuffix(unit)) * UNITS[unit])
+    except ValueError:
+        raise ValueError(f"Invalid size `{v}`.")
+
+
+def format_size(size: int) -> str:
+    for unit in ("G", "M", "K"):
+        if size >= UNITS[unit]:
+            return f"{size / UNITS[unit]:.1f}{unit}"
+
+    return f"{size}B"
+
+
+def size_of(path: pathlib.Path) -> int:
+    """Total size of the files in :param:`path`."""
+
+    out = 0
+    for directory, _, files in os.walk(path):
+        for name in files:
+            try:
+                out += os.stat(os.path.join(directory, name)).st_size
+            except OSError:
+                continue
+
+    return out
+
+
+def find_caches(
+    root: pathlib.Path = env.BLOG,
+    *,
+    is_ignored: Callable[[pathlib.Path], bool] | None = None,
+) -> list[pathlib.Path]:
+    """Find the ``.jupyter_cache`` directories in :param:`root`."""
+
+    out = list()
+    for directory, directories, _ in os.walk(root):
+        base = pathlib.Path(directory)
+        if NAME in directories:
+            out.append(base / NAME)
+
+        directories[:] = [
+            item
+            for item in directories
+            if item != NAME and (is_ignored is None or not is_ignored(base / item))
+        ]
+
+    return sorted(out)
+
+
+class CacheEntry(pydantic.BaseModel):
+    """An executed notebook in a cache.
+
+    :ivar cache: The ``.jupyter_cache`` directory containing the entry.
+    :ivar pk: Primary key of the entry in the cache.
+    :ivar uri: The document that was executed.
+    :ivar accessed: When the entry was last used.
+    :ivar size: Size of the executed notebook and its artifacts in bytes.
+    """
+
+    cache: Annotated[pathlib.Path, pydantic.Field()]
+    pk: Annotated[int, pydantic.Field()]
+    uri: Annotated[str, pydantic.Field()]
+    accessed: Annotated[datetime.datetime, pydantic.Field()]
+    size: Annotated[int, pydantic.Field()]
+
+
+def list_entries(caches: Iterable[pathlib.Path]) -> list[CacheEntry]:
+    """List the entries of :param:`caches`."""
+
+    if not (caches := list(caches)):
+        return list()
+
+    from jupyter_cache import get_cache
+
+    out = list()
+    for path in caches:
+        cache = get_cache(path)
+        for record in cache.list_cache_records():
+            entry = CacheEntry(
+                cache=path,
+                pk=record.pk,
+                uri=record.uri,
+                accessed=record.accessed,
+                size=size_of(path / "executed" / record.hashkey),
+            )
+            out.append(entry)
+
+    return out
+
+
+class CacheStats(pydantic.BaseModel):
+    """Entries and sizes of a cache, see :func:`stats`."""
+
+    cache: Annotated[pathlib.Path, pydantic.Field()]
+    entries: Annotated[int, pydantic.Field(0)]
+    size: Annotated[int, pydantic.Field(0)]
+    accessed: Annotated[
+        datetime.datetime | None,
+        pydantic.Field(None, description="When an entry was last used."),
+    ]
+
+
+def stats(entries: Iterable[CacheEntry]) -> list[CacheStats]:
+    out: dict[pathlib.Path, CacheStats] = dict()
+    for entry in entries:
+        item = out.setdefault(entry.cache, CacheStats(cache=entry.cache))
+        item.entries += 1
+        item.size += entry.size
+        if item.accessed is None or entry.accessed > item.accessed:
+            item.accessed = entry.accessed
+
+    return sorted(out.values(), key=lambda item: item.size, reverse=True)
+
+
+def prune(
+    entries: Iterable[CacheEntry],
+    *,
+    size_max: int,
+    dry_run: bool = False,
+) -> list[CacheEntry]:
+    """Remove least recently used entries until their total size is at most
+    :param:`size_max`.
+
+    :param entries: Entries of every cache, see :func:`list_entries`.
+    :param size_max: Maximum total size in bytes.
+    :param dry_run: Only determine which entries would be removed.
+    :returns: The entries removed.
+    """
+
+    entries = sorted(entries, key=lambda entry: entry.accessed)
+    size = sum(entry.size for entry in entries)
+
+    out = list()
+    for entry in entries:
+        if size <= size_max:
+            break
+
+        out.append(entry)
+        size -= entry.size
+
+    if dry_run or not out:
+        return out
+
+    from jupyter_cache import get_cache
+
+    for entry in out:
+        logger.info("Removing cache of `%s` from `%s`.", entry.uri, entry.cache)
+        get_cache(entry.cache).remove_cache(entry.pk)
+
+    return out
@@ -0,0 +1,80 @@
+"""Files changed in the repository since a git ref.
+
+Render requests with ``since`` (see ``QuartoRenderRequestItem``) only render
+the documents that changed since a ref, e.g. ``origin/main`` for the pages a
+pull request affects, along with the documents depending on changed files
+(see :meth:`acederbergio.api.quarto.Handler.find_targets`).
+
+Changes are taken from the merge base of the ref and ``HEAD`` to the working
+tree, so that changes on the ref itself are not included while uncommitted
+and untracked files are.
+"""
+
+import pathlib
+
+import git
+
+from acederbergio import env
+
+logger = env.create_logger(__name__)
+
+
+def find_repo(root: pathlib.Path) -> git.Repo:
+    """Find the repository containing :param:`root`.
+
+    :throws ValueError: When :param:`root` is not within a repository, e.g.
+        in docker builds where ``.git`` is not copied.
+    """
+
+    try:
+        return git.Repo(root, search_parent_directories=True)
+    except (git.InvalidGitRepositoryError, git.NoSuchPathError) as err:
+        raise ValueError(f"`{root}` is not within a git repository.") from err
+
+
+def find_base(repo: git.Repo, since: str) -> git.Commit:
+    """Find the merge base of :param:`since` and ``HEAD``.
+
+    :throws ValueError: When :param:`since` is not a ref of the repository or
+        shares no history with ``HEAD``.
+    """
+
+    try:
+        bases = repo.merge_base(since, "HEAD")
+    except git.GitCommandError as err:
+        raise ValueError(f"Invalid git ref `{since}`.") from err
+
+    if not bases or not isinstance(base := bases[0], git.Commit):
+        raise ValueError(f"`{since}` shares no history with `HEAD`.")
+
+    return base
+
+
+def validate_since(since: str, *, root: pathlib.Path = env.WORKDIR) -> str:
+    """Check that changes can be found since :param:`since`, see
+    :func:`find_base`."""
+
+    find_base(find_repo(root), since)
+    return since
+
+
+def find_changed(since: str, *, root: pathlib.Path = env.WORKDIR) -> list[pathlib.Path]:
+    """Find the files changed since :param:`since`.
+
+    :param since: Any git ref, e.g. a branch, tag, or commit.
+    :param root: Directory within the repository.
+    :throws ValueError: See :func:`find_repo` and :func:`find_base`.
+    :returns: Absolute paths of changed files, including deleted files.
+    """
+
+    repo = find_repo(root)
+    worktree = pathlib.Path(repo.working_tree_dir or root)
+
+    out: set[pathlib.Path] = set()
+    for diff in find_base(repo, since).diff(None):
+        out.update(worktree / path for path in (diff.a_path, diff.b_path) if path)
+
+    out.update(worktree / path for path in repo.untracked_files)
+    logger.debug("Found `%s` files changed since `%s`.", len(out), since)
+
+    return sorted(out)
@@ -0,0 +1,433 @@
+"""Reverse dependency index for quarto documents.
+
+Not to be confused with :mod:`acederbergio.api.depends`, which contains
+``fastapi`` dependencies.
+
+Maps every ``qmd`` document in the project to the files its render depends on
+(``{{< include >}}`` partials, ``filters``, themes, templates and the
+``_quarto.yaml``/``_metadata.yml`` cascade) and keeps the inverse mapping, so
+that a change to any of these files can be dispatched to exactly the documents
+that it affects.
+
+:seealso: :meth:`acederbergio.api.quarto.Handler.do_defered`.
+"""
+
+import os
+import pathlib
+import re
+from typing import Annotated, Any, Callable, Iterable
+
+import yaml
+from typing_extensions import Doc
+
+from acederbergio import env
+
+logger = env.create_logger(__name__)
+
+CONFIG_NAMES: Annotated[
+    set[str],
+    Doc("Names of quarto configuration files that cascade into documents."),
+] = {"_quarto.yaml", "_quarto.yml", "_metadata.yml", "_metadata.yaml"}
+PATTERN_INCLUDE = re.compile(r"{{<\s*include\s+[\"']?(?P<path>[^\s\"'>]+)[\"']?\s*>}}")
+PATTERN_IMPORT = re.compile(
+    r"^\s*(?:from\s+acederbergio\.filters(?:\.(?P<module>\w+))?\s+import\s+"
+    r"(?:\((?P<names_wrapped>[\w\s,]+)\)|(?P<names>[\w \t,]+))"
+    r"|import\s+acederbergio\.filters\.(?P<imported>\w+))",
+    re.MULTILINE,
+)
+
+# NOTE: Metadata keys containing paths to files. ``include-*`` values may also
+#       be mappings with a ``file`` key.
+KEYS_FILES = {
+    "filters",
+    "theme",
+    "css",
+    "template",
+    "template-partials",
+    "include-in-header",
+    "include-before-body",
+    "include-after-body",
+    "metadata-files",
+}
+
+
+def normalize(
+    path: pathlib.Path | str, base: pathlib.Path | None = None
+) -> pathlib.Path:
+    """Make ``path`` absolute without touching the filesystem."""
+
+    if base is not None:
+        path = os.path.join(base, path)
+
+    return pathlib.Path(os.path.normpath(os.path.abspath(path)))
+
+
+def is_partial(path: pathlib.Path) -> bool:
+    return path.name.startswith("_")
+
+
+def load_front_matter(path: pathlib.Path) -> dict[str, Any]:
+    """Load the ``yaml`` front matter of a ``qmd`` document."""
+
+    try:
+        with open(path, "r") as file:
+            content = file.read()
+    except OSError:
+        return dict()
+
+    if not content.startswith("---"):
+        return dict()
+
+    _, _, rest = content.partition("\n")
+    head, sep, _ = rest.partition("\n---")
+    if not sep:
+        return dict()
+
+    try:
+        data = yaml.safe_load(head)
+    except yaml.YAMLError:
+        logger.debug("Failed to parse front matter of `%s`.", path)
+        return dict()
+
+    return data if isinstance(data, dict) else dict()
+
+
+def load_config(path: pathlib.Path) -> dict[str, Any]:
+    """Load a quarto configuration file such as ``_metadata.yml``."""
+
+    try:
+        with open(path, "r") as file:
+            data = yaml.safe_load(file)
+    except (OSError, yaml.YAMLError):
+        logger.debug("Failed to load configuration `%s`.", path)
+        return dict()
+
+    return data if isinstance(data, dict) else dict()
+
+
+def iter_metadata_paths(value: Any) -> Iterable[str]:
+    """Find paths in the value of a key from :data:`KEYS_FILES`."""
+
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, list):
+        for item in value:
+            yield from iter_metadata_paths(item)
+    elif isinstance(value, dict):
+        # NOTE: ``{file: ...}`` for includes, ``{path: ...}`` for filters and
+        #       ``{light: ..., dark: ...}`` for themes.
+        for key in ("file", "path", "light", "dark"):
+            if key in value:
+                yield from iter_metadata_paths(value[key])
+
+
+def find_metadata_dependencies(
+    metadata: dict[str, Any], base: pathlib.Path
+) -> set[pathlib.Path]:
+    """Find files referenced by document or project metadata.
+
+    Values that do not look like paths, for instance the theme ``cosmo`` or
+    the extension filter ``iconify``, are skipped.
+
+    :param metadata: Front matter or configuration contents.
+    :param base: Directory that relative paths are relative to.
+    """
+
+    out: set[pathlib.Path] = set()
+    sections = [metadata]
+    if isinstance(formats := metadata.get("format"), dict):
+        sections.extend(item for item in formats.values() if isinstance(item, dict))
+
+    for section in sections:
+        for key in KEYS_FILES:
+            for item in iter_metadata_paths(section.get(key)):
+                if "/" not in item and "." not in item:
+                    continue
+
+                out.add(normalize(item, base))
+
+    return out
+
+
+def has_theme(metadata: dict[str, Any]) -> bool:
+    """Check if :param:`metadata` sets a theme, in which case documents below
+    it get stylesheets compiled for that theme."""
+
+    sections = [metadata]
+    if isinstance(formats := metadata.get("format"), dict):
+        sections.extend(item for item in formats.values() if isinstance(item, dict))
+
+    return any(section.get("theme") is not None for section in sections)
+
+
+class DependencyIndex:
+    """Index of ``qmd`` documents and their dependencies.
+
+    :ivar root: The quarto project directory.
+    :ivar scripts: Directory of the ``acederbergio`` package. Filters in the
+        project import their implementation from here.
+    :ivar dependencies: Mapping of documents to the files they depend on.
+    :ivar dependents: Mapping of files to the documents that depend on them.
+    """
+
+    root: pathlib.Path
+    scripts: pathlib.Path
+    dependencies: dict[pathlib.Path, set[pathlib.Path]]
+    dependents: dict[pathlib.Path, set[pathlib.Path]]
+
+    _is_ignored: Callable[[pathlib.Path], bool]
+    _cache_config: dict[pathlib.Path, set[pathlib.Path]]
+    _cache_module: dict[pathlib.Path, set[pathlib.Path]]
+
+    def __init__(
+        self,
+        root: pathlib.Path = env.BLOG,
+        *,
+        scripts: pathlib.Path = env.SCRIPTS,
+        is_ignored: Callable[[pathlib.Path], bool] | None = None,
+    ):
+        self.root = normalize(root)
+        self.scripts = normalize(scripts)
+        self.dependencies = dict()
+        self.dependents = dict()
+
+        self._is_ignored = is_ignored or (lambda _: False)
+        self._cache_config = dict()
+        self._cache_module = dict()
+
+    @classmethod
+    def fromDirectory(
+        cls,
+        root: pathlib.Path = env.BLOG,
+        **kwargs,
+    ):
+        index = cls(root, **kwargs)
+        for document in index.walk():
+            index.add(document)
+
+        logger.info(
+            "Indexed `%s` documents with `%s` dependencies.",
+            len(index.dependencies),
+            len(index.dependents),
+        )
+        return index
+
+    def walk(self) -> Iterable[pathlib.Path]:
+        """Find documents in :ivar:`root`, skipping ignored directories."""
+
+        for directory, directories, files in os.walk(self.root):
+            base = pathlib.Path(directory)
+            directories[:] = [
+                item
+                for item in directories
+                if not item.startswith(".") and not self._is_ignored(base / item)
+            ]
+            for item in files:
+                if (path := base / item).suffix == ".qmd" and self.is_document(path):
+                    yield path
+
+    def is_document(self, path: pathlib.Path) -> bool:
+        return (
+            path.suffix == ".qmd"
+            and not is_partial(path)
+            and path.is_relative_to(self.root)
+            and not self._is_ignored(path)
+        )
+
+    # ----------------------------------------------------------------------- #
+    # Dependency discovery.
+
+    def find_configs(self, document: pathlib.Path) -> list[pathlib.Path]:
+        """Find the project configuration and the ``_metadata.yml`` cascade."""
+
+        out = []
+        directory = document.parent
+        while directory.is_relative_to(self.root):
+            out.extend(
+                path
+                for name in CONFIG_NAMES
+                if os.path.isfile(path := directory / name)
+            )
+            if directory == self.root:
+                break
+
+            directory = directory.parent
+
+        return out
+
+    def find_theme(self, document: pathlib.Path) -> pathlib.Path | None:
+        """Find where the theme of :param:`document` is set, either in its
+        front matter or the nearest configuration in its cascade.
+
+        Documents with themes set in different places link different compiled
+        stylesheets.
+        """
+
+        document = normalize(document)
+        if has_theme(load_front_matter(document)):
+            return document
+
+        for config in self.find_configs(document):
+            if has_theme(load_config(config)):
+                return config
+
+        return None
+
+    def find_config_dependencies(self, config: pathlib.Path) -> set[pathlib.Path]:
+        if (cached := self._cache_config.get(config)) is not None:
+            return cached
+
+        out = find_metadata_dependencies(load_config(config), config.parent)
+        self._cache_config[config] = out
+        return out
+
+    def find_includes(
+        self, path: pathlib.Path, seen: set[pathlib.Path]
+    ) -> set[pathlib.Path]:
+        """Recursively find ``{{< include >}}`` shortcodes."""
+
+        try:
+            with open(path, "r") as file:
+                content = file.read()
+        except (OSError, UnicodeDecodeError):
+            return seen
+
+        for match in PATTERN_INCLUDE.finditer(content):
+            raw = match.group("path")
+            if raw.startswith("/"):
+                include = normalize(raw.lstrip("/"), self.root)
+            else:
+                include = normalize(raw, path.parent)
+
+            if include in seen:
+                continue
+
+            seen.add(include)
+            self.find_includes(include, seen)
+
+        return seen
+
+    def find_modules(self, path: pathlib.Path) -> set[pathlib.Path]:
+        """Find the modules of ``acederbergio.filters`` a filter imports.
+
+        This is done recursively, since most filters import ``util``.
+        """
+
+        if (cached := self._cache_module.get(path)) is not None:
+            return cached
+
+        # NOTE: Add before recursing to break import cycles.
+        out: set[pathlib.Path] = set()
+        self._cache_module[path] = out
+
+        try:
+            with open(path, "r") as file:
+                content = file.read()
+        except (OSError, UnicodeDecodeError):
+            return out
+
+        for match in PATTERN_IMPORT.finditer(content):
+            if (name := match.group("imported") or match.group("module")) is not None:
+                names = [name]
+            else:
+                names_raw = match.group("names_wrapped") or match.group("names")
+                names = [item.strip() for item in names_raw.split(",")]
+
+            for name in names:
+                for module in (
+                    self.scripts / "filters" / f"{name}.py",
+                    self.scripts / "filters" / name / "__init__.py",
+                ):
+                    if module == path or not os.path.isfile(module):
+                        continue
+
+                    out.add(module)
+                    out |= self.find_modules(module)
+
+        return out
+
+    def find_dependencies(self, document: pathlib.Path) -> set[pathlib.Path]:
+        """Find all of the dependencies of :param:`document`."""
+
+        out: set[pathlib.Path] = set()
+        for config in self.find_configs(document):
+            out.add(config)
+            out |= self.find_config_dependencies(config)
+
+        out |= find_metadata_dependencies(load_front_matter(document), document.parent)
+        out |= self.find_includes(document, set())
+
+        for path in tuple(out):
+            if path.suffix == ".py":
+                out |= self.find_modules(path)
+
+        out.discard(document)
+        return out
+
+    # ----------------------------------------------------------------------- #
+    # Index maintenance.
+
+    def add(self, document: pathlib.Path) -> set[pathlib.Path]:
+        """Add or reindex a document."""
+
+        document = normalize(document)
+        self.remove(document)
+
+        dependencies = self.find_dependencies(document)
+        self.dependencies[document] = dependencies
+        for path in dependencies:
+            self.dependents.setdefault(path, set()).add(document)
+
+        return dependencies
+
+    def remove(self, document: pathlib.Path) -> None:
+        document = normalize(document)
+        for path in self.dependencies.pop(document, set()):
+            if (documents := self.dependents.get(path)) is None:
+                continue
+
+            documents.discard(document)
+            if not documents:
+                self.dependents.pop(path)
+
+    def update(self, path: pathlib.Path | str) -> set[pathlib.Path]:
+        """Update the index after :param:`path` was written to.
+
+        :returns: The documents that were reindexed.
+        """
+
+        path = normalize(path)
+        self._cache_config.pop(path, None)
+        if path.suffix == ".py":
+            # NOTE: Modules importing this module must also be recomputed.
+            self._cache_module.clear()
+
+        documents = set(self.dependents.get(path, set()))
+        if path.name in CONFIG_NAMES:
+            documents |= {
+                item for item in self.dependencies if item.is_relative_to(path.parent)
+            }
+        if self.is_document(path) or path in self.dependencies:
+            documents.add(path)
+
+        for document in documents:
+            if os.path.isfile(document):
+                self.add(document)
+            else:
+                self.remove(document)
+
+        return documents
+
+    def get_dependents(self, path: pathlib.Path | str) -> set[pathlib.Path]:
+        """Get the documents that need to be rendered when ``path`` changes."""
+
+        return set(self.dependents.get(normalize(path), set()))
+
+    def has_dependents(self, path: pathlib.Path | str) -> bool:
+        return normalize(path) in self.dependents
+
+    def dict(self):
+        return {
+            str(document): sorted(str(item) for item in dependencies)
+            for document, dependencies in self.dependencies.items()
+        }
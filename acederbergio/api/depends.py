@@ -5,7 +5,7 @@ import fastapi
 import motor.motor_asyncio
 
 from acederbergio import db
-from acederbergio.api import quarto, schemas
+from acederbergio.api import broadcast, quarto, schemas
 
 
 def db_config() -> db.Config:
@@ -16,17 +16,76 @@ def db_db(config: "DbConfig") -> motor.motor_asyncio.AsyncIOMotorDatabase:
     return config.create_client_async()[config.database]
 
 
-async def quarto_handler(db: "Db") -> quarto.Handler:
+def quarto_progress(connection: fastapi.requests.HTTPConnection) -> quarto.Progress:
+    """Render progress shared by the development lifespan."""
 
-    current = await schemas.QuartoHistory.latest(db)
+    progress = getattr(connection.app.state, "quarto_progress", None)
+    if progress is None:
+        raise fastapi.HTTPException(500, detail={"msg": "No render progress."})
+
+    return progress
+
+
+def quarto_renders(
+    connection: fastapi.requests.HTTPConnection,
+) -> quarto.Renders | None:
+    """Completed renders shared by the development lifespan. Without it,
+    websockets are closed."""
+
+    return getattr(connection.app.state, "quarto_renders", None)
+
+
+def logs(
+    connection: fastapi.requests.HTTPConnection,
+) -> broadcast.Broadcaster[schemas.LogItem] | None:
+    """Server log records shared by the development lifespan. Without it,
+    websockets are closed."""
+
+    return getattr(connection.app.state, "logs", None)
+
+
+def quarto_viewers(
+    connection: fastapi.requests.HTTPConnection,
+) -> quarto.Viewers | None:
+    """Targets open in the browser, shared by the development lifespan."""
+
+    return getattr(connection.app.state, "quarto_viewers", None)
+
+
+def quarto_recent(
+    connection: fastapi.requests.HTTPConnection,
+) -> quarto.Recent | None:
+    """Recently rendered targets, shared by the development lifespan."""
+
+    return getattr(connection.app.state, "quarto_recent", None)
+
+
+def quarto_processes(
+    connection: fastapi.requests.HTTPConnection,
+) -> quarto.Processes | None:
+    """Running ``quarto`` processes, shared by the development lifespan."""
+
+    return getattr(connection.app.state, "quarto_processes", None)
+
+
+async def quarto_handler(db: "Db", request: fastapi.Request) -> quarto.Handler:
+
+    current = await schemas.QuartoHistory.latest(db, slice_count=0)
     if not current:
         raise fastapi.HTTPException(500, detail={"msg": "No document."})
 
+    progress = getattr(request.app.state, "quarto_progress", None)
+    renders = getattr(request.app.state, "quarto_renders", None)
     return quarto.Handler(
         context := quarto.Context(),
         quarto.Filter(context),
         mongo_id=bson.ObjectId(current.mongo_id),
         _from="client",
+        progress=None if progress is None else progress.publish,
+        renders=None if renders is None else renders.publish,
+        viewers=quarto_viewers(request),
+        recent=quarto_recent(request),
+        processes=quarto_processes(request),
     )
 
 
@@ -47,6 +106,12 @@ async def quarto_handler(db: "Db") -> quarto.Handler:
 
 
 QuartoHandler = Annotated[quarto.Handler, fastapi.Depends(quarto_handler)]
+QuartoProgress = Annotated[quarto.Progress, fastapi.Depends(quarto_progress)]
+QuartoRenders = Annotated[quarto.Renders | None, fastapi.Depends(quarto_renders)]
+Logs = Annotated[broadcast.Broadcaster[schemas.LogItem] | None, fastapi.Depends(logs)]
+QuartoViewers = Annotated[quarto.Viewers | None, fastapi.Depends(quarto_viewers)]
+QuartoRecent = Annotated[quarto.Recent | None, fastapi.Depends(quarto_recent)]
+QuartoProcesses = Annotated[quarto.Processes | None, fastapi.Depends(quarto_processes)]
 DbConfig = Annotated[db.Config, fastapi.Depends(db_config, use_cache=True)]
 Db = Annotated[
     motor.motor_asyncio.AsyncIOMotorDatabase,
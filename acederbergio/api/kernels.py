@@ -0,0 +1,188 @@
+"""Warm Jupyter kernels for development renders.
+
+Rendering a document with ``python`` cells starts a Jupyter kernel, which
+then imports everything the document imports (``pandas``, ``sklearn``, etc.)
+on every save. ``quarto`` can instead keep the kernel of a document alive
+between renders using ``--execute-daemon <seconds>``, after which an idle
+kernel shuts itself down.
+
+:class:`Kernels` decides these flags for each render. Kernels are only kept
+for documents with ``python`` cells, and are restarted with
+``--execute-daemon-restart`` when a module that the document imports changed
+on disk since its kernel started, since the kernel would otherwise keep using
+the old module.
+
+:seealso: :meth:`acederbergio.api.quarto.Handler.render_qmd`.
+"""
+
+import importlib.machinery
+import os
+import pathlib
+import re
+import time
+from typing import NamedTuple
+
+from acederbergio import env
+
+logger = env.create_logger(__name__)
+
+PATTERN_CELL = re.compile(
+    r"^```+\s*\{python[^}]*\}\s*$(?P<code>.*?)^```+\s*$",
+    re.MULTILINE | re.DOTALL,
+)
+PATTERN_IMPORT = re.compile(
+    r"^[ \t]*(?:from[ \t]+(?P<module>[\w.]+)[ \t]+import[ \t]+(?P<names>[^#\n]+)"
+    r"|import[ \t]+(?P<modules>[^#\n]+))",
+    re.MULTILINE,
+)
+
+
+def find_cells(content: str) -> list[str]:
+    """Find the code of ``python`` cells in a document."""
+
+    return [match.group("code") for match in PATTERN_CELL.finditer(content)]
+
+
+def split_names(raw: str) -> list[str]:
+    """Split ``a as b, c`` into ``["a", "c"]``."""
+
+    out = list()
+    for item in raw.strip("() \t").split(","):
+        if name := item.strip().split(" ")[0].strip("()"):
+            out.append(name)
+
+    return out
+
+
+def find_imports(cells: list[str]) -> set[str]:
+    """Find the names of modules imported in :param:`cells`.
+
+    Names imported from a module are included as submodules, since they may
+    be, e.g. ``from acederbergio.filters import util``. Those that are not do
+    not resolve with :func:`find_module`.
+    """
+
+    out: set[str] = set()
+    for code in cells:
+        for match in PATTERN_IMPORT.finditer(code):
+            if (module := match.group("module")) is None:
+                out.update(split_names(match.group("modules")))
+                continue
+
+            out.add(module)
+            out.update(f"{module}.{name}" for name in split_names(match.group("names")))
+
+    return out
+
+
+def find_module(name: str) -> pathlib.Path | None:
+    """Find the source of the module :param:`name` without importing it.
+
+    ``importlib.util.find_spec`` imports the parents of dotted modules, which
+    would import every dependency of the documents into the server.
+    """
+
+    spec, locations = None, None
+    for part in name.split("."):
+        fullname = part if spec is None else f"{spec.name}.{part}"
+        spec = importlib.machinery.PathFinder.find_spec(fullname, locations)
+        if spec is None:
+            return None
+
+        locations = spec.submodule_search_locations
+
+    if spec is None or spec.origin is None or not os.path.isfile(spec.origin):
+        return None
+
+    return pathlib.Path(spec.origin)
+
+
+class Kernel(NamedTuple):
+    """State of the kernel of a document.
+
+    :ivar used: When the kernel was last used, from ``time.monotonic``.
+    :ivar modules: Modification times of imported modules when the kernel
+        started.
+    """
+
+    used: float
+    modules: dict[pathlib.Path, int]
+
+
+class Kernels:
+    """Track warm kernels of documents to determine ``quarto`` daemon flags.
+
+    :ivar idle: Seconds that a kernel is kept alive after its last render.
+    :ivar kernels: Documents with a kernel that is likely still alive.
+    """
+
+    idle: int
+    kernels: dict[pathlib.Path, Kernel]
+
+    def __init__(self, idle: int = 300):
+        self.idle = idle
+        self.kernels = dict()
+
+    def evict(self) -> list[pathlib.Path]:
+        """Forget kernels that ``quarto`` will have shut down for being idle.
+
+        :returns: Documents whose kernels were forgotten.
+        """
+
+        now = time.monotonic()
+        out = [
+            path for path, item in self.kernels.items() if now - item.used > self.idle
+        ]
+        for path in out:
+            logger.debug("Kernel of `%s` is idle.", path)
+            self.kernels.pop(path)
+
+        return out
+
+    def signature(self, modules: set[str]) -> dict[pathlib.Path, int]:
+        out = dict()
+        for name in modules:
+            if (path := find_module(name)) is None:
+                continue
+
+            try:
+                out[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+
+        return out
+
+    def flags(self, document: pathlib.Path) -> list[str]:
+        """Flags for ``quarto render`` of :param:`document`.
+
+        Call this once for each render, as it records that the kernel was
+        used.
+        """
+
+        self.evict()
+        try:
+            with open(document, "r") as file:
+                cells = find_cells(file.read())
+        except (OSError, UnicodeDecodeError):
+            cells = list()
+
+        if not cells:
+            self.kernels.pop(document, None)
+            return list()
+
+        modules = self.signature(find_imports(cells))
+        previous = self.kernels.get(document)
+        self.kernels[document] = Kernel(time.monotonic(), modules)
+
+        # NOTE: Modules that were not imported before are imported by the
+        #       kernel during this render, so only changes to those already
+        #       imported require a restart.
+        flags = ["--execute-daemon", str(self.idle)]
+        if previous is not None and any(
+            path in previous.modules and previous.modules[path] != mtime
+            for path, mtime in modules.items()
+        ):
+            logger.info("Modules imported by `%s` changed, restarting.", document)
+            flags.append("--execute-daemon-restart")
+
+        return flags
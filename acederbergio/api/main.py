@@ -18,12 +18,14 @@ from typing import Any
 
 import fastapi
 import fastapi.staticfiles
+import pydantic
+import rich
 import typer
 import uvicorn
 import uvicorn.config
 
 from acederbergio import db, env
-from acederbergio.api import quarto, routes, schemas
+from acederbergio.api import broadcast, kernels, quarto, routes, schemas
 
 logger = env.create_logger(__name__)
 
@@ -75,8 +77,14 @@ class App:
     # NOTE: This will allow records to be dynamically handled. Using a database
     #       handler directly would require a factory for logging, which is not a
     #       good fit with current patterns.
-    async def watch_logs(self):
-        """This should injest the logs from the logger using a unix socket."""
+    async def watch_logs(
+        self, logs: broadcast.Broadcaster[schemas.LogItem] | None = None
+    ):
+        """This should injest the logs from the logger using a unix socket.
+
+        :param logs: Log records are published here after they are pushed to
+            mongodb, e.g. for ``LogRoutes.websocket_log``.
+        """
 
         # state = dict(count=0)
 
@@ -90,7 +98,15 @@ class App:
             # It would appear that this does not exit until the server stops,
             # and does not run every time data is pushed to the socket.
             async for data in reader:
-                await schemas.Log.push(db, mongo_id, [json.loads(data)])
+                record = json.loads(data)
+                (pushed,) = await schemas.Log.push(db, mongo_id, [record])
+                if logs is None:
+                    continue
+
+                try:
+                    logs.publish(schemas.LogItem.model_validate(pushed))
+                except pydantic.ValidationError:
+                    continue
 
         socket_path = (env.WORKDIR / "blog.socket").resolve()
         if os.path.exists(socket_path):
@@ -119,19 +135,58 @@ class App:
             raise ValueError("Lifespan Task Failure.") from err
 
     @contextlib.asynccontextmanager
-    async def lifespan_dev(self, _: fastapi.FastAPI):
+    async def lifespan_dev(self, app: fastapi.FastAPI):
         """Development server lifespan.
 
         This should start a listener for the logging ``SocketHandler`` and
-        for quarto renders.
+        for quarto renders. Render progress is shared with routes in
+        ``app.state.quarto_progress``, the targets open in the browser in
+        ``app.state.quarto_viewers``, the recently rendered targets in
+        ``app.state.quarto_recent``, and running ``quarto`` processes in
+        ``app.state.quarto_processes``.
+
+        Completed renders and log records are published to websockets from
+        ``app.state.quarto_renders`` and ``app.state.logs``. Renders pushed to
+        mongodb by other processes (e.g. ``acederbergio quarto render``) are
+        published too, see ``QuartoHistoryFull.follow``.
         """
 
         stop_event = asyncio.Event()  # is set after shutdown.
-        watch = quarto.Watch()
+        progress = quarto.Progress()
+        renders = quarto.Renders()
+        logs: broadcast.Broadcaster[schemas.LogItem] = broadcast.Broadcaster()
+        viewers = quarto.Viewers()
+        recent = quarto.Recent()
+        processes = quarto.Processes()
+        context = quarto.Context()
+
+        # NOTE: Keep Jupyter kernels warm between renders of a document.
+        warm = None
+        if (idle := context.config.watch.kernels_idle) is not None:
+            warm = kernels.Kernels(idle)
+
+        watch = quarto.Watch(
+            context,
+            progress=progress.publish,
+            renders=renders.publish,
+            kernels=warm,
+            viewers=viewers,
+            recent=recent,
+            processes=processes,
+        )
+        app.state.quarto_progress = progress
+        app.state.quarto_renders = renders
+        app.state.logs = logs
+        app.state.quarto_viewers = viewers
+        app.state.quarto_recent = recent
+        app.state.quarto_processes = processes
 
         tasks = {
-            "logs": asyncio.create_task(self.watch_logs()),
+            "logs": asyncio.create_task(self.watch_logs(logs)),
             "quarto": asyncio.create_task(watch(stop_event)),
+            "renders": asyncio.create_task(
+                schemas.QuartoHistoryFull.follow(context.db, renders.publish)
+            ),
         }
 
         for task in tasks.values():
@@ -151,6 +206,10 @@ class App:
             except asyncio.CancelledError:
                 logger.info("Successfully exitted lifespan task.")
 
+        # NOTE: Renders dispatched by clients are not owned by the watch.
+        if cancelled := await processes.cancel():
+            logger.info("Cancelled renders of `%s`.", cancelled)
+
     def create_app(self) -> fastapi.FastAPI:
 
         # NOTE: It would appear all other routes must be attched prior to this mount.
@@ -219,6 +278,23 @@ def cmd_server(_context: typer.Context):
     serve(context, reload=True)
 
 
+@cli.command("migrate")
+def cmd_migrate(_context: typer.Context):
+    """Move the renders and logs embedded in run documents into their own
+    collections, see ``schemas.BaseLog``. Safe to run more than once."""
+
+    context = Context(_context.obj["database"])
+    client = context.database.create_client_async()
+    database = client[context.database.database]
+
+    async def doit():
+        for s in (schemas.Log, schemas.QuartoHistory):
+            count = await s.migrate(database)
+            rich.print(f"[green]Migrated `{count}` runs of `{s._collection}`.")
+
+    asyncio.run(doit())
+
+
 # NOTE: Add rich formatting to uvicorn logs.
 uvicorn.config.LOGGING_CONFIG.update(env.LOGGING_CONFIG)
 logging.config.dictConfig(env.LOGGING_CONFIG)
@@ -0,0 +1,204 @@
+"""Incremental build manifest for ``acederbergio quarto build``.
+
+The manifest is stored in the build directory and records, for every target
+successfully rendered, a digest of the target source and its resolved
+dependencies (see :class:`acederbergio.api.dependencies.DependencyIndex`)
+along with the output that the render produced. When the digest of a target
+matches that of the manifest and the output still exists the render can be
+skipped.
+
+Note that listings are not tracked as dependencies. When the metadata of a
+listed document changes, use ``acederbergio quarto build --force``.
+"""
+
+import hashlib
+import json
+import os
+import pathlib
+from typing import Annotated, Iterable
+
+import pydantic
+
+from acederbergio import env, util
+
+logger = env.create_logger(__name__)
+
+PATH = env.BUILD / "quarto_manifest.json"
+VERSION = 1
+
+
+def find_output(target: pathlib.Path) -> pathlib.Path | None:
+    """Find the output in :data:`env.BUILD` for a render target.
+
+    Most documents are rendered to ``html``, however some (e.g. the resume)
+    are rendered to ``pdf``. Static assets are copied as is.
+    """
+
+    if not target.is_relative_to(env.BLOG):
+        return None
+
+    relpath = target.relative_to(env.BLOG)
+    if target.suffix != ".qmd":
+        candidates = [env.BUILD / relpath]
+    else:
+        candidates = [env.BUILD / relpath.with_suffix(ext) for ext in (".html", ".pdf")]
+
+    return next((item for item in candidates if os.path.isfile(item)), None)
+
+
+def hash_file(path: pathlib.Path) -> str:
+    """Hash the contents of :param:`path`.
+
+    Missing files are given a fixed digest so that their creation changes the
+    digest of anything depending on them.
+    """
+
+    try:
+        with open(path, "rb") as file:
+            return hashlib.file_digest(file, "sha256").hexdigest()
+    except (FileNotFoundError, IsADirectoryError):
+        return "missing"
+
+
+class ManifestItem(util.HasTime):
+    digest: Annotated[
+        str,
+        pydantic.Field(description="Digest of the target and its dependencies."),
+    ]
+    output: Annotated[
+        str | None,
+        pydantic.Field(description="Output relative to the build directory."),
+    ]
+    duration: Annotated[
+        float | None,
+        pydantic.Field(None, description="Seconds spent on the last render."),
+    ]
+
+
+class Manifest(pydantic.BaseModel):
+    """Build manifest.
+
+    Keys of :attr:`items` are render targets relative to ``env.WORKDIR``.
+    """
+
+    version: Annotated[int, pydantic.Field(VERSION)]
+    items: Annotated[dict[str, ManifestItem], pydantic.Field(default_factory=dict)]
+
+    _digests: dict[pathlib.Path, tuple[tuple[int, int], str]] = pydantic.PrivateAttr(
+        default_factory=dict
+    )
+
+    @classmethod
+    def load(cls, path: pathlib.Path = PATH):
+        """Load the manifest. Returns an empty manifest when it is missing or
+        was written by an incompatible version."""
+
+        if not os.path.isfile(path):
+            return cls()
+
+        try:
+            with open(path, "r") as file:
+                manifest = cls.model_validate(json.load(file))
+        except (json.JSONDecodeError, pydantic.ValidationError):
+            logger.warning("Ignoring invalid manifest at `%s`.", path)
+            return cls()
+
+        if manifest.version != VERSION:
+            logger.warning("Ignoring manifest with version `%s`.", manifest.version)
+            return cls()
+
+        return manifest
+
+    def save(self, path: pathlib.Path = PATH) -> None:
+        # NOTE: Write and rename so that a crash does not leave a partial file.
+        path_tmp = path.with_suffix(".tmp")
+        with open(path_tmp, "w") as file:
+            json.dump(self.model_dump(mode="json"), file)
+
+        os.replace(path_tmp, path)
+
+    @staticmethod
+    def key(target: pathlib.Path) -> str:
+        return os.path.relpath(target, env.WORKDIR)
+
+    def hash_file(self, path: pathlib.Path) -> str:
+        """Like :func:`hash_file`, but memoized on modification time and size
+        since dependencies like ``_quarto.yaml`` are shared by every target."""
+
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return hash_file(path)
+
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if (cached := self._digests.get(path)) is not None and cached[0] == signature:
+            return cached[1]
+
+        digest = hash_file(path)
+        self._digests[path] = (signature, digest)
+        return digest
+
+    def digest(
+        self,
+        target: pathlib.Path,
+        dependencies: Iterable[pathlib.Path] = tuple(),
+        *extra: str,
+    ) -> str:
+        """Compute the digest of a target.
+
+        :param target: The render target.
+        :param dependencies: Resolved dependencies of the target.
+        :param extra: Additional strings to include, e.g. render flags.
+        """
+
+        hasher = hashlib.sha256()
+        for path in (target, *sorted(dependencies)):
+            hasher.update(f"{self.key(path)}:{self.hash_file(path)}\n".encode())
+
+        for item in extra:
+            hasher.update(f"{item}\n".encode())
+
+        return hasher.hexdigest()
+
+    def is_fresh(self, target: pathlib.Path, digest: str) -> bool:
+        """Check if :param:`target` can be skipped."""
+
+        if (item := self.items.get(self.key(target))) is None:
+            return False
+
+        return (
+            item.digest == digest
+            and item.output is not None
+            and os.path.isfile(env.BUILD / item.output)
+        )
+
+    def update(
+        self,
+        target: pathlib.Path,
+        digest: str,
+        *,
+        duration: float | None = None,
+    ) -> ManifestItem:
+        """Record a successful render of :param:`target`.
+
+        :param duration: Seconds spent rendering, see :meth:`durations`.
+        """
+
+        output = find_output(target)
+        item = ManifestItem(
+            digest=digest,
+            output=None if output is None else str(output.relative_to(env.BUILD)),
+            duration=duration,
+        )
+        self.items[self.key(target)] = item
+        return item
+
+    def durations(self) -> dict[str, float]:
+        """Historical render durations by key (see :meth:`key`), used to
+        estimate how long a build will take."""
+
+        return {
+            key: item.duration
+            for key, item in self.items.items()
+            if item.duration is not None
+        }
@@ -14,19 +14,28 @@ in ``docker`` builds.
 """
 
 import asyncio
+import collections
+import contextlib
+import functools
+import itertools
 import os
 import pathlib
-import shutil
+import random
+import signal
 import subprocess
+import tempfile
 import time
-from typing import (Annotated, Any, AsyncGenerator, ClassVar, Iterable,
-                    Iterator, Optional)
+from typing import (Annotated, Any, AsyncGenerator, Awaitable, Callable,
+                    ClassVar, Iterable, Iterator, Literal, NamedTuple,
+                    Optional)
 
 import bson
 import motor
 import motor.motor_asyncio
 import pydantic
 import rich
+import rich.markup
+import rich.progress
 import rich.table
 import typer
 import watchfiles
@@ -35,12 +44,36 @@ import yaml_settings_pydantic as ysp
 from typing_extensions import Doc, Self
 
 from acederbergio import db, env, util
-from acederbergio.api import schemas
+from acederbergio.api import (artifacts, batch, broadcast, cache, changed,
+                              dependencies, kernels, manifest, report, schemas,
+                              shard, sync)
 
 logger = env.create_logger(__name__)
 
+CONFIG = env.CONFIGS / "dev.yaml"
 
-# NOTE: This is possible with globs, but I like practicing DSA.
+HandlerTask = Annotated[
+    Callable[
+        [],
+        Awaitable[schemas.QuartoHandlerAny | list[schemas.QuartoHandlerAny]],
+    ],
+    Doc(
+        "Callable returning the awaitable for a single render, or for many "
+        "renders in the case of batches."
+    ),
+]
+HandlerProgress = Annotated[
+    Callable[[schemas.QuartoRenderProgress], None],
+    Doc("Callback for events published while renders are running."),
+]
+HandlerRenders = Annotated[
+    Callable[[schemas.QuartoRender], None],
+    Doc("Callback for renders as they complete."),
+]
+
+
+# NOTE: This is possible with globs, but I like practicing DSA. ``Filter`` uses
+#       ``Matcher``, which does not resolve paths.
 class Node:
     children: dict[str, Self]
     is_end: bool
@@ -114,6 +147,112 @@ class Node:
         return out
 
 
+class Matcher:
+    """Prefix matcher compiled from absolute paths.
+
+    Answers the same question as :meth:`Node.has_prefix` (is a path one of,
+    or inside one of, the paths provided) without touching the filesystem.
+    Paths are normalized with ``os.path`` (not resolved), so symlinks are
+    not followed. Use :meth:`fromPaths`, which reuses matchers for the same
+    paths.
+
+    :ivar paths: Normalized paths matched.
+    """
+
+    paths: frozenset[str]
+
+    _match_all: bool
+    _prefixes: tuple[str, ...]
+
+    def __init__(self, paths: frozenset[str]):
+        self.paths = paths
+        self._match_all = os.sep in paths
+        self._prefixes = tuple(item + os.sep for item in paths)
+
+    @classmethod
+    def fromPaths(cls, *paths: pathlib.Path | str) -> Self:
+        return cls.compile(frozenset(map(cls.normalize, paths)))
+
+    @classmethod
+    @functools.lru_cache(maxsize=64)
+    def compile(cls, paths: frozenset[str]) -> Self:
+        return cls(paths)
+
+    @staticmethod
+    def normalize(path: pathlib.Path | str) -> str:
+        return os.path.normpath(os.path.abspath(path))
+
+    def has_prefix(self, path: pathlib.Path | str) -> bool:
+        path = self.normalize(path)
+        return self._match_all or path in self.paths or path.startswith(self._prefixes)
+
+    def dict(self):
+        return sorted(self.paths)
+
+
+class Roots(NamedTuple):
+    """Directories to watch, see :func:`find_roots`.
+
+    :ivar recursive: Directories watched along with everything inside them.
+    :ivar shallow: Directories of which only the direct children are watched.
+    """
+
+    recursive: tuple[pathlib.Path, ...]
+    shallow: tuple[pathlib.Path, ...]
+
+
+def find_roots(paths: Iterable[pathlib.Path | str], ignore: Matcher) -> Roots:
+    """Find the fewest directories to watch to notice changes to :param:`paths`.
+
+    ``watchfiles`` cannot exclude directories from a recursive watch, so a
+    directory containing an ignored path (e.g. ``blog`` contains ``build``) is
+    watched shallowly and its subdirectories are considered instead. Files are
+    covered by shallowly watching their directory, since editors often replace
+    files instead of writing to them. Paths that do not exist are skipped.
+    """
+
+    recursive: set[str] = set()
+    shallow: set[str] = set()
+    stack: list[str] = list()
+    for path in map(Matcher.normalize, paths):
+        if ignore.has_prefix(path):
+            continue
+        elif os.path.isdir(path):
+            stack.append(path)
+        elif os.path.isdir(parent := os.path.dirname(path)):
+            shallow.add(parent)
+
+    while stack:
+        path = stack.pop()
+        if ignore.has_prefix(path):
+            continue
+
+        prefix = path + os.sep
+        if not any(item.startswith(prefix) for item in ignore.paths):
+            recursive.add(path)
+            continue
+
+        shallow.add(path)
+        with os.scandir(path) as entries:
+            stack.extend(
+                entry.path for entry in entries if entry.is_dir(follow_symlinks=False)
+            )
+
+    # NOTE: Roots inside of recursive roots are already watched.
+    prefixes = tuple(item + os.sep for item in recursive)
+    recursive = {item for item in recursive if not item.startswith(prefixes)}
+    shallow = {
+        item
+        for item in shallow
+        if item not in recursive and not item.startswith(prefixes)
+    }
+
+    return Roots(
+        tuple(pathlib.Path(item) for item in sorted(recursive)),
+        tuple(pathlib.Path(item) for item in sorted(shallow)),
+    )
+
+
 class ConfigHandler(pydantic.BaseModel):
     verbose: Annotated[bool, pydantic.Field(default=False)]
     render: Annotated[bool, pydantic.Field(default=True)]
@@ -124,6 +263,113 @@ class ConfigHandler(pydantic.BaseModel):
             description="Additional flags for ``quarto render``.",
         ),
     ]
+    jobs: Annotated[
+        int,
+        pydantic.Field(
+            default=1,
+            ge=1,
+            description="Maximum number of renders to run concurrently.",
+        ),
+    ]
+    batch: Annotated[
+        int,
+        pydantic.Field(
+            default=1,
+            ge=1,
+            description=(
+                "Maximum number of documents to render with a single "
+                "``quarto render`` in directory renders."
+            ),
+        ),
+    ]
+    timeout: Annotated[
+        float | None,
+        pydantic.Field(
+            default=1800,
+            gt=0,
+            description=(
+                "Seconds that a render may take before it is killed, see "
+                "``timeouts``. Set to ``null`` to never time out."
+            ),
+        ),
+    ]
+    timeouts: Annotated[
+        dict[pathlib.Path, float | None],
+        pydantic.Field(
+            default_factory=dict,
+            description=(
+                "Timeouts of specific targets, overriding ``timeout``. Paths "
+                "are relative to the project root."
+            ),
+        ),
+        pydantic.AfterValidator(
+            lambda v: {env.WORKDIR / key: value for key, value in v.items()}
+        ),
+    ]
+    defered_count: Annotated[
+        int,
+        pydantic.Field(
+            default=1,
+            ge=1,
+            description=(
+                "Number of most recently rendered documents to render again "
+                "for defered changes that no document is known to depend on."
+            ),
+        ),
+    ]
+    style_target: Annotated[
+        pathlib.Path,
+        pydantic.Field(
+            default=env.BLOG / "index.qmd",
+            description=(
+                "Document rendered without executing code to compile "
+                "stylesheets when only these changed. It should not have any "
+                "code cells."
+            ),
+        ),
+    ]
+
+
+class ConfigWatch(pydantic.BaseModel):
+    debounce: Annotated[
+        float,
+        pydantic.Field(
+            default=0.5,
+            ge=0,
+            description=(
+                "Seconds to wait for further changes to a render target "
+                "before rendering it. Every change restarts the wait."
+            ),
+        ),
+    ]
+    kernels_idle: Annotated[
+        int | None,
+        pydantic.Field(
+            default=300,
+            ge=1,
+            description=(
+                "Seconds to keep the Jupyter kernels of documents alive after "
+                "their last render. Set to ``null`` to start a kernel for "
+                "every render."
+            ),
+        ),
+    ]
+
+
+class ConfigCache(pydantic.BaseModel):
+    size_max: Annotated[
+        int | None,
+        pydantic.Field(
+            default=2**31,
+            ge=0,
+            description=(
+                "Maximum total size of the execution caches of documents, in "
+                "bytes or with a unit like ``512M``. Least recently used "
+                "entries are removed past this. Set to ``null`` for no limit."
+            ),
+        ),
+        pydantic.BeforeValidator(lambda v: v if v is None else cache.parse_size(v)),
+    ]
 
 
 def create_set_defaults_validator(defaults: set[pathlib.Path]):
@@ -207,14 +453,14 @@ class ConfigFilter(pydantic.BaseModel):
 
 
 class Config(ysp.BaseYamlSettings):
-    """File configuration for :class:`Filter`, :class:`Handler`, and :class:`Watch`.
+    """File configuration for :class:`Filter`, :class:`Handler`, :class:`Scheduler`, and :class:`Watch`.
 
     Used by wrapping in :class:`Context` to include configuration for the database
     connection, verbosity, and renders..
     """
 
     model_config = ysp.YamlSettingsConfigDict(
-        yaml_files={env.CONFIGS / "dev.yaml": ysp.YamlFileConfigDict(required=False)}
+        yaml_files={CONFIG: ysp.YamlFileConfigDict(required=False)}
     )
 
     handler: Annotated[
@@ -231,6 +477,20 @@ class Config(ysp.BaseYamlSettings):
             default_factory=dict,
         ),
     ]
+    watch: Annotated[
+        ConfigWatch,
+        pydantic.Field(
+            description="Settings for scheduling renders from changes.",
+            default_factory=dict,
+        ),
+    ]
+    cache: Annotated[
+        ConfigCache,
+        pydantic.Field(
+            description="Settings for the execution caches of documents.",
+            default_factory=dict,
+        ),
+    ]
 
 
 class Context:
@@ -267,6 +527,9 @@ class Context:
         _context: typer.Context,
         render_verbose: "FlagHandlerVerbose" = False,
         render: "FlagHandlerRender" = True,
+        jobs: "FlagHandlerJobs" = None,
+        batch: "FlagHandlerBatch" = None,
+        timeout: "FlagHandlerTimeout" = None,
         # filters: "FlagFilterFilters" = list(),
         assets: "FlagFilterAsset" = list(),
         ignore: "FlagFilterIgnore" = list(),
@@ -275,6 +538,13 @@ class Context:
             "handler": {"verbose": render_verbose, "render": render},
             "filter": {"assets": assets, "ignore": ignore},
         }
+        if jobs is not None:
+            config_raw["handler"]["jobs"] = jobs
+        if batch is not None:
+            config_raw["handler"]["batch"] = batch
+        if timeout is not None:
+            config_raw["handler"]["timeout"] = timeout
+
         context = Context(Config.model_validate(config_raw))
         filter = Filter(context)
 
@@ -309,6 +579,14 @@ class Context:
 # Filter and Handlers
 
 
+class Classification(NamedTuple):
+    """Result of :meth:`Filter.classify`."""
+
+    ignored: bool
+    reason: str | None
+    dispatch_kind: schemas.QuartoRenderKind | None
+
+
 # NOTE: Should just support the right signature for ``__call__``.
 #       Does not need to work like ``BaseFilter``.
 #       See ``https://github.com/samuelcolvin/watchfiles/blob/main/watchfiles/filters.py``.
@@ -316,49 +594,44 @@ class Filter:
     """Determines which files are ignored and holds file categorization."""
 
     # fmt: off
-    suffixes_deffered: ClassVar[set[str]] = { ".py", ".lua", ".qmd", ".html", ".yaml", ".css", ".scss", ".tex" }
+    suffixes_deffered: ClassVar[set[str]] = { ".py", ".lua", ".qmd", ".html", ".yaml", ".yml", ".css", ".scss", ".tex" }
     suffixes_static: ClassVar[set[str]] = { ".json", ".svg", ".js" }
+    suffixes_style: ClassVar[set[str]] = { ".css", ".scss" }
     suffixes: ClassVar[set[str]] = suffixes_deffered | suffixes_static
     # fmt: on
 
-    tt_tolerance: Annotated[
-        int,
-        Doc("Acceptable time between writes. This is meant to make it easier."),
-    ]
-    tt_last: Annotated[
-        dict[pathlib.Path, float],
-        Doc("Map of file paths to last write timestamp."),
-    ]
-
-    filters: Annotated[Node, Doc("Trie for matching watched filters.")]
+    filters: Annotated[Matcher, Doc("Matcher for watched filters.")]
     assets: Annotated[
-        Node,
+        Matcher,
         Doc(
-            "Trie for matching watched assets.\nThis should not include assets "
+            "Matcher for watched assets.\nThis should not include assets "
             "that ought to be literally coppied an pasted into their "
             "respective places in ``build``, for instance "
             "``icons/misc.json``.These should be in ``static``."
         ),
     ]
     static: Annotated[
-        Node,
+        Matcher,
         Doc(
-            "Trie for watching static assets.\nThis should contain assets that "
+            "Matcher for watching static assets.\nThis should contain assets that "
             "ought to be literally copied and pasted into build directly just "
             "like quarto would."
         ),
     ]
     ignore: Annotated[
-        Node,
-        Doc("Trie for matching ignored paths."),
+        Matcher,
+        Doc("Matcher for ignored paths."),
     ]
     config: ConfigFilter
+    cache_size: ClassVar[int] = 4096
+
+    _extras: dict[str, set[pathlib.Path]]
+    _cache: collections.OrderedDict[pathlib.Path, Classification]
 
     def __init__(
         self,
         context: Context,
         *,
-        tt_tolerance: int = 5,
         filters: Iterable[pathlib.Path] | None = None,
         assets: Iterable[pathlib.Path] | None = None,
         static: Iterable[pathlib.Path] | None = None,
@@ -366,37 +639,51 @@ class Filter:
         # suffixes_included: Iterable[str] | None = None
     ) -> None:
 
-        config = context.config.filter
-        self.config = config
-        self.filters = self.__validate_trie(filters or set(), config.filters)
-        self.assets = self.__validate_trie(assets or set(), config.assets)
-        self.static = self.__validate_trie(static or set(), config.static)
-        self.ignore = self.__validate_trie(ignore or set(), config.ignore)
+        self._extras = dict(
+            filters=set(filters or set()),
+            assets=set(assets or set()),
+            static=set(static or set()),
+            ignore=set(ignore or set()),
+        )
+        self._cache = collections.OrderedDict()
+        self.configure(context.config.filter)
         # self.suffixes_included = set(suffixes_included) if suffixes_included is not None else None
 
-        self.tt_tolerance = tt_tolerance
-        self.tt_last = dict()
+    def configure(self, config: ConfigFilter) -> None:
+        """Use :param:`config`, compiling matchers and invalidating any
+        classifications made with the previous configuration."""
 
-    # TODO: Methods are often called twice - once to determine if the event is
-    #       ignored, and again when ``Handler`` needs to determine what to do
-    #       with the changes.
-    def __call__(self, _: watchfiles.Change, path: str) -> bool:
+        self.config = config
+        self.filters = self.__validate_matcher(self._extras["filters"], config.filters)
+        self.assets = self.__validate_matcher(self._extras["assets"], config.assets)
+        self.static = self.__validate_matcher(self._extras["static"], config.static)
+        self.ignore = self.__validate_matcher(self._extras["ignore"], config.ignore)
+        self.invalidate()
+
+    def __call__(self, change: watchfiles.Change, path: str) -> bool:
         """
         Determine if a change is to be noticed or not.
 
-        :param _:
+        :param change: Kind of change. Paths that were added or deleted are
+            classified again, since they may have been replaced by a directory
+            or vice versa.
         :param path: Path to the event.
         :returns: ``True`` if the file should be included in changes, ``False``
             if it should be ignored.
         """
-        return not self.is_ignored(pathlib.Path(path))[0]
 
-    def __validate_trie(
+        _path = pathlib.Path(path)
+        if change != watchfiles.Change.modified:
+            self.invalidate(_path)
+
+        return not self.classify(_path).ignored
+
+    def __validate_matcher(
         self,
         from_init: Iterable[pathlib.Path],
         from_config: Iterable[pathlib.Path],
-    ) -> Node:
-        return Node.fromPaths(*from_init, *from_config)
+    ) -> Matcher:
+        return Matcher.fromPaths(*from_init, *from_config)
 
     def dict(self):
         return {
@@ -406,7 +693,43 @@ class Filter:
             "static": self.static.dict(),
         }
 
+    def invalidate(self, path: pathlib.Path | None = None) -> None:
+        """Forget the classification of :param:`path`, or of every path when
+        no path is provided."""
+
+        if path is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(path, None)
+
+    def classify(self, path: pathlib.Path) -> Classification:
+        """Classify :param:`path` once for both watch filtering and dispatch.
+
+        Results are kept in a bounded LRU cache, so that the matchers and the
+        filesystem are only consulted the first time a path is seen. Note that
+        the dispatch kind does not account for the dependency index, see
+        :meth:`Handler.determine_dispatch_kind`.
+        """
+
+        if (cached := self._cache.get(path)) is not None:
+            self._cache.move_to_end(path)
+            return cached
+
+        ignored, reason = self._classify_ignored(path)
+        dispatch_kind = None if reason == "directory" else self._classify_kind(path)
+        out = Classification(ignored, reason, dispatch_kind)
+
+        self._cache[path] = out
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+        return out
+
     def is_ignored(self, path: pathlib.Path) -> tuple[bool, str | None]:
+        classification = self.classify(path)
+        return classification.ignored, classification.reason
+
+    def _classify_ignored(self, path: pathlib.Path) -> tuple[bool, str | None]:
         if self.ignore.has_prefix(path):
             logger.debug("`%s` ignored explicity.", path)
             return True, "explicit"
@@ -417,33 +740,308 @@ class Filter:
             and path.suffix not in self.config.suffixes_included
         ):
             return True, f"suffix={path.suffix}"
-        elif self.is_event_from_conform(path):
-            return True, "too close"
-        elif (
-            self.filters.has_prefix(path)
-            or self.assets.has_prefix(path)
-            or self.static.has_prefix(path)
-        ):
-            logger.debug("Not ignored.")
-            return False, None
 
         logger.debug("Not ignoring changes in `%s`.", path)
         return False, None
 
-    def is_event_from_conform(self, path: pathlib.Path):
-        """Check for sequential write events, e.g. from ``conform.nvim``
-        fixing.
+    def _classify_kind(self, path: pathlib.Path) -> schemas.QuartoRenderKind | None:
+        # NOTE: If a qmd file was modified, then rerender the modified ``qmd``
+        #       If a watched filter (from ``--quarto-filter``) is changed, do
+        #       it for the last file.
+        # NOTE: [About template partials](https://quarto.org/docs/authoring/includes.html).
+        #       I will start all of my partials with an `_` and place them in a
+        #       ``partials`` folder.
+        is_partial = path.parent.name == "partials" and path.name.startswith("_")
+        if path.suffix == ".qmd" and not is_partial:
+            return "direct"
+        elif (
+            self.filters.has_prefix(path) or self.assets.has_prefix(path) or is_partial
+        ) and path.suffix in self.suffixes_deffered:
+            return "style" if path.suffix in self.suffixes_style else "defered"
+        elif self.static.has_prefix(path) and path.suffix in self.suffixes_static:
+            return "static"
+
+        return None
+
+
+class Progress(broadcast.Broadcaster[schemas.QuartoRenderProgress]):
+    """Fan out render progress events to subscribers such as websocket
+    clients.
+
+    Use :meth:`publish` as the ``progress`` callback of :class:`Handler`.
+    """
+
+
+class Renders(broadcast.Broadcaster[schemas.QuartoRender]):
+    """Fan out completed renders to subscribers such as websocket clients.
+
+    Use :meth:`publish` as the ``renders`` callback of :class:`Handler`.
+    """
+
+
+class Viewers:
+    """Track which render targets are open in the browser, so that their
+    renders can go before background work.
+
+    Live pages send the targets they follow when they connect to the render
+    log websocket, see ``QuartoRoutes.websocket_log``.
+
+    :ivar counts: Number of connections viewing each target, relative to
+        ``env.WORKDIR``.
+    """
+
+    counts: collections.Counter[str]
+
+    def __init__(self):
+        self.counts = collections.Counter()
+
+    @staticmethod
+    def key(target: pathlib.Path | str) -> str:
+        return os.path.relpath(env.WORKDIR / target, env.WORKDIR)
+
+    def update(self, previous: Iterable[str], targets: Iterable[str]) -> None:
+        """Replace the targets :param:`previous` of a connection with
+        :param:`targets`. Use an empty :param:`targets` on disconnect."""
+
+        self.counts.subtract(self.key(item) for item in previous)
+        self.counts.update(self.key(item) for item in targets)
+        self.counts = +self.counts
+
+    def __contains__(self, target: pathlib.Path | str) -> bool:
+        return self.counts[self.key(target)] > 0
+
+
+class Recent:
+    """Most recently rendered targets, used for defered renders.
+
+    Direct renders are recorded by :meth:`Handler.report` as they are pushed
+    to mongodb, so that defered renders do not have to query the render
+    history. Use :meth:`seed` to start from the history.
+
+    :ivar size: Number of targets remembered.
+    :ivar targets: Absolute targets from least to most recently rendered.
+    """
+
+    size: int
+    targets: collections.OrderedDict[pathlib.Path, None]
+
+    def __init__(self, size: int = 32):
+        self.size = size
+        self.targets = collections.OrderedDict()
+
+    def add(self, target: pathlib.Path | str) -> None:
+        """Record a render of :param:`target`, relative to ``env.WORKDIR`` as
+        in render results or absolute."""
+
+        target = env.WORKDIR / target
+        self.targets[target] = None
+        self.targets.move_to_end(target)
+        while len(self.targets) > self.size:
+            self.targets.popitem(last=False)
+
+    def latest(self, count: int | None = None) -> list[pathlib.Path]:
+        """The :param:`count` most recently rendered targets, most recent
+        first."""
+
+        out = list(reversed(self.targets))
+        return out if count is None else out[:count]
+
+    async def seed(self, db: motor.motor_asyncio.AsyncIOMotorDatabase) -> None:
+        """Add the most recent direct renders from the render history as
+        older than any target recorded so far."""
+
+        filters = schemas.QuartoHistoryFilters(kind=["direct"])  # type: ignore
+        targets = await schemas.QuartoHistory.recent_targets(
+            db, self.size, filters=filters
+        )
+        for target in (env.WORKDIR / item for item in targets):
+            if target in self.targets or len(self.targets) >= self.size:
+                continue
+
+            self.targets[target] = None
+            self.targets.move_to_end(target, last=False)
+
+        logger.debug("Seeded `%s` recently rendered targets.", len(targets))
+
+
+async def kill_group(process: asyncio.subprocess.Process, *, grace: float = 5) -> None:
+    """Terminate the process group of :param:`process`, so that ``deno`` and
+    Jupyter kernels started by ``quarto`` do not outlive it. The group is
+    killed once :param:`process` exits or after :param:`grace` seconds.
+
+    :param process: Started in a new session, see :meth:`Handler.run_quarto`.
+    """
+
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        return
+
+    try:
+        await asyncio.wait_for(process.wait(), grace)
+    except asyncio.TimeoutError:
+        pass
+
+    # NOTE: Members of the group may outlive the shell.
+    with contextlib.suppress(ProcessLookupError):
+        os.killpg(process.pid, signal.SIGKILL)
+
+    await process.wait()
+
+
+class Processes:
+    """Running ``quarto`` processes by target, so that renders can be
+    cancelled, e.g. with ``QuartoRoutes.post_cancel``.
+
+    Cancelled renders finish with the status ``cancelled`` instead of raising,
+    see :meth:`Handler.run_quarto`.
+
+    :ivar processes: Processes rendering each target, relative to
+        ``env.WORKDIR``.
+    :ivar cancelled: Processes killed by :meth:`cancel`.
+    """
+
+    processes: dict[str, set[asyncio.subprocess.Process]]
+    cancelled: set[asyncio.subprocess.Process]
+
+    def __init__(self):
+        self.processes = dict()
+        self.cancelled = set()
+
+    @staticmethod
+    def key(target: pathlib.Path | str) -> str:
+        return os.path.relpath(env.WORKDIR / target, env.WORKDIR)
+
+    @contextlib.contextmanager
+    def track(
+        self,
+        targets: Iterable[pathlib.Path],
+        process: asyncio.subprocess.Process,
+    ) -> Iterator[None]:
+        """Track :param:`process` as rendering :param:`targets` while in
+        context."""
+
+        keys = [self.key(target) for target in targets]
+        for key in keys:
+            self.processes.setdefault(key, set()).add(process)
+
+        try:
+            yield
+        finally:
+            for key in keys:
+                if (items := self.processes.get(key)) is not None:
+                    items.discard(process)
+                    if not items:
+                        del self.processes[key]
+
+            self.cancelled.discard(process)
+
+    def targets(self) -> list[str]:
+        return sorted(self.processes)
+
+    async def cancel(
+        self, targets: Iterable[pathlib.Path | str] | None = None
+    ) -> list[str]:
+        """Kill the processes rendering :param:`targets`, or every process
+        when no targets are provided.
+
+        :returns: The targets that were being rendered.
         """
 
-        tt = time.time()
-        tt_last = self.tt_last.get(path, 0)
+        keys = self.targets() if targets is None else map(self.key, targets)
+        out, processes = list(), set()
+        for key in keys:
+            if items := self.processes.get(key):
+                out.append(key)
+                processes |= items
+
+        for key in out:
+            logger.info("Cancelling render of `%s`.", key)
+
+        self.cancelled |= processes
+        await asyncio.gather(*(kill_group(process) for process in processes))
+        return sorted(set(out))
 
-        self.tt_last[path] = tt
-        if abs(tt - tt_last) < self.tt_tolerance:
-            logger.debug("Event for `%s` came from `conform.nvim`.", path)
-            return True
 
-        return False
+class QuartoOutput(NamedTuple):
+    """Output of ``quarto``, see :meth:`Handler.run_quarto`."""
+
+    stdout: list[str]
+    stderr: list[str]
+    status_code: int
+    status: schemas.QuartoRenderStatus
+
+
+class Estimate:
+    """Estimate the time remaining to execute a plan (see
+    :meth:`Handler.plan`) from historical render durations (see
+    :meth:`manifest.Manifest.durations`).
+
+    Targets without history are assumed to take as long as the average
+    target with history. As jobs finish, the remaining estimates are scaled by
+    how long finished jobs actually took relative to their estimates and then
+    divided between :ivar:`workers`.
+
+    :ivar estimates: Estimated seconds for each target yet to finish.
+    :ivar workers: Number of renders running at once, ``config.handler.jobs``.
+    :ivar total: Number of jobs to run, excluding those up to date.
+    """
+
+    default: ClassVar[float] = 5.0
+
+    estimates: dict[str, float]
+    workers: int
+    total: int
+
+    _actual: float
+    _estimated: float
+
+    def __init__(
+        self,
+        jobs: Iterable[schemas.QuartoRenderJob],
+        durations: dict[str, float],
+        *,
+        workers: int = 1,
+    ):
+        targets = [
+            job.target
+            for job in jobs
+            if not isinstance(job, schemas.QuartoRenderCached)
+        ]
+        known = [durations[target] for target in targets if target in durations]
+        fallback = sum(known) / len(known) if known else self.default
+
+        self.estimates = {target: durations.get(target, fallback) for target in targets}
+        self.workers = workers
+        self.total = len(self.estimates)
+        self._actual = 0
+        self._estimated = 0
+
+    def finish(self, target: str, duration: float | None) -> None:
+        """Record that :param:`target` finished after :param:`duration`
+        seconds."""
+
+        if (estimate := self.estimates.pop(target, None)) is None:
+            return
+
+        if duration is not None:
+            self._actual += duration
+            self._estimated += estimate
+
+    @property
+    def remaining(self) -> float:
+        """Estimated seconds until every job has finished."""
+
+        if not self.estimates:
+            return 0
+
+        scale = self._actual / self._estimated if self._estimated else 1
+        workers = min(self.workers, len(self.estimates))
+        return scale * sum(self.estimates.values()) / workers
+
+    def format(self) -> str:
+        minutes, seconds = divmod(int(self.remaining), 60)
+        return f"{minutes}:{seconds:02d}"
 
 
 class Handler:
@@ -458,6 +1056,28 @@ class Handler:
         database configuration.
     :ivar mongo_id: Document to push render metadatas to. When noting is
         provided, no database opporations are required.
+    :ivar index: Dependency index used to find the documents affected by
+        defered changes. When not provided, defered changes will render the
+        last documents rendered (see :ivar:`recent`).
+    :ivar manifest: Build manifest used to skip targets whose output is up to
+        date. When not provided, nothing is skipped.
+    :ivar force: Render targets even when :ivar:`manifest` has up to date
+        output for them. Renders are still recorded in :ivar:`manifest`, so
+        that durations are kept.
+    :ivar progress: Callback for progress events, e.g. every line of output
+        from ``quarto render`` as it is produced. See :class:`Progress`.
+    :ivar renders: Callback for renders as they complete, see
+        :class:`Renders`.
+    :ivar kernels: Tracks warm Jupyter kernels of documents, so that renders
+        do not start a kernel every time. When not provided, every render
+        starts its own kernel.
+    :ivar artifacts: Cache of render outputs shared between builds, used
+        along with :ivar:`manifest`. See :meth:`restore`.
+    :ivar viewers: Targets open in the browser, which are rendered before
+        others. See :meth:`priority`.
+    :ivar recent: Most recently rendered targets, rendered again for defered
+        changes. See :meth:`do_defered`.
+    :ivar processes: Running ``quarto`` processes, used to cancel renders.
     """
 
     _from: schemas.QuartoRenderFrom
@@ -465,6 +1085,16 @@ class Handler:
     context: Context
 
     mongo_id: bson.ObjectId | None
+    index: dependencies.DependencyIndex | None
+    manifest: manifest.Manifest | None
+    force: bool
+    progress: HandlerProgress | None
+    renders: HandlerRenders | None
+    kernels: kernels.Kernels | None
+    artifacts: artifacts.Artifacts | None
+    viewers: Viewers | None
+    recent: Recent
+    processes: Processes
 
     def __init__(
         self,
@@ -473,83 +1103,404 @@ class Handler:
         *,
         mongo_id: bson.ObjectId | None,
         _from: schemas.QuartoRenderFrom,
+        index: dependencies.DependencyIndex | None = None,
+        manifest: manifest.Manifest | None = None,
+        force: bool = False,
+        progress: HandlerProgress | None = None,
+        renders: HandlerRenders | None = None,
+        kernels: kernels.Kernels | None = None,
+        artifacts: artifacts.Artifacts | None = None,
+        viewers: Viewers | None = None,
+        recent: Recent | None = None,
+        processes: Processes | None = None,
     ):
         self.filter = filter
         self.context = context
         self.mongo_id = mongo_id
         self._from = _from
+        self.index = index
+        self.manifest = manifest
+        self.force = force
+        self.progress = progress
+        self.renders = renders
+        self.kernels = kernels
+        self.artifacts = artifacts
+        self.viewers = viewers
+        self.recent = recent if recent is not None else Recent()
+        self.processes = processes if processes is not None else Processes()
 
     @property
     def config(self) -> ConfigHandler:
         return self.context.config.handler
 
+    def timeout(self, target: pathlib.Path) -> float | None:
+        """Seconds that rendering :param:`target` may take, see
+        ``config.timeout``."""
+
+        return self.config.timeouts.get(target, self.config.timeout)
+
+    def priority(self, target: pathlib.Path | str) -> int:
+        """Priority of rendering :param:`target`, lower goes first.
+
+        Targets open in the browser (see :ivar:`viewers`) go before the rest.
+        """
+
+        return 0 if self.viewers is not None and target in self.viewers else 1
+
     async def __call__(
         self,
         v: str | pathlib.Path,
         *,
         exclude_defered: bool = False,
-    ) -> schemas.QuartoHandlerRender | schemas.QuartoHandlerJob | None:
+    ) -> AsyncGenerator[schemas.QuartoHandlerAny, None]:
         """Entrypoint for dispatching file renders.
 
-        For rendering of directories, see :meth:`do_directory`.
+        A single change can require many renders, e.g. changing a partial will
+        render every document including it. For rendering of directories, see
+        :meth:`do_directory`.
 
         :param v: Path to render target.
         :param exclude_defered: Do not preform any defered renders. This setting
             is important for directory renders.
         :throws ValueError: If :param:`path` is to a directory.
-        :returns: A ``QuartoRender`` object with logs and render metadata.
+        :returns: An async generator yielding ``QuartoRender`` objects with logs
+            and render metadata.
+        """
+
+        async for data in self.pool(self.tasks(v, exclude_defered=exclude_defered)):
+            yield data
+
+    def tasks(
+        self,
+        v: str | pathlib.Path,
+        *,
+        exclude_defered: bool = False,
+        item: schemas.QuartoRenderRequestItem | None = None,
+    ) -> list[HandlerTask]:
+        """Determine the renders required by changes in :param:`v`.
+
+        :param v: Path to the changed file.
+        :param exclude_defered: See :meth:`__call__`.
+        :param item: Request item to return when the path is ignored. When not
+            provided, one is created from :param:`v`.
+        :returns: Tasks for :meth:`pool`. Ignored paths result in a single task
+            returning a request.
+        """
+
+        targets = self.targets(v, exclude_defered=exclude_defered, item=item)
+        return list(targets.values())
+
+    def targets(
+        self,
+        v: str | pathlib.Path,
+        *,
+        exclude_defered: bool = False,
+        item: schemas.QuartoRenderRequestItem | None = None,
+    ) -> dict[pathlib.Path, HandlerTask]:
+        """Like :meth:`tasks`, but keyed by render target.
+
+        When the target is not known ahead of time (ignored paths and defered
+        renders without :ivar:`index`), the task is keyed by the path itself.
+        This is used by :class:`Scheduler` to coalesce changes per target.
         """
 
         path = pathlib.Path(v).resolve() if isinstance(v, str) else v
         dispatch_kind = self.determine_dispatch_kind(path)
 
-        if dispatch_kind == "static":
-            return await self.do_static(path)
-        elif dispatch_kind == "direct":
-            return await self.do_qmd(path)
+        if dispatch_kind == "static" or dispatch_kind == "direct":
+            return {path: self.task_target(path, dispatch_kind)}
+        elif dispatch_kind == "style" and not exclude_defered:
+            out: dict[pathlib.Path, HandlerTask] = {
+                path: functools.partial(self.do_style, path)
+            }
+            for target in sorted(self.find_variants(path)):
+                out[target] = functools.partial(self.render_qmd, target, origin=path)
+
+            return out
         elif dispatch_kind == "defered" and not exclude_defered:
-            return await self.do_defered(path)
+            if self.index is not None and (targets := self.index.get_dependents(path)):
+                return {
+                    target: functools.partial(self.render_qmd, target, origin=path)
+                    for target in sorted(targets)
+                }
+            elif (tasks := self.do_defered(path)) is not None:
+                return tasks
 
-        return None
+        async def do_ignored():
+            return self.do_ignored(path, item)
 
-    def determine_dispatch_kind(
-        self, path: pathlib.Path
-    ) -> schemas.QuartoRenderKind | None:
+        return {path: do_ignored}
 
-        if os.path.isdir(path):
-            raise ValueError("Cannot handle directory.")
+    def task_target(
+        self,
+        path: pathlib.Path,
+        dispatch_kind: schemas.QuartoRenderKind,
+    ) -> HandlerTask:
+        """Task rendering (or syncing) :param:`path` itself, skipped when
+        :ivar:`manifest` has up to date output."""
 
-        # NOTE: If a qmd file was modified, then rerender the modified ``qmd``
-        #       If a watched filter (from ``--quarto-filter``) is changed, do
-        #       it for the last file.
-        # NOTE: [About template partials](https://quarto.org/docs/authoring/includes.html).
-        #       I will start all of my partials with an `_` and place them in a
-        #       ``partials`` folder.
-        is_partial = path.parent.name == "partials" and path.name.startswith("_")
-        if path.suffix == ".qmd" and not is_partial:
-            return "direct"
-        elif (
-            self.filter.filters.has_prefix(path)
-            or self.filter.assets.has_prefix(path)
-            or is_partial
-        ) and path.suffix in self.filter.suffixes_deffered:
-            return "defered"
-        elif (
-            self.filter.static.has_prefix(path)
-            and path.suffix in self.filter.suffixes_static
+        do = self.do_static if dispatch_kind == "static" else self.do_qmd
+        task: HandlerTask = functools.partial(do, path)  # type: ignore
+        if self.manifest is not None:
+            task = functools.partial(self.do_manifest, path, task, kind=dispatch_kind)
+
+        return task
+
+    def find_variants(self, path: pathlib.Path) -> set[pathlib.Path]:
+        """Documents depending on the stylesheet :param:`path` with their theme
+        set elsewhere than ``config.style_target`` (see
+        ``DependencyIndex.find_theme``), e.g. in a ``_metadata.yml``.
+
+        These link other compiled stylesheets than ``config.style_target``,
+        so :meth:`do_style` cannot update them and they are rendered instead.
+        """
+
+        if self.index is None:
+            return set()
+
+        source = self.index.find_theme(self.config.style_target)
+        return {
+            document
+            for document in self.index.get_dependents(path)
+            if self.index.find_theme(document) != source
+        }
+
+    def get_dependencies(self, path: pathlib.Path) -> set[pathlib.Path]:
+        """Dependencies of :param:`path` according to :ivar:`index`."""
+
+        if self.index is None:
+            return set()
+
+        return self.index.dependencies.get(dependencies.normalize(path), set())
+
+    def determine_dispatch_kind(
+        self, path: pathlib.Path
+    ) -> schemas.QuartoRenderKind | None:
+        """Determine how to handle changes to :param:`path` from
+        :meth:`Filter.classify`.
+
+        Since :ivar:`index` changes as documents do, it is not part of the
+        cached classification and is checked here instead.
+        """
+
+        classification = self.filter.classify(path)
+        if classification.reason == "directory":
+            raise ValueError("Cannot handle directory.")
+
+        if (
+            classification.dispatch_kind is None
+            and self.index is not None
+            and path.suffix in self.filter.suffixes_deffered
+            and self.index.has_dependents(path)
         ):
-            return "static"
+            return "style" if path.suffix in self.filter.suffixes_style else "defered"
 
-        return None
+        return classification.dispatch_kind
+
+    def publish(
+        self,
+        event: Literal["start", "line", "done"],
+        path: pathlib.Path,
+        origin: pathlib.Path,
+        **kwargs,
+    ) -> None:
+        """Publish a progress event to :ivar:`progress`, if any."""
+
+        if self.progress is None:
+            return
+
+        self.progress(
+            schemas.QuartoRenderProgress(
+                event=event,
+                target=os.path.relpath(path, env.WORKDIR),
+                origin=os.path.relpath(origin, env.WORKDIR),
+                **kwargs,
+            )
+        )
+
+    async def read_output(
+        self,
+        stream: asyncio.StreamReader,
+        callback: Callable[[str], None],
+    ) -> list[str]:
+        """Read :param:`stream` line by line as it is written, calling
+        :param:`callback` with each line. Reading as output is produced also
+        keeps the process from blocking on a full pipe.
+
+        Lines longer than the limit of :param:`stream` are truncated to it,
+        the rest of the line is discarded.
+
+        :returns: The lines read, without ANSI escapes.
+        """
+
+        lines = list()
+        truncated = False
+        while True:
+            try:
+                raw = await stream.readuntil(b"\n")
+            except asyncio.IncompleteReadError as err:
+                raw = err.partial
+            except asyncio.LimitOverrunError as err:
+                # NOTE: Keep the start of the line and skip the remainder,
+                #       which ends at the next separator.
+                raw = await stream.readexactly(err.consumed)
+                if not truncated:
+                    truncated = True
+                    line = schemas.QuartoRender.removeANSIEscape(
+                        raw.decode(errors="replace") + " [truncated]"
+                    )
+                    lines.append(line)
+                    callback(line)
+
+                continue
+
+            if not raw:
+                break
+            elif truncated:
+                truncated = False
+                continue
+
+            line = schemas.QuartoRender.removeANSIEscape(
+                raw.decode(errors="replace").rstrip("\r\n")
+            )
+            lines.append(line)
+            callback(line)
+
+        return lines
+
+    async def run_quarto(
+        self,
+        command: list[str],
+        *,
+        targets: list[pathlib.Path],
+        on_stdout: Callable[[str], None],
+        on_stderr: Callable[[str], None],
+    ) -> QuartoOutput:
+        """Run ``quarto`` and read its output as it is produced.
+
+        ``quarto`` is started in its own session, so that its process group
+        can be killed along with ``deno`` and any Jupyter kernels (see
+        :func:`kill_group`). This happens when
+
+        - the render takes longer than the sum of the timeouts of
+          :param:`targets` (see :meth:`timeout`), with status ``timeout``,
+        - the render is cancelled through :ivar:`processes`, with status
+          ``cancelled``,
+        - the calling task is cancelled, e.g. when superseded by a newer change
+          (see :class:`Scheduler`) or on shutdown, in which case
+          ``asyncio.CancelledError`` is raised again.
+
+        :returns: Lines of ``stdout`` and ``stderr``, the exit code, and the
+            status.
+        """
+
+        timeouts = [self.timeout(target) for target in targets]
+        timeout = None if None in timeouts else sum(timeouts)  # type: ignore
+
+        stdout: list[str] = list()
+        stderr: list[str] = list()
+
+        def collect(lines: list[str], callback: Callable[[str], None]):
+            def wrapper(line: str):
+                lines.append(line)
+                callback(line)
+
+            return wrapper
+
+        # NOTE: Lines may be long, e.g. minified output in tracebacks.
+        process = await asyncio.create_subprocess_shell(
+            " ".join(command),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            limit=2**20,
+            start_new_session=True,
+        )
+        reading = asyncio.gather(
+            self.read_output(process.stdout, collect(stdout, on_stdout)),  # type: ignore[arg-type]
+            self.read_output(process.stderr, collect(stderr, on_stderr)),  # type: ignore[arg-type]
+            process.wait(),
+        )
+        with self.processes.track(targets, process):
+            try:
+                done, _ = await asyncio.wait({reading}, timeout=timeout)
+                if timed_out := not done:
+                    logger.warning(
+                        "Killing `%s` after `%s` seconds.", " ".join(command), timeout
+                    )
+                    await kill_group(process)
+
+                # NOTE: Processes outside of the group could hold the pipes.
+                done, _ = await asyncio.wait({reading}, timeout=5)
+                if not done:
+                    reading.cancel()
+                elif err := reading.exception():
+                    logger.warning(
+                        "Failed to read output of `%s`: %s", " ".join(command), err
+                    )
+            except asyncio.CancelledError:
+                logger.info("Cancelled `%s`.", " ".join(command))
+                reading.cancel()
+                await kill_group(process)
+                raise
+
+            # NOTE: Reading may end before the process does, there must be an
+            #       exit code to determine the status from.
+            if process.returncode is None:
+                await kill_group(process)
+                await process.wait()
+
+            status: schemas.QuartoRenderStatus
+            if timed_out:
+                status = "timeout"
+                stderr.append(f"Killed after `{timeout}` seconds.")
+            elif process in self.processes.cancelled:
+                status = "cancelled"
+                stderr.append("Cancelled.")
+            else:
+                status = "failure" if process.returncode else "success"
+
+        return QuartoOutput(stdout, stderr, process.returncode, status)  # type: ignore[arg-type]
+
+    async def report(self, items: list[schemas.QuartoRender]) -> None:
+        """Print (when verbose) and push render results to mongodb, then
+        publish them to :ivar:`renders`.
+
+        Direct renders are also recorded in :ivar:`recent`.
+        """
+
+        for data in items:
+            if data.kind == "direct":
+                self.recent.add(data.target)
+
+        if env.VERBOSE or self.config.verbose:
+            for data in items:
+                color = "red" if data.status_code else "blue"
+                util.print_yaml(
+                    data,
+                    name="Render Result",
+                    as_json=True,
+                    rule_title=f"Render of `{data.target}` at `{data.time}` from changes in `{data.origin}`",
+                    rule_kwargs=dict(
+                        characters="=", align="center", style=f"bold {color}"
+                    ),
+                )
+
+        if self.mongo_id and items:
+            logger.debug("Pushing quarto logs document.")
+            pushed = await schemas.QuartoHistory.push(
+                self.context.db,
+                self.mongo_id,
+                [data.model_dump(mode="json") for data in items],
+            )
+            for data, item in zip(items, pushed):
+                data.run, data.index = str(item["run"]), item["index"]
+
+        # NOTE: After pushing, so that subscribers reading the history first
+        #       never miss a render.
+        if self.renders is not None:
+            for data in items:
+                self.renders(data)
 
-    # TODO: Should echo stdout when rendering. This will be helpful in for
-    #       larger projects. What I would like in the end is to have the quarto
-    #       overlay display the progress in real time using a websocket (or
-    #       possible ``HTTP`` streaming) instead of an ``HTTP`` ``POST``
-    #       request. This should be possible using ``process.communicate``.
-    #
-    #       For websockets, it would also be useful to have an event pushed for
-    #       when the render starts.
     async def render_qmd(
         self,
         path: pathlib.Path,
@@ -558,13 +1509,16 @@ class Handler:
     ) -> schemas.QuartoHandlerRender | schemas.QuartoHandlerJob:
         """Render ``qmd`` by spinning up a subprocess for ``quarto render``.
 
+        Output is read as it is produced and published to :ivar:`progress`
+        (see :meth:`run_quarto`), the full output is included in the result.
+
         When ``env.VERBOSE`` is set ``true`` (by setting the environment
         variable ``"ACEDERBERG_IO_VERBOSE`` to any value besides ``0``, this
         will pretty print the render metadata to the terminal.
 
 
         :param path: Target of ``quarto render``.
-        :param origin: Source of the render - e.g. changing a ``scss`` file
+        :param origin: Source of the render - e.g. changing a ``lua`` filter
             will result in rendering again the last file rendered.
         :returns: A ``QuartoRender`` object containing render output and
             metadata *(besides when :ivar:`context.dry_run` is ``True``,
@@ -579,7 +1533,7 @@ class Handler:
             str(path),
             "--metadata",
             f"live_file_path={path.relative_to(env.WORKDIR)}",
-            *(config := self.config).flags,
+            *self.config.flags,
         ]
         if not self.config.render:
             job = schemas.QuartoRenderJob(
@@ -589,49 +1543,157 @@ class Handler:
                 kind="direct" if path == origin else "defered",
             )
             return schemas.QuartoHandlerResult(data=job)
-        else:
-            process = await asyncio.create_subprocess_shell(
-                " ".join(command),
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
+
+        origin = origin or path
+        if self.kernels is not None:
+            command.extend(self.kernels.flags(path))
+
+        self.publish("start", path, origin)
+        time_start = time.monotonic()
+        stdout, stderr, code, status = await self.run_quarto(
+            command,
+            targets=[path],
+            on_stdout=lambda line: self.publish(
+                "line", path, origin, stream="stdout", line=line
+            ),
+            on_stderr=lambda line: self.publish(
+                "line", path, origin, stream="stderr", line=line
+            ),
+        )
+        duration = time.monotonic() - time_start
+        self.publish("done", path, origin, status_code=code)
+
+        if code:
+            logger.warning(
+                "Failed to render `%s`. Exit code `%s` (%s).", path, code, status
             )
-            await process.wait()
+        else:
+            logger.info("Rendered `%s`.", path)
+
+        data = schemas.QuartoRender.fromOutput(
+            path,
+            origin,
+            command=command,
+            stdout=stdout,
+            stderr=stderr,
+            status_code=code,
+            kind="direct" if path == origin else "defered",
+            _from=self._from,
+            duration=duration,
+            status=status,
+        )
+        await self.report([data])
 
-            if code := process.returncode:
-                logger.warning("Failed to render `%s`. Exit code `%s`.", path, code)
-            else:
-                logger.info("Rendered `%s`.", path)
+        return schemas.QuartoHandlerResult(data=data)
 
-            logger.debug("Pushing quarto logs document.")
-            data = await schemas.QuartoRender.fromProcess(
-                path,
-                origin or path,
-                process,
-                command=command,
-                kind="direct" if path == origin else "defered",
-                _from=self._from,
+    async def render_batch(
+        self, paths: list[pathlib.Path]
+    ) -> list[schemas.QuartoHandlerAny]:
+        """Render many documents from one project with a single
+        ``quarto render``, avoiding the startup cost of ``quarto`` for each.
+
+        Output and exit status are attributed to each target using
+        :class:`batch.Batch`. ``quarto`` stops at the first failure, so targets
+        after a failure are rendered in another batch.
+
+        Since ``live_file_path`` cannot be set for each document, it is not
+        provided. It is only used by the ``live`` filter in development.
+
+        :param paths: Documents to render.
+        :returns: A result for each target.
+        """
+
+        results: list[schemas.QuartoHandlerAny] = list()
+        digests: dict[pathlib.Path, str] = dict()
+        if self.manifest is not None:
+            remaining = list()
+            for path in paths:
+                digest, cached = self.check_manifest(path, kind="direct")
+                if cached is not None:
+                    results.append(cached)
+                    continue
+
+                digests[path] = digest
+                remaining.append(path)
+        else:
+            remaining = list(paths)
+
+        if not self.config.render:
+            results.extend(
+                [await self.render_qmd(path, origin=path) for path in remaining]
+            )
+            return results
+
+        while remaining:
+            logger.info("Starting render of `%s` documents.", len(remaining))
+            command = [
+                "quarto",
+                "render",
+                *(str(path) for path in remaining),
+                *self.config.flags,
+            ]
+            tracker = batch.Batch(remaining, batch.find_project(remaining[0]))
+            self.publish("start", tracker.current, tracker.current)
+
+            # NOTE: Targets are rendered one after another, so each is timed
+            #       from when the previous target finished.
+            time_start = time.monotonic()
+            durations: dict[pathlib.Path, float] = dict()
+
+            def on_line(stream: Literal["stdout", "stderr"], line: str):
+                nonlocal time_start
+
+                current = tracker.current
+                target = tracker.feed(stream, line)
+                self.publish("line", target, target, stream=stream, line=line)
+                if target in tracker.finished and target == current:
+                    durations[target] = time.monotonic() - time_start
+                    time_start = time.monotonic()
+                    self.publish("done", target, target, status_code=0)
+                    if (current := tracker.current) not in tracker.finished:
+                        self.publish("start", current, current)
+
+            _, _, code, status = await self.run_quarto(
+                command,
+                targets=list(remaining),
+                on_stdout=functools.partial(on_line, "stdout"),
+                on_stderr=functools.partial(on_line, "stderr"),
             )
 
-            if env.VERBOSE or config.verbose:
-                color = "red" if data.status_code else "blue"
-                util.print_yaml(
-                    data,
-                    name="Render Result",
-                    as_json=True,
-                    rule_title=f"Render of `{data.target}` at `{data.time}` from changes in `{data.origin}`",
-                    rule_kwargs=dict(
-                        characters="=", align="center", style=f"bold {color}"
-                    ),
+            status_codes, remaining = tracker.status_codes(code)
+            if status == "cancelled" and remaining:
+                logger.info("Not rendering `%s` cancelled targets.", len(remaining))
+                remaining = list()
+
+            items = list()
+            for path, status_code in status_codes.items():
+                duration = durations.get(path, time.monotonic() - time_start)
+                data = schemas.QuartoRender.fromOutput(
+                    path,
+                    path,
+                    command=command,
+                    stdout=tracker.stdout[path],
+                    stderr=tracker.stderr[path],
+                    status_code=status_code,
+                    kind="direct",
+                    _from=self._from,
+                    duration=duration,
+                    status=status if status_code else None,
                 )
+                if status_code:
+                    logger.warning(
+                        "Failed to render `%s`. Exit code `%s`.", path, status_code
+                    )
+                    self.publish("done", path, path, status_code=status_code)
+                elif path in digests:
+                    await self.record(path, digests[path], data)
 
-            if self.mongo_id:
-                await schemas.QuartoHistory.push(
-                    self.context.db,
-                    self.mongo_id,
-                    [data.model_dump(mode="json")],
-                )
+                items.append(data)
+
+            await self.report(items)
+            results.extend(schemas.QuartoHandlerResult(data=data) for data in items)
 
-            return schemas.QuartoHandlerResult(data=data)
+        return results
 
     async def do_qmd(
         self, path: pathlib.Path
@@ -646,51 +1708,50 @@ class Handler:
 
         return data
 
-    async def do_defered(
-        self, path: pathlib.Path
-    ) -> schemas.QuartoHandlerResult | schemas.QuartoHandlerJob | None:
+    def do_defered(self, path: pathlib.Path) -> dict[pathlib.Path, HandlerTask] | None:
         """Filters, assets, and partials will have defered changes.
 
-        In other words, the last modified qmd should be rerendered.
+        When :ivar:`index` knows of documents depending on :param:`path`, those
+        are rendered instead (see :meth:`tasks`). Otherwise the last
+        ``config.defered_count`` documents rendered (see :ivar:`recent`) should
+        be rerendered.
 
         :seealso: :meth:`render_qmd`.
 
         :param path:
-        :returns:
+        :returns: Tasks rendering these documents keyed by target, so that
+            :meth:`pool` runs them concurrently like the dependents from
+            :ivar:`index`. ``None`` when there are none.
         """
 
-        if self.mongo_id is None:
-            raise ValueError("Mongo ID is required to do defered renders.")
-
-        filters = schemas.QuartoHistoryFilters(kind=["direct"])  # type: ignore
-        history: Any = await schemas.QuartoHistory.last_rendered(
-            self.context.db, filters=filters
-        )
-
-        if history is None:
+        targets = self.recent.latest(self.config.defered_count)
+        if not targets:
             logger.info("No render to dispatch from changes in `%s`.", path)
             return None
 
-        last = history.items[0]
-        logger.info(
-            "Dispatching render of `%s` from changes in `%s`.", last.target, path
-        )
-        data = await self.render_qmd(pathlib.Path(last.target).resolve(), origin=path)
-        return data
+        out: dict[pathlib.Path, HandlerTask] = dict()
+        for target in targets:
+            logger.info(
+                "Dispatching render of `%s` from changes in `%s`.", target, path
+            )
+            out[target] = functools.partial(self.render_qmd, target, origin=path)
+
+        return out
 
     async def do_static(self, path: pathlib.Path) -> schemas.QuartoHandlerResult | None:
         """Static assets should be coppied to their respective location in
         ``build``.
 
         This is what ``quarto render`` would do too. However, ``quarto watch``
-        is insufficient in this regard.
+        is insufficient in this regard. Files are only copied when they have
+        changed, see :func:`sync.sync_file`.
 
         :param path:
         :returns:
         """
 
         path_dest = env.BUILD / os.path.relpath(path, env.BLOG)
-        command = ["cp", str(path), str(path_dest)]
+        command = ["sync", str(path), str(path_dest)]
 
         if not self.config.render:
             job = schemas.QuartoRenderJob(  # type: ignore
@@ -700,196 +1761,962 @@ class Handler:
                 target=str(path),
             )
             return schemas.QuartoHandlerResult(data=job)
+
+        logger.info("Syncing `%s` to `%s`.", path, path_dest)
+        stdout, stderr, status_code = list(), list(), 0
+        time_start = time.monotonic()
+        try:
+            item = await asyncio.to_thread(sync.sync_file, path, path_dest)
+            stdout.append(str(item))
+        except OSError as err:
+            logger.warning("Failed to sync `%s`: %s", path, err)
+            stderr.append(str(err))
+            status_code = 1
+
+        data = schemas.QuartoRender.fromOutput(
+            path,
+            path_dest,
+            command=command,
+            stdout=stdout,
+            stderr=stderr,
+            status_code=status_code,
+            kind="static",
+            _from=self._from,
+            duration=time.monotonic() - time_start,
+        )
+        await self.report([data])
+
+        return schemas.QuartoHandlerResult(data=data)
+
+    async def do_style(self, path: pathlib.Path) -> schemas.QuartoHandlerResult:
+        """Stylesheets are part of the theme of every document, so rendering
+        their dependents would render the entire site.
+
+        Instead, ``config.style_target`` is rendered into a scratch directory
+        without executing code and only the compiled stylesheets are synced
+        into ``build/site_libs`` (see :func:`sync.sync_stylesheets`). Only
+        the stylesheets linked by the previous output of
+        ``config.style_target`` are replaced, documents with other themes are
+        rendered instead (see :meth:`find_variants`). Live pages swap their
+        stylesheets when they recieve the result instead of reloading, see
+        ``blog/js/live/quarto.js``.
+
+        :param path: The changed stylesheet.
+        :returns: The result, with :param:`path` as its target.
+        """
+
+        if not self.config.render:
+            job = schemas.QuartoRenderJob(  # type: ignore
+                item_from=self._from,
+                kind="style",
+                origin=str(path),
+                target=str(path),
+            )
+            return schemas.QuartoHandlerResult(data=job)
+
+        # NOTE: ``.quarto`` is ignored by the watcher and ``quarto`` expects
+        #       the output directory to be within the project.
+        scratch = env.BLOG / ".quarto"
+        scratch.mkdir(exist_ok=True)
+
+        # NOTE: Read before rendering, in case it is rendered concurrently.
+        output = manifest.find_output(self.config.style_target)
+        linked = sync.find_stylesheets(output) if output is not None else set()
+
+        logger.info("Compiling stylesheets from changes in `%s`.", path)
+        self.publish("start", path, path)
+        time_start = time.monotonic()
+        with tempfile.TemporaryDirectory(prefix="style-", dir=scratch) as directory:
+            command = [
+                "quarto",
+                "render",
+                str(self.config.style_target),
+                "--no-execute",
+                "--output-dir",
+                directory,
+                *self.config.flags,
+            ]
+            stdout, stderr, code, status = await self.run_quarto(
+                command,
+                targets=[path],
+                on_stdout=lambda line: self.publish(
+                    "line", path, path, stream="stdout", line=line
+                ),
+                on_stderr=lambda line: self.publish(
+                    "line", path, path, stream="stderr", line=line
+                ),
+            )
+            if not code:
+                try:
+                    items = await asyncio.to_thread(
+                        sync.sync_stylesheets,
+                        pathlib.Path(directory) / "site_libs",
+                        env.BUILD / "site_libs",
+                        linked,
+                    )
+                    stdout.extend(str(item) for item in items)
+                except OSError as err:
+                    logger.warning("Failed to sync stylesheets: %s", err)
+                    stderr.append(str(err))
+                    code, status = 1, "failure"
+
+        duration = time.monotonic() - time_start
+        self.publish("done", path, path, status_code=code)
+
+        data = schemas.QuartoRender.fromOutput(
+            path,
+            path,
+            command=command,
+            stdout=stdout,
+            stderr=stderr,
+            status_code=code,
+            kind="style",
+            _from=self._from,
+            duration=duration,
+            status=status,
+        )
+        await self.report([data])
+
+        return schemas.QuartoHandlerResult(data=data)
+
+    def check_manifest(
+        self,
+        path: pathlib.Path,
+        *,
+        kind: schemas.QuartoRenderKind,
+    ) -> tuple[str, schemas.QuartoHandlerCached | None]:
+        """Compute the digest of :param:`path` and check it against
+        :ivar:`manifest`.
+
+        :param path: Render target.
+        :param kind: Dispatch kind of :param:`path`.
+        :returns: The digest and, when the output is up to date and not
+            :ivar:`force`, a result reporting that the render was skipped.
+        """
+
+        if self.manifest is None:
+            raise ValueError("Manifest is required to check targets.")
+
+        digest = self.manifest.digest(
+            path, self.get_dependencies(path), *self.config.flags
+        )
+        if self.force or not self.manifest.is_fresh(path, digest):
+            return digest, None
+
+        logger.info("Output of `%s` is up to date.", path)
+        relpath = self.manifest.key(path)
+        cached = schemas.QuartoRenderCached(
+            item_from=self._from,
+            kind=kind,
+            origin=relpath,
+            target=relpath,
+            digest=digest,
+            output=self.manifest.items[relpath].output,
+        )
+        return digest, schemas.QuartoHandlerCached(data=cached)
+
+    async def do_manifest(
+        self,
+        path: pathlib.Path,
+        task: HandlerTask,
+        *,
+        kind: schemas.QuartoRenderKind,
+    ) -> schemas.QuartoHandlerAny:
+        """Run :param:`task` unless :ivar:`manifest` has up to date output for
+        :param:`path`. Successful renders are recorded in the manifest.
+
+        :param path: Render target.
+        :param task: Task rendering :param:`path`.
+        :param kind: Dispatch kind of :param:`path`.
+        """
+
+        if self.manifest is None:
+            return await task()  # type: ignore[return-value]
+
+        digest, cached = self.check_manifest(path, kind=kind)
+        if cached is not None:
+            return cached
+
+        data: Any = await task()
+        if data.kind == "render" and not data.data.status_code:
+            await self.record(path, digest, data.data)
+
+        return data
+
+    async def record(
+        self,
+        path: pathlib.Path,
+        digest: str,
+        data: schemas.QuartoRenderMinimal,
+    ) -> None:
+        """Record a successful render of :param:`path` in :ivar:`manifest`
+        and upload its outputs to :ivar:`artifacts`.
+
+        :param digest: From :meth:`check_manifest`.
+        :param data: Result of the render. Marked as an artifact miss when
+            :ivar:`artifacts` is used.
+        """
+
+        if self.manifest is not None:
+            self.manifest.update(path, digest, duration=data.duration)
+
+        if self.artifacts is not None and data.kind == "direct":
+            data.artifact = "miss"
+            await asyncio.to_thread(self.artifacts.upload, path, digest)
+
+    def restore(
+        self, jobs: Iterable[schemas.QuartoRenderJob]
+    ) -> list[schemas.QuartoRenderJob]:
+        """Restore the outputs of planned renders from :ivar:`artifacts`.
+
+        :param jobs: Jobs from :meth:`plan`.
+        Outputs shared by every page (e.g. ``site_libs`` and ``search.json``)
+        are restored first when missing, see ``artifacts.find_shared``.
+
+        :returns: :param:`jobs`, with those restored replaced by cached
+            results like those of targets up to date in :ivar:`manifest`.
+            Nothing is restored when :ivar:`force` is set.
+        """
+
+        if self.artifacts is None or self.manifest is None or self.force:
+            return list(jobs)
+
+        if not artifacts.find_shared():
+            self.artifacts.restore_shared()
+
+        out: list[schemas.QuartoRenderJob] = list()
+        for job in jobs:
+            if isinstance(job, schemas.QuartoRenderCached) or job.kind != "direct":
+                out.append(job)
+                continue
+
+            path = env.WORKDIR / job.target
+            digest, _ = self.check_manifest(path, kind="direct")
+            if not self.artifacts.restore(path, digest):
+                out.append(job)
+                continue
+
+            previous = self.manifest.items.get(job.target)
+            item = self.manifest.update(
+                path, digest, duration=previous.duration if previous else None
+            )
+            cached = schemas.QuartoRenderCached(
+                item_from=job.item_from,
+                kind="direct",
+                origin=job.origin,
+                target=job.target,
+                digest=digest,
+                output=item.output,
+                artifact="hit",
+            )
+            out.append(cached)
+
+        return out
+
+    async def do_directory(
+        self,
+        directory: str | pathlib.Path,
+        *,
+        depth_max: int = 5,
+    ) -> AsyncGenerator[schemas.QuartoHandlerAny, None]:
+        """Render a directory using quarto.
+
+        Renders are dispatched using :meth:`pool`, so up to
+        ``config.jobs`` targets are rendered at once.
+
+        :param directory:
+        :param depth_max:
+        :returns: An async generator yielding render results for each target
+            rendered in the order that they complete.
+        """
+        directory = self.validate_directory(directory)
+        tasks = self.tasks_directory(directory, depth_max=depth_max)
+        async for data in self.pool(tasks):
+            yield data
+
+    def tasks_directory(
+        self,
+        directory: pathlib.Path,
+        *,
+        depth_max: int = 5,
+    ) -> Iterator[HandlerTask]:
+        """Tasks to render the contents of :param:`directory`.
+
+        When ``config.batch`` is more than one, documents from the same project
+        are rendered together using :meth:`render_batch`.
+        """
+
+        return self.tasks_paths(self.walk(directory, depth_max=depth_max))
+
+    def tasks_paths(self, paths: Iterable[pathlib.Path]) -> Iterator[HandlerTask]:
+        """Tasks to render :param:`paths` without their defered renders, in
+        batches like :meth:`tasks_directory`."""
+
+        if (size := self.config.batch) <= 1:
+            for path in paths:
+                yield from self.tasks(path, exclude_defered=True)
+
+            return
+
+        batches: dict[pathlib.Path | None, list[pathlib.Path]] = dict()
+        for path in paths:
+            if self.determine_dispatch_kind(path) != "direct":
+                yield from self.tasks(path, exclude_defered=True)
+                continue
+
+            project = batch.find_project(path)
+            batches.setdefault(project, list()).append(path)
+            if len(batches[project]) >= size:
+                yield functools.partial(self.render_batch, batches.pop(project))
+
+        for paths_batch in batches.values():
+            yield functools.partial(self.render_batch, paths_batch)
+
+    def validate_directory(self, directory: str | pathlib.Path) -> pathlib.Path:
+        directory = pathlib.Path(directory) if isinstance(directory, str) else directory
+        directory = directory.resolve()
+        if not os.path.isdir(directory):
+            raise ValueError(f"No such directory `{directory}`.")
+
+        return directory
+
+    def glob(self, pattern: str, *, depth_max: int = 5) -> Iterator[pathlib.Path]:
+        """Find render targets matching :param:`pattern`, relative to
+        ``env.WORKDIR``. Matched directories are walked, see :meth:`walk`."""
+
+        for path in sorted(env.WORKDIR.glob(pattern)):
+            if not self.filter.ignore.has_prefix(path):
+                yield from self.walk(path, depth_max=depth_max)
+
+    def find_paths(
+        self, item: schemas.QuartoRenderRequestItem
+    ) -> Iterator[pathlib.Path]:
+        """Find the render targets of :param:`item`, ignoring ``since``."""
+
+        if item.kind == "file":
+            yield env.WORKDIR / item.path
+        elif item.kind == "glob":
+            yield from self.glob(item.path, depth_max=item.directory_depth_max)
         else:
-            logger.info("Copying `%s` to `%s`.", path, path_dest)
-            process = await asyncio.create_subprocess_shell(
-                " ".join(command),
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
+            directory = self.validate_directory(item.path)
+            yield from self.walk(directory, depth_max=item.directory_depth_max)
+
+    def find_targets(self, item: schemas.QuartoRenderRequestItem) -> list[pathlib.Path]:
+        """Find the render targets of :param:`item`. With ``item.since``, only
+        those that changed since (see :func:`changed.find_changed`) or that
+        depend on changed files according to :ivar:`index`.
+
+        When there is no :ivar:`index`, one is built for the blog.
+
+        :throws ValueError: When ``item.since`` is not a git ref.
+        """
+
+        if item.since is None:
+            return list(self.find_paths(item))
+
+        index = self.index
+        if index is None:
+            index = dependencies.DependencyIndex.fromDirectory(
+                env.BLOG, is_ignored=self.filter.ignore.has_prefix
             )
-            await process.wait()
-            data = await schemas.QuartoRender.fromProcess(
-                path,
-                path_dest,
-                process,
-                command=command,
-                kind="static",
-                _from=self._from,
+
+        paths = set(self.find_paths(item))
+        out: dict[pathlib.Path, None] = dict()
+        for path in changed.find_changed(item.since):
+            if path in paths:
+                out[path] = None
+
+            for dependent in sorted(index.get_dependents(path)):
+                if dependent in paths:
+                    out[dependent] = None
+
+        logger.info(
+            "Found `%s` targets in `%s` changed since `%s`.",
+            len(out),
+            item.path,
+            item.since,
+        )
+        return list(out)
+
+    def walk(
+        self,
+        path: pathlib.Path | str,
+        *,
+        depth_max: int = 5,
+    ) -> Iterator[pathlib.Path]:
+        """Find render targets in :param:`path` lazily.
+
+        Directories are walked iteratively using ``os.scandir`` so that the
+        type of each entry comes from the directory listing. Directories
+        matched by ``filter.ignore`` (e.g. ``_freeze``, ``site_libs`` or
+        ``.quarto``) are pruned without being listed.
+
+        :param depth_max: Maximum depth of directories below :param:`path` to
+            descend into. Files directly in :param:`path` are at depth ``0``.
+        :returns: Files that are not ignored, starting with those in
+            :param:`path`, yielded as they are found.
+        """
+
+        if isinstance(path, str):
+            path = pathlib.Path(path).resolve()
+
+        if not os.path.isdir(path):
+            if not self.filter.classify(path).ignored:
+                yield path
+            return
+
+        stack: list[tuple[pathlib.Path, int]] = [(path, 0)]
+        while stack:
+            directory, depth = stack.pop()
+            try:
+                with os.scandir(directory) as it:
+                    entries = sorted(it, key=lambda entry: entry.name)
+            except OSError as err:
+                logger.warning("Could not list `%s`: %s", directory, err)
+                continue
+
+            directories = list()
+            for entry in entries:
+                item = directory / entry.name
+                if entry.is_dir():
+                    if depth < depth_max and not self.filter.ignore.has_prefix(item):
+                        directories.append(item)
+                elif entry.is_file() and not self.filter.classify(item).ignored:
+                    yield item
+
+            # NOTE: Reversed so that directories are popped in order.
+            stack.extend((item, depth + 1) for item in reversed(directories))
+
+    def do_ignored(
+        self,
+        path: pathlib.Path,
+        item: schemas.QuartoRenderRequestItem | None = None,
+    ) -> schemas.QuartoHandlerRequest:
+        """Report that nothing is to be done for :param:`path`."""
+
+        if item is None:
+            item = schemas.QuartoRenderRequestItem(  # type: ignore
+                path=str(path.relative_to(env.WORKDIR)),
+                kind="file",
+            )
+
+        return schemas.QuartoHandlerRequest(data=item)
+
+    @staticmethod
+    def is_failure(data: schemas.QuartoHandlerAny) -> bool:
+        if data.kind == "request" or data.kind == "job" or data.kind == "cached":
+            return False
+
+        return bool(data.data.status_code)  # type: ignore
+
+    async def pool(
+        self,
+        tasks: Iterable[HandlerTask],
+        *,
+        exit_on_failure: bool = False,
+    ) -> AsyncGenerator[schemas.QuartoHandlerAny, None]:
+        """Run :param:`tasks` with at most ``config.jobs`` in flight.
+
+        Tasks are pulled from :param:`tasks` lazily, so a directory walk may
+        still be running while the first renders are. Results are yielded in
+        the order that they complete, batches (see :meth:`render_batch`)
+        yield a result for each of their targets.
+
+        :param tasks: Callables returning the awaitable to run.
+        :param exit_on_failure: Stop starting new tasks and cancel those in
+            flight once a render fails.
+        """
+
+        iter_tasks = iter(tasks)
+        pending: set[asyncio.Future] = set()
+
+        def fill() -> None:
+            while len(pending) < self.config.jobs:
+                if (task := next(iter_tasks, None)) is None:
+                    return
+
+                pending.add(asyncio.ensure_future(task()))
+
+        try:
+            fill()
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                pending.difference_update(done)
+                for future in done:
+                    result = future.result()
+                    for data in result if isinstance(result, list) else (result,):
+                        yield data
+                        if exit_on_failure and self.is_failure(data):
+                            logger.warning(
+                                "Render failed, not dispatching more renders."
+                            )
+                            return
+
+                fill()
+        finally:
+            for future in pending:
+                future.cancel()
+
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    # TODO: It would make more sense for this to be under ``__call__``.
+    async def render(
+        self,
+        render_data: schemas.QuartoRenderRequest,
+    ) -> AsyncGenerator[schemas.QuartoHandlerAny, None]:
+        """
+        Process :param:`render_data` using :meth:`pool`.
+
+        File items and the targets of directory and glob items are rendered
+        concurrently, up to ``config.jobs`` at once.
+
+        :param render_data: Render request data.
+        """
+
+        def iter_tasks() -> Iterator[HandlerTask]:
+            for item in render_data.items:
+                if item.kind == "file" and item.since is None:
+                    yield from self.tasks(item.path, item=item)
+                    continue
+
+                # NOTE: When render request items are emitted, then an item
+                #       falied to render.
+                yield from self.tasks_paths(self.find_targets(item))
+
+        async for data in self.pool(
+            iter_tasks(), exit_on_failure=render_data.exit_on_failure
+        ):
+            yield data
+
+    def plan(
+        self,
+        render_data: schemas.QuartoRenderRequest,
+    ) -> list[schemas.QuartoRenderJob]:
+        """Determine every job required by :param:`render_data` without
+        running any of them. Use :meth:`execute` to run the plan.
+
+        Unlike :meth:`render`, the whole request is walked up front so that
+        the amount of work is known before rendering starts, e.g. for a
+        progress bar.
+
+        :param render_data: Render request data.
+        :returns: Jobs in the order that they were found. Targets with up to
+            date output in :ivar:`manifest` are included as
+            ``QuartoRenderCached``.
+        """
+
+        jobs: dict[str, schemas.QuartoRenderJob] = dict()
+        for item in render_data.items:
+            exclude_defered = item.kind != "file" or item.since is not None
+            for path in self.find_targets(item):
+                for job in self.plan_path(path, exclude_defered=exclude_defered):
+                    jobs.setdefault(job.target, job)
+
+        return list(jobs.values())
+
+    def plan_path(
+        self,
+        path: pathlib.Path,
+        *,
+        exclude_defered: bool = False,
+    ) -> list[schemas.QuartoRenderJob]:
+        """Like :meth:`targets`, but returns jobs instead of tasks.
+
+        Defered changes can only be planned using :ivar:`index`, otherwise
+        their target is only known from the render history once they run.
+        These and ignored paths result in no jobs. Stylesheets are planned as
+        a single ``style`` job, see :meth:`do_style`.
+        """
+
+        dispatch_kind = self.determine_dispatch_kind(path)
+        relpath = os.path.relpath(path, env.WORKDIR)
+        if dispatch_kind == "static" or dispatch_kind == "direct":
+            if self.manifest is not None:
+                _, cached = self.check_manifest(path, kind=dispatch_kind)
+                if cached is not None:
+                    return [cached.data]
+
+            job = schemas.QuartoRenderJob(
+                item_from=self._from,
+                kind=dispatch_kind,
+                origin=relpath,
+                target=relpath,
+            )
+            return [job]
+        elif dispatch_kind == "style" and not exclude_defered:
+            job = schemas.QuartoRenderJob(
+                item_from=self._from,
+                kind="style",
+                origin=relpath,
+                target=relpath,
             )
-
-            if self.mongo_id is not None:
-                await schemas.QuartoHistory.push(
-                    self.context.db,
-                    self.mongo_id,
-                    [data.model_dump(mode="json")],
+            return [job]
+        elif (
+            dispatch_kind == "defered"
+            and not exclude_defered
+            and self.index is not None
+        ):
+            return [
+                schemas.QuartoRenderJob(
+                    item_from=self._from,
+                    kind="defered",
+                    origin=relpath,
+                    target=os.path.relpath(target, env.WORKDIR),
                 )
+                for target in sorted(self.index.get_dependents(path))
+            ]
 
-            return schemas.QuartoHandlerResult(data=data)
+        logger.debug("No jobs planned for `%s`.", path)
+        return list()
 
-    async def do_directory(
+    async def execute(
         self,
-        directory: str | pathlib.Path,
+        jobs: Iterable[schemas.QuartoRenderJob],
         *,
-        depth_max: int = 5,
+        exit_on_failure: bool = False,
     ) -> AsyncGenerator[schemas.QuartoHandlerAny, None]:
-        """Render a directory using quarto.
+        """Run jobs from :meth:`plan` using :meth:`pool`.
 
-        :param directory:
-        :param depth_max:
-        :returns: An async generator yielding render results for each target rendered.
+        Jobs that :meth:`plan` found to be up to date are yielded first and
+        as they are.
+
+        :param jobs: Jobs from :meth:`plan`.
+        :param exit_on_failure: See :meth:`pool`.
         """
-        directory = pathlib.Path(directory) if isinstance(directory, str) else directory
-        directory = directory.resolve()
-        if not os.path.isdir(directory):
-            raise ValueError(f"No such directory `{directory}`.")
 
-        for item in self.walk(directory, depth_max=depth_max):
-            if (res := await self(item, exclude_defered=True)) is None:
-                _ = schemas.QuartoRenderRequestItem(  # type: ignore
-                    path=str(item.relative_to(env.WORKDIR)),
-                    kind="file",
-                )
-                yield schemas.QuartoHandlerRequest(data=_)
-                continue
+        pending = list()
+        for job in jobs:
+            if isinstance(job, schemas.QuartoRenderCached):
+                yield schemas.QuartoHandlerCached(data=job)
+            else:
+                pending.append(job)
 
-            yield res
+        tasks = self.tasks_jobs(pending)
+        async for data in self.pool(tasks, exit_on_failure=exit_on_failure):
+            yield data
 
-    def walk(
+    def tasks_jobs(
         self,
-        path: pathlib.Path | str,
-        *,
-        depth: int = 0,
-        # items: int = 0,
-        depth_max: int = 5,
-        # max_items: int = 100,
-    ) -> Iterator[pathlib.Path]:
+        jobs: Iterable[schemas.QuartoRenderJob],
+    ) -> Iterator[HandlerTask]:
+        """Tasks to run :param:`jobs`.
+
+        When ``config.batch`` is more than one, direct jobs from the same
+        project are rendered together as in :meth:`tasks_directory`. Tasks
+        are ordered longest first according to the durations recorded in
+        :ivar:`manifest`, see :class:`Estimate`, after those of targets open
+        in the browser (see :meth:`priority`).
+        """
 
-        if isinstance(path, str):
-            path = pathlib.Path(path).resolve()
+        jobs = list(jobs)
+        durations = self.manifest.durations() if self.manifest is not None else {}
+        estimates = Estimate(jobs, durations).estimates
+
+        size = self.config.batch
+        tasks: list[tuple[int, float, HandlerTask]] = list()
+        batches: dict[pathlib.Path | None, list[pathlib.Path]] = dict()
+        for job in jobs:
+            target = env.WORKDIR / job.target
+            key = (self.priority(target), estimates[job.target])
+            if job.kind == "defered":
+                origin = env.WORKDIR / job.origin
+                task = functools.partial(self.render_qmd, target, origin=origin)
+                tasks.append((*key, task))  # type: ignore[arg-type]
+            elif job.kind == "style":
+                tasks.append((*key, functools.partial(self.do_style, target)))
+            elif job.kind == "direct" and size > 1:
+                batches.setdefault(batch.find_project(target), list()).append(target)
+            else:
+                tasks.append((*key, self.task_target(target, job.kind)))
 
-        if depth > depth_max:
-            return
+        def estimate_path(path: pathlib.Path) -> float:
+            return estimates[os.path.relpath(path, env.WORKDIR)]
 
-        path = path.resolve()
-        if path.suffix.startswith("_"):
-            return
+        for paths in batches.values():
+            paths.sort(key=lambda path: (self.priority(path), -estimate_path(path)))
+            for start in range(0, len(paths), size):
+                chunk = paths[start : start + size]
+                task = functools.partial(self.render_batch, chunk)
+                priority = min(map(self.priority, chunk))
+                tasks.append((priority, sum(map(estimate_path, chunk)), task))  # type: ignore
 
-        if os.path.isdir(path):
-            for item in os.listdir(path):
-                yield from self.walk(path / item, depth=depth, depth_max=depth_max + 1)
+        # NOTE: Longest processing time first, so that slow renders (e.g.
+        #       notebooks) do not start last and leave the other workers idle.
+        #       The sort is stable, so without history the order is kept.
+        tasks.sort(key=lambda item: (item[0], -item[1]))
+        for _, _, task in tasks:
+            yield task
 
-            return
 
-        is_ignored, _ = self.filter.is_ignored(path)
-        if os.path.isfile(path) and not is_ignored:
-            yield path
+class Scheduler:
+    """Coalesce changes per render target before dispatching them to
+    :class:`Handler`.
+
+    Changes are collected for ``config.watch.debounce`` seconds after the last
+    change to a target, so that a burst of writes (e.g. saving and then
+    formatting a document) results in a single render. Each target has at
+    most one pending render. A change to a target that is already rendering
+    cancels that render, since its output is about to be replaced anyway.
+
+    At most ``config.handler.jobs`` renders run at once. When more are due,
+    those of targets open in the browser start first (see
+    :meth:`Handler.priority`), then the rest in the order they became due.
+
+    :ivar handler: Handler used to determine and run renders.
+    :ivar debounce: Seconds to wait for further changes to a target.
+    :ivar pending: Latest task for each target waiting on its deadline.
+    :ivar deadlines: When the pending task of each target is to start.
+    :ivar running: Renders in flight by target.
+    :ivar waiting: Renders waiting for a slot, see :meth:`slot`.
+    """
 
-        return
+    handler: Handler
+    debounce: float
+    pending: dict[pathlib.Path, HandlerTask]
+    deadlines: dict[pathlib.Path, float]
+    running: dict[pathlib.Path, asyncio.Task]
+    waiting: list[tuple[int, pathlib.Path, asyncio.Future]]
 
-    # TODO: It would make more sense for this to be under ``__call__``.
-    async def render(
-        self,
-        render_data: schemas.QuartoRenderRequest,
-        # *,
-        # callback: (
-        #     Callable[
-        #         [schemas.QuartoRender, schemas.QuartoRenderRequestItem],
-        #         Awaitable[None],
-        #     ]
-        #     | None
-        # ) = None,
-        # T: Type[schemas.T_QuartoRenderResponseItem] = schemas.QuartoRender,
-    ) -> AsyncGenerator[schemas.QuartoHandlerAny, None]:
+    _slots: int
+    _count: Iterator[int]
+    _wake: asyncio.Event
+
+    def __init__(self, handler: Handler, *, debounce: float | None = None):
+        self.handler = handler
+        if debounce is None:
+            debounce = handler.context.config.watch.debounce
+
+        self.debounce = debounce
+        self.pending = dict()
+        self.deadlines = dict()
+        self.running = dict()
+        self.waiting = list()
+
+        self._slots = handler.config.jobs
+        self._count = itertools.count()
+        self._wake = asyncio.Event()
+
+    def schedule(self, v: str | pathlib.Path) -> set[pathlib.Path]:
+        """Schedule the renders required by changes in :param:`v`.
+
+        :returns: The targets scheduled.
         """
-        Process :param:`render_data` and execute the callback.
 
-        While the callback is not a pattern I like in python, it would be a
-        mess to do this using async generators.
+        deadline = asyncio.get_running_loop().time() + self.debounce
+        targets = self.handler.targets(v)
+        for target, task in targets.items():
+            self.pending[target] = task
+            self.deadlines[target] = deadline
 
-        :param render_data: Render request data.
-        :param callback: Optional callback.
+            running = self.running.get(target)
+            if running is not None and not running.done():
+                logger.info("Cancelling superseded render of `%s`.", target)
+                running.cancel()
+
+        self._wake.set()
+        return set(targets)
+
+    def start_due(self) -> float | None:
+        """Start renders whose deadline has passed.
+
+        :returns: Seconds until the next deadline, if there is one.
         """
 
-        def resolve(
-            data: schemas.QuartoHandlerAny | None, item: schemas.QuartoRenderRequestItem
-        ) -> schemas.QuartoHandlerAny:
-            return data if data is not None else schemas.QuartoHandlerRequest(data=item)
+        now = asyncio.get_running_loop().time()
+        for target, deadline in tuple(self.deadlines.items()):
+            if deadline > now:
+                continue
 
-        def do_break(data: schemas.QuartoHandlerAny):
-            if data.kind == "request" or data.kind == "job":
-                return False
+            del self.deadlines[target]
+            task = self.pending.pop(target)
+            previous = self.running.get(target)
+            self.running[target] = asyncio.create_task(
+                self.dispatch(target, task, previous)
+            )
 
-            if data.data.status_code and render_data.exit_on_failure:  # type: ignore
-                return True
+        if not self.deadlines:
+            return None
 
-            return False
+        return min(self.deadlines.values()) - now
 
-        # TODO: Could be dryer.
-        data: schemas.QuartoHandlerAny
-        item: schemas.QuartoRenderRequestItem
-        for item in render_data.items:
-            if item.kind == "file":
-                yield (data := resolve(await self(item.path), item))
-                # if data is None:
-                #     yield
-                #     ignored.append(item)
-                #     continue
-                #
-                # items.append(data)
-                # if callback:
-                #     await callback(data, item)
-
-                if do_break(data):
-                    break
-            else:
-                # NOTE: When render request items are emitted, then an item
-                #       falied to render.
-                iter_directory = self.do_directory(
-                    item.path,
-                    depth_max=item.directory_depth_max,
-                )
-                async for data in iter_directory:
-                    yield (data := resolve(data, item))
+    def release(self) -> None:
+        """Hand a render slot to the waiting render that goes first, or free
+        it when none are waiting."""
 
-                    # if isinstance(data, schemas.QuartoRenderRequestItem):
-                    #     ignored.append(data)
-                    #     continue
-                    # items.append(data)
-                    # if callback:
-                    #     await callback(data, item)
+        while self.waiting:
+            item = min(
+                self.waiting,
+                key=lambda item: (self.handler.priority(item[1]), item[0]),
+            )
+            self.waiting.remove(item)
 
-                    if do_break(data):
-                        break
+            # NOTE: Renders cancelled while waiting are removed from
+            #       ``waiting`` only once their task runs again.
+            if item[2].done():
+                continue
 
-        # NOTE: Directory items
-        # return schemas.QuartoRenderResponse[schemas.QuartoRender](
-        #     uuid_uvicorn=env.RUN_UUID,
-        #     items=items,
-        #     ignored=ignored,
-        # )
+            item[2].set_result(None)
+            return
+
+        self._slots += 1
+
+    @contextlib.asynccontextmanager
+    async def slot(self, target: pathlib.Path) -> AsyncGenerator[None, None]:
+        """Wait for a render slot for :param:`target`.
+
+        Priorities are checked when a slot frees up rather than when the
+        render starts waiting, since tabs may open while it waits.
+        """
+
+        if self._slots and not self.waiting:
+            self._slots -= 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            item = (next(self._count), target, future)
+            self.waiting.append(item)
+            try:
+                await future
+            except asyncio.CancelledError:
+                # NOTE: Pass on the slot when cancelled after recieving it.
+                if item in self.waiting:
+                    self.waiting.remove(item)
+                elif not future.cancelled():
+                    self.release()
+                raise
+
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def dispatch(
+        self,
+        target: pathlib.Path,
+        task: HandlerTask,
+        previous: asyncio.Task | None,
+    ) -> schemas.QuartoHandlerAny | None:
+
+        try:
+            # NOTE: Wait for a cancelled render to clean up before starting
+            #       another render of the same target.
+            if previous is not None:
+                await asyncio.gather(previous, return_exceptions=True)
+
+            async with self.slot(target):
+                return await task()
+        except asyncio.CancelledError:
+            raise
+        except Exception as err:
+            logger.exception("Render of `%s` failed: %s", target, err)
+            return None
+        finally:
+            if self.running.get(target) is asyncio.current_task():
+                del self.running[target]
+
+    async def __call__(self) -> None:
+        """Start renders as their deadlines pass. Runs until cancelled, at
+        which point renders in flight are cancelled too."""
+
+        try:
+            while True:
+                self._wake.clear()
+                timeout = self.start_due()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout)
+                except asyncio.TimeoutError:
+                    continue
+        finally:
+            for task in self.running.values():
+                task.cancel()
+
+            if self.running:
+                await asyncio.gather(*self.running.values(), return_exceptions=True)
 
 
 class Watch:
     """Watch for changes to quarto documents and their dependencies using
     :class:`Filter` - dispatch renders for these changes using
-    :class:`Handler`.
+    :class:`Handler` through :class:`Scheduler`.
 
     :ivar context: Shared configuration for :ivar:`handler` and ivar:`filter`.
     :ivar filter: Filter instance configured by :ivar:`context`.
     :ivar handler: Handler configured by :ivar:`context`.
     :ivar include_mongo: Enable or disable pushing render metadata to mongodb.
+    :ivar index: Dependency index for :ivar:`handler`. This is kept up to date
+        as changes are noticed.
+    :ivar manifest: Optional build manifest for :ivar:`handler`.
+    :ivar force: Ignore freshness in :ivar:`manifest`, see ``Handler.force``.
+    :ivar progress: Optional progress callback for :ivar:`handler`.
+    :ivar renders: Optional completed renders callback for :ivar:`handler`.
+    :ivar kernels: Optional kernel tracking for :ivar:`handler`.
+    :ivar artifacts: Optional artifact cache for :ivar:`handler`.
+    :ivar viewers: Optional viewed targets for :ivar:`handler`.
+    :ivar recent: Recently rendered targets for :ivar:`handler`, seeded from
+        the render history when :ivar:`include_mongo`.
+    :ivar processes: Running ``quarto`` processes of :ivar:`handler`. Renders
+        in flight are killed when the watch stops.
+    :ivar roots: Directories currently watched, see :meth:`find_roots`.
     """
 
     context: Context
     filter: Filter
     handler: Handler | None
     include_mongo: bool
+    index: dependencies.DependencyIndex | None
+    manifest: manifest.Manifest | None
+    force: bool
+    progress: HandlerProgress | None
+    renders: HandlerRenders | None
+    kernels: kernels.Kernels | None
+    artifacts: artifacts.Artifacts | None
+    viewers: Viewers | None
+    recent: Recent
+    processes: Processes
+    roots: Roots | None
 
-    def __init__(self, context: Context | None = None, include_mongo: bool = True):
+    def __init__(
+        self,
+        context: Context | None = None,
+        include_mongo: bool = True,
+        *,
+        manifest: manifest.Manifest | None = None,
+        force: bool = False,
+        progress: HandlerProgress | None = None,
+        renders: HandlerRenders | None = None,
+        kernels: kernels.Kernels | None = None,
+        artifacts: artifacts.Artifacts | None = None,
+        viewers: Viewers | None = None,
+        recent: Recent | None = None,
+        processes: Processes | None = None,
+    ):
         self.context = context or Context()
         self.filter = Filter(self.context)
         self.handler = None
         self.include_mongo = include_mongo
+        self.index = None
+        self.manifest = manifest
+        self.force = force
+        self.progress = progress
+        self.renders = renders
+        self.kernels = kernels
+        self.artifacts = artifacts
+        self.viewers = viewers
+        self.recent = recent if recent is not None else Recent()
+        self.processes = processes if processes is not None else Processes()
+        self.roots = None
+
+    def get_index(self) -> dependencies.DependencyIndex:
+        if self.index is None:
+            # NOTE: Not bound to the matcher, it is replaced by reloads.
+            self.index = dependencies.DependencyIndex.fromDirectory(
+                env.BLOG,
+                is_ignored=lambda path: self.filter.ignore.has_prefix(path),
+            )
+
+        return self.index
 
     async def get_handler(self) -> Handler:
         if self.handler is None:
@@ -898,13 +2725,201 @@ class Watch:
                 mongo_id = (
                     await schemas.QuartoHistory.spawn(self.context.db)
                 ).inserted_id
+                await self.recent.seed(self.context.db)
 
             self.handler = Handler(
-                self.context, self.filter, mongo_id=mongo_id, _from="lifespan"
+                self.context,
+                self.filter,
+                mongo_id=mongo_id,
+                _from="lifespan",
+                index=self.get_index(),
+                manifest=self.manifest,
+                force=self.force,
+                progress=self.progress,
+                renders=self.renders,
+                kernels=self.kernels,
+                artifacts=self.artifacts,
+                viewers=self.viewers,
+                recent=self.recent,
+                processes=self.processes,
             )
 
         return self.handler
 
+    def find_roots(self) -> Roots:
+        """Directories to watch for the paths of :ivar:`filter`, the blog, and
+        the configuration file."""
+
+        return find_roots(
+            (
+                env.BLOG,
+                CONFIG,
+                *self.filter.filters.paths,
+                *self.filter.assets.paths,
+                *self.filter.static.paths,
+            ),
+            self.filter.ignore,
+        )
+
+    def reload(self) -> bool:
+        """Reconfigure :ivar:`filter` from the configuration file.
+
+        :returns: If the configuration was valid and used.
+        """
+
+        try:
+            config = Config()  # type: ignore
+        except (pydantic.ValidationError, yaml.YAMLError) as err:
+            logger.warning("Not reloading invalid configuration: %s", err)
+            return False
+
+        logger.info("Reloading filter configuration from `%s`.", CONFIG)
+        self.context.config.filter = config.filter
+        self.filter.configure(config.filter)
+        return True
+
+    def is_restart(self, change: watchfiles.Change, path: str) -> bool:
+        """Determine if a change requires restarting the watchers, e.g. when
+        the configuration changed or a directory was added that a shallow
+        root does not cover."""
+
+        if path == str(CONFIG):
+            return True
+
+        if self.roots is None or change != watchfiles.Change.added:
+            return False
+
+        return pathlib.Path(path).parent in self.roots.shallow and os.path.isdir(path)
+
+    def watch_filter(self, change: watchfiles.Change, path: str) -> bool:
+        return self.is_restart(change, path) or self.filter(change, path)
+
+    def walk_added(
+        self, directories: Iterable[str]
+    ) -> set[tuple[watchfiles.Change, str]]:
+        """Changes for the files in added :param:`directories`."""
+
+        out = set()
+        for path in directories:
+            for directory, _, files in os.walk(path):
+                for name in files:
+                    item = os.path.join(directory, name)
+                    if self.filter(watchfiles.Change.added, item):
+                        out.add((watchfiles.Change.added, item))
+
+        return out
+
+    async def changes(
+        self, stop_event: asyncio.Event
+    ) -> AsyncGenerator[set[tuple[watchfiles.Change, str]], None]:
+        """Changes within :meth:`find_roots`, for :meth:`__call__`.
+
+        ``watchfiles`` watches every path either recursively or not, so the
+        recursive and shallow roots are watched separately. When
+        :meth:`is_restart`, watchers for new roots are started before the
+        previous ones stop. Once the new watchers are running, files in added
+        directories are included as added, since they may have been written
+        before they were watched.
+        """
+
+        added: list[str] = list()
+        stopping: list[asyncio.Task] = list()
+        try:
+            while not stop_event.is_set():
+                self.roots = roots = self.find_roots()
+                logger.info(
+                    "Watching `%s` roots recursively and `%s` shallowly.",
+                    len(roots.recursive),
+                    len(roots.shallow),
+                )
+
+                restart = asyncio.Event()
+                queue: asyncio.Queue[set[tuple[watchfiles.Change, str]] | None]
+                queue = asyncio.Queue()
+
+                async def forward(
+                    paths, recursive, started, restart=restart, queue=queue
+                ):
+                    try:
+                        # NOTE: Yields empty changes on timeouts, so the first
+                        #       yield tells that the watcher is running.
+                        async for changes in watchfiles.awatch(
+                            *paths,
+                            watch_filter=self.watch_filter,
+                            recursive=recursive,
+                            step=1000,
+                            rust_timeout=1000,
+                            stop_event=restart,
+                            yield_on_timeout=True,
+                        ):
+                            started.set()
+                            if changes:
+                                queue.put_nowait(changes)
+                    finally:
+                        started.set()
+                        queue.put_nowait(None)
+
+                async def relay(restart=restart):
+                    await stop_event.wait()
+                    restart.set()
+
+                watchers = [
+                    (paths, recursive, asyncio.Event())
+                    for paths, recursive in (
+                        (roots.recursive, True),
+                        (roots.shallow, False),
+                    )
+                    if paths
+                ]
+                tasks = [
+                    asyncio.create_task(forward(paths, recursive, started))
+                    for paths, recursive, started in watchers
+                ]
+                relay_task = asyncio.create_task(relay())
+                stopping.append(relay_task)
+
+                # NOTE: Files written to added directories before the watchers
+                #       are running would be missed, so look for them after.
+                if added:
+                    await asyncio.gather(*(item[2].wait() for item in watchers))
+                    if changes_added := self.walk_added(added):
+                        yield changes_added
+                    added.clear()
+
+                while tasks and not restart.is_set():
+                    if (changes := await queue.get()) is None:
+                        # NOTE: Watchers only stop early because of errors.
+                        restart.set()
+                        await asyncio.gather(*tasks)
+                        break
+
+                    changes_restart = {
+                        item for item in changes if self.is_restart(*item)
+                    }
+                    for _, path in changes_restart:
+                        if path == str(CONFIG):
+                            self.reload()
+                        else:
+                            added.append(path)
+
+                    if changes_restart:
+                        restart.set()
+                        changes = changes - changes_restart
+
+                    if changes:
+                        yield changes
+
+                restart.set()
+                relay_task.cancel()
+                stopping.extend(tasks)
+                stopping = [task for task in stopping if not task.done()]
+                if not tasks:
+                    await stop_event.wait()
+        finally:
+            for task in stopping:
+                task.cancel()
+            await asyncio.gather(*stopping, return_exceptions=True)
+
     async def __call__(self, stop_event: asyncio.Event):
         """Watch for changes to quarto files and thier helpers.
 
@@ -913,21 +2928,23 @@ class Watch:
         """
 
         handler = await self.get_handler()
+        index = self.get_index()
+        scheduler = Scheduler(handler)
+        scheduler_task = asyncio.create_task(scheduler())
 
         # NOTE: Shutting this down requires writing to a qmd after reload.
         #       `stop_event` has made this less of a problem.
-        async for changes in watchfiles.awatch(
-            env.WORKDIR,
-            watch_filter=self.filter,
-            step=1000,
-            stop_event=stop_event,
-        ):
-            for _, path_raw in changes:
-                path = pathlib.Path(path_raw)
-                if path.parts[-1] == "_quarto.yaml":
-                    await handler.do_defered(path)
-                else:
-                    await handler(path_raw)
+        try:
+            async for changes in self.changes(stop_event):
+                # NOTE: Update the index first so that new includes, filters,
+                #       etc. are accounted for when dispatching.
+                for change, path_raw in changes:
+                    index.update(path_raw)
+                    if change != watchfiles.Change.deleted:
+                        scheduler.schedule(path_raw)
+        finally:
+            scheduler_task.cancel()
+            await asyncio.gather(scheduler_task, return_exceptions=True)
 
 
 # =========================================================================== #
@@ -940,6 +2957,34 @@ FlagHandlerRender = Annotated[
         help="Render writes or only watch for writes. Sets `config.handler.render`.",
     ),
 ]
+FlagHandlerJobs = Annotated[
+    Optional[int],
+    typer.Option(
+        "--jobs",
+        "-j",
+        help="Maximum number of concurrent renders. Sets `config.handler.jobs`.",
+    ),
+]
+FlagHandlerBatch = Annotated[
+    Optional[int],
+    typer.Option(
+        "--batch",
+        help=(
+            "Maximum number of documents to render with a single ``quarto "
+            "render`` in directory renders. Sets `config.handler.batch`."
+        ),
+    ),
+]
+FlagHandlerTimeout = Annotated[
+    Optional[float],
+    typer.Option(
+        "--timeout",
+        help=(
+            "Seconds that a render may take before it is killed. Sets "
+            "`config.handler.timeout`."
+        ),
+    ),
+]
 FlagHandlerFilters = Annotated[
     list[pathlib.Path],
     typer.Option("--filter", help="Additional filters to watch."),
@@ -981,6 +3026,26 @@ FlagRenderIsDirectory = Annotated[
             """,
     ),
 ]
+FlagRenderIsGlob = Annotated[
+    bool,
+    typer.Option(
+        "--glob",
+        help=(
+            "The positional argument is a glob pattern relative to the "
+            "project root, e.g. `blog/posts/**/*.qmd`."
+        ),
+    ),
+]
+FlagRenderSince = Annotated[
+    Optional[str],
+    typer.Option(
+        "--since",
+        help=(
+            "Git ref, e.g. `origin/main`. Only render documents that changed "
+            "since this ref or depend on files that did."
+        ),
+    ),
+]
 FlagRenderSuccessesInclude = Annotated[
     bool,
     typer.Option(
@@ -1005,6 +3070,40 @@ FlagRenderMongoInclude = Annotated[
     ),
 ]
 FlagRenderSilent = Annotated[bool, typer.Option("--silent/--not-silent")]
+FlagRenderFollow = Annotated[
+    bool,
+    typer.Option(
+        "--follow/--no-follow",
+        help="Print the output of ``quarto render`` as it is produced.",
+    ),
+]
+FlagBuildForce = Annotated[
+    bool,
+    typer.Option(
+        "--force",
+        help="Render every target, even those up to date in the build manifest.",
+    ),
+]
+FlagBuildArtifacts = Annotated[
+    Optional[str],
+    typer.Option(
+        "--artifacts",
+        help=(
+            "Directory or `s3://bucket/prefix` to restore render outputs from "
+            "and upload them to. Defaults to `ACEDERBERG_IO_BUILD_ARTIFACTS`."
+        ),
+    ),
+]
+FlagBuildShard = Annotated[
+    Optional[str],
+    typer.Option(
+        "--shard",
+        help=(
+            "Only render a share of the build, e.g. `2/3` for the second of "
+            "three shards. Combine shards with `acederbergio quarto build merge`."
+        ),
+    ),
+]
 FlagRenderExitOnFailure = Annotated[
     bool,
     typer.Option(
@@ -1014,9 +3113,77 @@ FlagRenderExitOnFailure = Annotated[
 ]
 
 
+def create_progress_bar() -> rich.progress.Progress:
+    """Progress bar for :class:`Estimate`, see ``acederbergio quarto build``."""
+
+    return rich.progress.Progress(
+        rich.progress.SpinnerColumn(),
+        rich.progress.TextColumn("[progress.description]{task.description}"),
+        rich.progress.BarColumn(),
+        rich.progress.MofNCompleteColumn(),
+        rich.progress.TextColumn("ETA [cyan]{task.fields[eta]}"),
+    )
+
+
+def print_progress(event: schemas.QuartoRenderProgress) -> None:
+    """Progress callback for the command line."""
+
+    if event.event == "start":
+        rich.print(f"[cyan]Rendering `{event.target}`...")
+    elif event.event == "done":
+        color = "red" if event.status_code else "green"
+        rich.print(
+            f"[{color}]Finished `{event.target}` with exit code `{event.status_code}`."
+        )
+    else:
+        rich.print(f"[dim]{event.target}[/dim] {rich.markup.escape(event.line or '')}")
+
+
+def run(main: Awaitable[Any]) -> Any:
+    """Run :param:`main` like ``asyncio.run``, but also cancel it on
+    ``SIGTERM`` (e.g. ``docker stop``) as is done on ``SIGINT``.
+
+    ``quarto`` runs in its own process group (see :meth:`Handler.run_quarto`)
+    and does not recieve these signals, so the renders in flight are only
+    killed when :param:`main` is cancelled. Exits with ``128`` plus the
+    number of the signal, so that callers can tell the two apart.
+    """
+
+    received: list[signal.Signals] = list()
+
+    def terminate(task: asyncio.Task):
+        received.append(signal.SIGTERM)
+        task.cancel()
+
+    async def wrapper():
+        loop = asyncio.get_running_loop()
+        task = asyncio.current_task()
+        loop.add_signal_handler(signal.SIGTERM, terminate, task)
+        try:
+            return await main
+        finally:
+            loop.remove_signal_handler(signal.SIGTERM)
+
+    try:
+        return asyncio.run(wrapper())
+    except (asyncio.CancelledError, KeyboardInterrupt):
+        signum = received[0] if received else signal.SIGINT
+        rich.print(f"[red]Cancelled by `{signum.name}`.")
+        raise typer.Exit(128 + signum)
+
+
 cli_context = typer.Typer(help="Watcher context debugging help.")
 cli = typer.Typer(help="Quarto commands.", callback=Context.forTyper)
 cli.add_typer(cli_context, name="context")
+cli_build = typer.Typer()
+cli.add_typer(cli_build, name="build")
+cli_cache = typer.Typer(
+    help=(
+        "Execution caches of documents. Entries are per document, changing "
+        "any code cell executes the whole document again."
+    )
+)
+cli.add_typer(cli_cache, name="cache")
 
 
 @cli_context.command("show")
@@ -1089,9 +3256,79 @@ def cmd_context_test(
     rich.print(t)
 
 
-@cli.command("build")
+def create_bench_paths(filter: Filter, count: int, *, seed: int = 0) -> list[str]:
+    """Create random paths in the project, some of which are inside of the
+    paths matched by :param:`filter`, for :func:`cmd_context_bench`."""
+
+    rng = random.Random(seed)
+    matched = sorted(
+        itertools.chain(
+            filter.ignore.paths,
+            filter.filters.paths,
+            filter.assets.paths,
+            filter.static.paths,
+        )
+    )
+    parts = ["posts", "partials", "resume", "index", "_freeze", "build", "a", "b"]
+    suffixes = [".qmd", ".py", ".json", ".scss", ""]
+
+    out = list()
+    for _ in range(count):
+        base = rng.choice(matched) if rng.random() < 0.5 else str(env.BLOG)
+        path = os.path.join(base, *rng.choices(parts, k=rng.randint(0, 5)))
+        out.append(path + rng.choice(suffixes))
+
+    return out
+
+
+@cli_context.command("bench")
+def cmd_context_bench(_context: typer.Context, count: int = 100_000, seed: int = 0):
+    """Compare prefix matching of ``Matcher`` to the ``Node`` trie it
+    replaced on random paths."""
+
+    filter: Filter = _context.obj["quarto_filter"]
+    paths = create_bench_paths(filter, count, seed=seed)
+
+    t = rich.table.Table(title=f"Prefix Matching of `{count}` Paths")
+    t.add_column("Paths")
+    t.add_column("Trie (s)")
+    t.add_column("Matcher (s)")
+    t.add_column("Speedup")
+
+    for name in ("ignore", "filters", "assets", "static"):
+        matcher: Matcher = getattr(filter, name)
+        node = Node.fromPaths(*matcher.paths)
+
+        start = time.perf_counter()
+        expected = [node.has_prefix(path) for path in paths]
+        tt_node = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = [matcher.has_prefix(path) for path in paths]
+        tt_matcher = time.perf_counter() - start
+
+        if result != expected:
+            rich.print(f"[red]Results for `{name}` do not agree.")
+            raise typer.Exit(1)
+
+        t.add_row(
+            name, f"{tt_node:.3f}", f"{tt_matcher:.3f}", f"{tt_node / tt_matcher:.1f}x"
+        )
+
+    rich.print(t)
+
+
+@cli_build.callback(invoke_without_command=True)
 def cmd_build(
     _context: typer.Context,
+    jobs: FlagHandlerJobs = None,
+    batch: FlagHandlerBatch = None,
+    timeout: FlagHandlerTimeout = None,
+    force: FlagBuildForce = False,
+    follow: FlagRenderFollow = False,
+    shard_spec: FlagBuildShard = None,
+    artifacts_url: FlagBuildArtifacts = None,
+    since: FlagRenderSince = None,
 ):
     """Specifically for docker builds.
 
@@ -1103,8 +3340,35 @@ def cmd_build(
         useful in development mode.
     4. Not generate documentation.
     4. Just copy over the `javascript` folder.
+    5. Skip targets that are up to date in the build manifest, unless
+       ``--force`` is used.
+    6. Only render a share of the targets when ``--shard`` is used, so that
+       builds can be split between containers.
+    7. Restore outputs from and upload them to the artifact cache when
+       ``--artifacts`` is used, since builds start from an empty build
+       directory.
+    8. Only render what a branch changed when ``--since`` is used, e.g. for
+       previews of pull requests.
+    9. Kill renders that take longer than ``--timeout`` seconds, so that a
+       hung kernel cannot stall the build.
     """
 
+    if _context.invoked_subcommand is not None:
+        return
+
+    build_shard = None
+    if shard_spec is not None:
+        try:
+            build_shard = shard.Shard.parse(shard_spec)
+        except ValueError as err:
+            raise typer.BadParameter(str(err), param_hint="--shard")
+
+    config_handler: dict[str, Any] = dict(
+        verbose=False, render=True, jobs=jobs or 1, batch=batch or 1
+    )
+    if timeout is not None:
+        config_handler["timeout"] = timeout
+
     context = Context(
         config=Config(
             filter=ConfigFilter.model_validate(
@@ -1114,34 +3378,45 @@ def cmd_build(
                     ignore=[env.BLOG / "dev", env.BLOG / "js"],
                 )
             ),
-            handler=ConfigHandler.model_validate(
-                dict(
-                    verbose=False,
-                    render=True,
-                )
-            ),
+            handler=ConfigHandler.model_validate(config_handler),
         ),
         database=db.Config.model_validate(dict(include=False)),
     )
     util.print_yaml(context.dict())
 
-    watch = Watch(context, include_mongo=False)
-    data = schemas.QuartoRenderRequest(
-        exit_on_failure=False,
-        items=[
-            schemas.QuartoRenderRequestItem(
-                path="blog",
-                kind="directory",
-                directory_depth_max=10,
-            )
-        ],
+    build_artifacts = None
+    if artifacts_url := artifacts_url or env.get("build_artifacts"):
+        build_artifacts = artifacts.Artifacts(artifacts.create_store(artifacts_url))
+        rich.print(f"[green]Using artifacts from `{artifacts_url}`.")
+
+    # NOTE: Load the manifest even when forced, durations are still useful.
+    build_manifest = manifest.Manifest.load()
+    watch = Watch(
+        context,
+        include_mongo=False,
+        manifest=build_manifest,
+        force=force,
+        progress=print_progress if follow else None,
+        artifacts=build_artifacts,
     )
-    TT = schemas.QuartoRender
-    SS = schemas.QuartoRenderResponse[TT]  # type: ignore
+    try:
+        item = schemas.QuartoRenderRequestItem(
+            path="blog",
+            kind="directory",
+            directory_depth_max=10,
+            since=since,
+        )
+    except pydantic.ValidationError as err:
+        raise typer.BadParameter(str(err), param_hint="--since")
+
+    data = schemas.QuartoRenderRequest(exit_on_failure=False, items=[item])
 
     async def callback(item: schemas.QuartoHandlerResult):
         if item.kind == "render":
-            print(f"Rendering {item.data.target}.")
+            color = "red" if item.data.status_code else "green"
+            rich.print(f"[{color}]Rendered `{item.data.target}`.")
+        elif item.kind == "cached":
+            print(f"Up to date {item.data.target}.")
         elif item.kind == "request":
             print(f"Ignored `{item.data.model_dump(mode='json')}`.")
 
@@ -1149,32 +3424,207 @@ def cmd_build(
 
     async def doit():
 
-        # NOTE: Copy over JS.
+        # NOTE: Sync JS, only changed files are copied.
         js_raw = env.BLOG / "js"
         js_build = (env.BUILD / "js").resolve(strict=False)
-        print(js_build)
-        if js_build.exists():
+        rich.print(f"[green]Syncing javascript at `{js_raw}` to `{js_build}`...")
+        synced = sync.sync_directory(js_raw, js_build)
+        counts = collections.Counter(item.action for item in synced)
+        rich.print(
+            "[green]" + ", ".join(f"`{v}` {k}" for k, v in sorted(counts.items()))
+        )
+
+        # NOTE: Render all `qmd`, `json`, and `svg` content. Jobs are planned
+        #       first so that the progress bar knows how much work remains.
+        handler = await watch.get_handler()
+        jobs = handler.plan(data)
+        if build_shard is not None:
+            estimates = Estimate(jobs, build_manifest.durations()).estimates
+            jobs = build_shard.select(jobs, estimates)
+            rich.print(f"[green]Shard `{shard_spec}` has `{len(jobs)}` targets.")
+
+        # NOTE: Restore after sharding, so that shards only download their own.
+        jobs = await asyncio.to_thread(handler.restore, jobs)
+
+        estimate = Estimate(
+            jobs, build_manifest.durations(), workers=handler.config.jobs
+        )
+        rich.print(
+            f"[green]Planned `{estimate.total}` jobs, "
+            f"`{len(jobs) - estimate.total}` targets are up to date."
+        )
+
+        async def callback_progress(item: schemas.QuartoHandlerResult):
+            await callback(item)
+            if item.kind != "render":
+                return
+
+            estimate.finish(item.data.target, item.data.duration)
+            bar.update(
+                task_id,
+                advance=1,
+                description=item.data.target,
+                eta=estimate.format(),
+            )
+
+        # NOTE: Results are written to the report as they complete, so that
+        #       a crash does not lose the whole report.
+        report_path = report.PATH
+        if build_shard is not None:
+            report_path = env.BUILD / build_shard.report
+
+        try:
+            with create_progress_bar() as bar, report.Writer(report_path) as writer:
+                task_id = bar.add_task(
+                    "Rendering", total=estimate.total, eta=estimate.format()
+                )
+                async for item in handler.execute(jobs):
+                    writer.write(item)
+                    await callback_progress(item)
+        finally:
+            build_manifest.save()
+
+        # NOTE: Evict least recently used execution caches past the limit.
+        if (size_max := context.config.cache.size_max) is not None:
+            caches = cache.find_caches(is_ignored=watch.filter.ignore.has_prefix)
+            removed = cache.prune(cache.list_entries(caches), size_max=size_max)
+            rich.print(f"[green]Removed `{len(removed)}` execution cache entries.")
+
+        # NOTE: Shards are summarized once merged, see ``build merge``.
+        if build_shard is None:
+            summary = report.write_summary(report_path, report.PATH_SUMMARY)
+        else:
+            summary = report.summarize(report_path)
+
+        rich.print(
+            f"[green]Rendered `{summary.rendered}` targets in "
+            f"`{summary.duration:.1f}` seconds, `{summary.cached}` were up to date."
+        )
+        if build_artifacts is not None:
+            rich.print(
+                f"[green]Artifacts: `{summary.artifacts_hit}` hits, "
+                f"`{summary.artifacts_miss}` misses."
+            )
+        if summary.timed_out:
+            rich.print(f"[red]`{summary.timed_out}` renders timed out.")
+
+        # NOTE: Shared outputs are only complete for a whole build.
+        if build_artifacts is not None and build_shard is None and not summary.failed:
+            if await asyncio.to_thread(build_artifacts.upload_shared):
+                rich.print("[green]Uploaded shared outputs.")
+        if summary.failed:
             rich.print(
-                f"[yellow]Removing existing javascript from build at `{js_build}`."
+                f"[red]`{summary.failed}` renders failed, see `{report_path}`:\n"
+                + "\n".join(f"- `{target}`" for target in summary.targets_failed)
             )
-            shutil.rmtree(js_build)
 
-        rich.print(f"[green]Copying javascript at `{js_raw}` to `{js_build}`...")
-        shutil.copytree(js_raw, js_build)
+        return summary
 
-        # NOTE: Render all `qmd`, `json`, and `svg` content.
-        # TODO: Once the handler emits jobs, I would like the jobs to be
-        #       computed first so that a progress bar can be added here.
-        handler = await watch.get_handler()
-        result = await SS.fromHandlerResults(handler.render(data), callback=callback)
+    run(doit())
+
+
+@cli_build.command("merge")
+def cmd_build_merge(
+    directories: Annotated[
+        list[pathlib.Path],
+        typer.Argument(help="Build directories of the shards."),
+    ],
+    output: Annotated[
+        Optional[pathlib.Path],
+        typer.Option(
+            "--output",
+            help="Build directory to merge into. Defaults to the build directory.",
+        ),
+    ] = None,
+):
+    """Combine the build directories and reports of
+    ``acederbergio quarto build --shard``."""
+
+    dest = output or env.BUILD
+    rich.print(f"[green]Merging `{len(directories)}` build directories into `{dest}`.")
+    try:
+        synced = shard.merge(directories, dest)
+    except ValueError as err:
+        rich.print(f"[red]{err}")
+        raise typer.Exit(1)
+
+    counts = collections.Counter(item.action for item in synced)
+    rich.print("[green]" + ", ".join(f"`{v}` {k}" for k, v in sorted(counts.items())))
+
+
+FlagCacheSizeMax = Annotated[
+    Optional[str],
+    typer.Option(
+        "--size-max",
+        help="Maximum total size, e.g. `512M`. Sets `config.cache.size_max`.",
+    ),
+]
+
+
+def find_cache_entries(context: Context) -> list[cache.CacheEntry]:
+    caches = cache.find_caches(is_ignored=Filter(context).ignore.has_prefix)
+    return cache.list_entries(caches)
+
+
+@cli_cache.command("stats")
+def cmd_cache_stats(_context: typer.Context):
+    """Show the size of the execution cache of each directory."""
+
+    context: Context = _context.obj["quarto_context"]
+    items = cache.stats(find_cache_entries(context))
+
+    table = rich.table.Table(title="Execution Caches")
+    table.add_column("Cache")
+    table.add_column("Entries", justify="right")
+    table.add_column("Size", justify="right")
+    table.add_column("Last Used")
+    for item in items:
+        table.add_row(
+            os.path.relpath(item.cache, env.WORKDIR),
+            str(item.entries),
+            cache.format_size(item.size),
+            item.accessed.isoformat(" ", "minutes") if item.accessed else "",
+        )
+
+    table.add_section()
+    table.add_row(
+        "total",
+        str(sum(item.entries for item in items)),
+        cache.format_size(sum(item.size for item in items)),
+        "",
+    )
+    rich.print(table)
+
+
+@cli_cache.command("prune")
+def cmd_cache_prune(
+    _context: typer.Context,
+    size_max: FlagCacheSizeMax = None,
+    dry_run: Annotated[
+        bool, typer.Option("--dry-run", help="Only show what would be removed.")
+    ] = False,
+):
+    """Remove least recently used execution cache entries until the caches
+    fit in `config.cache.size_max`."""
+
+    context: Context = _context.obj["quarto_context"]
+    try:
+        limit = context.config.cache.size_max
+        limit = cache.parse_size(size_max) if size_max is not None else limit
+    except ValueError as err:
+        raise typer.BadParameter(str(err), param_hint="--size-max")
 
-        with open(env.BUILD / "quarto_renders.yaml", "w") as file:
-            yaml.dump(result, file)
+    if limit is None:
+        rich.print("[yellow]No size limit is configured, nothing to do.")
+        return
 
-        # util.print_yaml(result)
-        return result
+    removed = cache.prune(find_cache_entries(context), size_max=limit, dry_run=dry_run)
+    for entry in removed:
+        rich.print(f"[red]{entry.uri}[/red] ({cache.format_size(entry.size)})")
 
-    asyncio.run(doit())
+    verb = "Would remove" if dry_run else "Removed"
+    size = cache.format_size(sum(entry.size for entry in removed))
+    rich.print(f"[green]{verb} `{len(removed)}` entries totalling `{size}`.")
 
 
 @cli.command("render")
@@ -1189,11 +3639,14 @@ def cmd_render(
     *,
     max_depth: int = 5,
     is_directory: FlagRenderIsDirectory = False,
+    is_glob: FlagRenderIsGlob = False,
+    since: FlagRenderSince = None,
     include_success: FlagRenderSuccessesInclude = False,
     include_mongo: FlagRenderMongoInclude = True,
     output: FlagRenderOutput = None,
     silent: FlagRenderSilent = True,
     exit_on_failure: FlagRenderExitOnFailure = False,
+    follow: FlagRenderFollow = False,
 ):
     """Render quarto content in the same way that the API would."""
 
@@ -1221,10 +3674,12 @@ def cmd_render(
 
         TT = schemas.QuartoRender if not dry_run else schemas.QuartoRenderJob
         SS = schemas.QuartoRenderResponse[TT]  # type: ignore
-        result = await SS.fromHandlerResults(
-            handler.render(data),
-            callback=callback if not dry_run else None,
-        )
+        if dry_run:
+            result = SS(items=handler.plan(data), ignored=list())
+        else:
+            result = await SS.fromHandlerResults(
+                handler.render(data), callback=callback
+            )
 
         if dry_run and not output:
             util.print_yaml(
@@ -1259,8 +3714,11 @@ def cmd_render(
             items=[
                 schemas.QuartoRenderRequestItem(
                     path=path,
-                    kind="directory" if is_directory else "file",
+                    kind=(
+                        "glob" if is_glob else "directory" if is_directory else "file"
+                    ),
                     directory_depth_max=max_depth,
+                    since=since,
                 )
             ],
         )
@@ -1278,9 +3736,13 @@ def cmd_render(
         )
 
     context: Context = _context.obj["quarto_context"]
-    watch = Watch(context, include_mongo=include_mongo)
+    watch = Watch(
+        context,
+        include_mongo=include_mongo,
+        progress=print_progress if follow else None,
+    )
 
-    asyncio.run(do_render())
+    run(do_render())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,189 @@
+"""Streaming render reports for ``acederbergio quarto build``.
+
+Reports are written as JSON lines, one for each handler result as soon as it
+is available (see :class:`Writer`), instead of collecting every result with
+its output into a ``QuartoRenderResponse`` and writing it once the build is
+done. A crash then only loses results that were not complete yet, and memory
+does not grow with the size of the site.
+
+Summaries and failures are rebuilt from the report a line at a time by
+:func:`summarize` and :func:`get_failed`, which only keep the output of
+results that need it. Once the build is done, they are written to
+``quarto_renders.yaml`` (see :func:`write_summary`), which used to hold every
+result.
+"""
+
+import json
+import pathlib
+from typing import Annotated, Any, Iterator
+
+import pydantic
+import yaml
+
+from acederbergio import env
+from acederbergio.api import schemas
+
+logger = env.create_logger(__name__)
+
+PATH = env.BUILD / "quarto_renders.jsonl"
+PATH_SUMMARY = env.BUILD / "quarto_renders.yaml"
+FIELDS_OUTPUT = ("stdout", "stderr")
+
+
+class Writer:
+    """Append handler results to a report as they complete.
+
+    Lines are flushed as they are written, so the report is readable while
+    the build is running.
+
+    :ivar path: Path to the report.
+    """
+
+    path: pathlib.Path
+
+    def __init__(self, path: pathlib.Path = PATH, *, append: bool = False):
+        self.path = path
+        self._file = open(path, "a" if append else "w")
+
+    def __enter__(self) -> "Writer":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def write(self, item: schemas.QuartoHandlerResult) -> None:
+        self.write_line(dict(kind=item.kind, data=item.data.model_dump(mode="json")))
+
+    def write_line(self, line: dict[str, Any]) -> None:
+        """Write a line as returned by :func:`read`."""
+
+        self._file.write(json.dumps(line) + "\n")
+        self._file.flush()
+
+
+def read(
+    path: pathlib.Path = PATH, *, output: bool = False
+) -> Iterator[dict[str, Any]]:
+    """Read the lines of a report.
+
+    :param output: Include ``stdout`` and ``stderr`` of renders. Otherwise
+        these are dropped as each line is read.
+    :returns: An iterator of objects with ``kind`` and ``data``. A partial
+        trailing line, e.g. from a crash, is skipped.
+    """
+
+    with open(path, "r") as file:
+        for number, raw in enumerate(file, start=1):
+            if not raw.strip():
+                continue
+
+            try:
+                line = json.loads(raw)
+            except json.JSONDecodeError:
+                logger.warning("Skipping invalid line `%s` of `%s`.", number, path)
+                continue
+
+            if not output:
+                for field in FIELDS_OUTPUT:
+                    line["data"].pop(field, None)
+
+            yield line
+
+
+class Summary(pydantic.BaseModel):
+    """Counts of results in a report, see :func:`summarize`."""
+
+    rendered: Annotated[int, pydantic.Field(0)]
+    failed: Annotated[int, pydantic.Field(0)]
+    cached: Annotated[int, pydantic.Field(0)]
+    ignored: Annotated[int, pydantic.Field(0)]
+    artifacts_hit: Annotated[
+        int,
+        pydantic.Field(0, description="Targets restored from the artifact cache."),
+    ]
+    artifacts_miss: Annotated[
+        int,
+        pydantic.Field(0, description="Targets missing from the artifact cache."),
+    ]
+    duration: Annotated[
+        float,
+        pydantic.Field(0, description="Total seconds spent rendering."),
+    ]
+    timed_out: Annotated[
+        int,
+        pydantic.Field(0, description="Renders killed for taking too long."),
+    ]
+    targets_failed: Annotated[list[str], pydantic.Field(default_factory=list)]
+
+
+def summarize(path: pathlib.Path = PATH) -> Summary:
+    """Summarize a report without loading any output."""
+
+    summary = Summary()
+    for line in read(path):
+        kind, data = line["kind"], line["data"]
+        if (artifact := data.get("artifact")) == "hit":
+            summary.artifacts_hit += 1
+        elif artifact == "miss":
+            summary.artifacts_miss += 1
+
+        if kind == "cached":
+            summary.cached += 1
+        elif kind == "request":
+            summary.ignored += 1
+        elif kind == "render":
+            summary.rendered += 1
+            summary.duration += data.get("duration") or 0
+            if data["status_code"]:
+                summary.failed += 1
+                summary.targets_failed.append(data["target"])
+            if data.get("status") == "timeout":
+                summary.timed_out += 1
+
+    return summary
+
+
+def get_failed(
+    path: pathlib.Path = PATH,
+) -> schemas.QuartoRenderResponse[schemas.QuartoRender]:
+    """Failed renders from a report, with their output.
+
+    Like :meth:`schemas.QuartoRenderResponse.get_failed`, but only the output
+    of failed renders is ever kept.
+    """
+
+    items = list()
+    for line in read(path, output=True):
+        if line["kind"] == "render" and line["data"]["status_code"]:
+            items.append(line["data"])
+
+    return schemas.QuartoRenderResponse[schemas.QuartoRender].model_validate(
+        dict(items=items, ignored=list())
+    )
+
+
+def write_summary(
+    path: pathlib.Path = PATH, dest: pathlib.Path = PATH_SUMMARY
+) -> Summary:
+    """Write the summary and failed renders of the report :param:`path` to
+    :param:`dest` as ``YAML``.
+
+    :returns: The summary.
+    """
+
+    summary = summarize(path)
+    failed = get_failed(path)
+    with open(dest, "w") as file:
+        yaml.safe_dump(
+            dict(
+                summary=summary.model_dump(mode="json"),
+                failed=failed.model_dump(mode="json"),
+            ),
+            file,
+            sort_keys=False,
+        )
+
+    return summary
@@ -1,5 +1,5 @@
 import asyncio
-from time import time
+import os
 from typing import Any, Awaitable, Callable, ClassVar, TypeVar
 
 import fastapi
@@ -8,7 +8,7 @@ import pydantic
 from fastapi.websockets import WebSocketState
 
 from acederbergio import env
-from acederbergio.api import base, depends, schemas
+from acederbergio.api import base, broadcast, depends, schemas
 
 logger = env.create_logger(__name__)
 
@@ -45,66 +45,109 @@ class LogRoutesMixins:
         count = await s.status(database)
         return schemas.LogStatus(count=count)
 
-    # NOTE: Now the client just says at what rate they want to recieve render
-    #       data.
+    @classmethod
+    async def send(cls, websocket: fastapi.WebSocket, data: Any) -> bool:
+        """Send :param:`data` as ``JSON``.
+
+        :returns: If the socket is still open.
+        """
+
+        try:
+            await websocket.send_json(data)
+        except RuntimeError as err:
+            if err.args[0].startswith("Unexpected ASGI message"):
+                return False
+
+            raise err
+        except fastapi.WebSocketDisconnect:
+            return False
+
+        return True
+
+    # NOTE: Items are no longer polled for each socket, sockets subscribe to
+    #       a single broadcaster per app instance instead.
     @classmethod
     async def ws(
         cls,
         s: type[T_BaseLog],
         websocket: fastapi.WebSocket,
         database: depends.Db,
+        broadcaster: broadcast.Broadcaster | None,
         *,
         handle_recieve: Callable[[fastapi.WebSocket, dict], Awaitable[None]],
         last: int = 32,
         **kwargs,
     ) -> None:
+        """Send the latest :param:`last` items of :param:`s`, then items as
+        they are published to :param:`broadcaster`.
 
-        # NOTE: Push out the initial logs.
-        log = await cls.get(s, database, ws=True, **kwargs)
-        if last:
-            if log is not None:
-                log.items = log.items[-last:]  # type: ignore
+        Items are filtered with the keyword arguments, which are updated by
+        :param:`handle_recieve` as the client sends them, see
+        :meth:`schemas.BaseLog.matches`. Items are sent once by their
+        position, see :class:`broadcast.Seen`.
 
-            await websocket.send_json(
-                log if log is None else log.model_dump(mode="json")
-            )
+        :param broadcaster: From the development lifespan. When it is not
+            running, the socket is closed since there is nothing to follow.
+        """
 
-        # NOTE: Must listen to hear disconnects. Without this, the websocket
-        #       will never exit (which is what was causing reload to hang.
-        #       Initially I assuemd this was from lifespan events but found that
-        #       the server was still listening from print statements.
-        count = 0 if log is None else log.count
-        called_last = 0
-        while websocket.client_state == WebSocketState.CONNECTED:
+        # NOTE: https://github.com/Luka967/websocket-close-codes
+        if broadcaster is None:
+            await websocket.close(1013, reason="No development lifespan.")
+            return
 
-            data = await cls.get(
-                s,
-                database,
-                slice_start=count,
-                slice_count=128,
-                ws=True,
-                **kwargs,
-            )
-            if data is not None and data.count:
-                try:
-                    await websocket.send_json(data.model_dump(mode="json"))
-                except RuntimeError as err:
-                    if err.args[0].startswith("Unexpected ASGI message"):
+        seen = broadcast.Seen()
+
+        # NOTE: Subscribe first so that nothing is missed while reading the
+        #       initial items, which may then be published too.
+        with broadcaster.subscribe() as queue:
+            log = await cls.get(s, database, ws=True, slice_count=-last, **kwargs)
+            if log is not None:
+                for item in log.items:
+                    seen.add(item.position)
+
+            if last:
+                await websocket.send_json(
+                    log if log is None else log.model_dump(mode="json")
+                )
+
+            # NOTE: Must listen to hear disconnects. Without this, the
+            #       websocket will never exit (which is what was causing reload
+            #       to hang.
+            async def recieve():
+                while websocket.client_state == WebSocketState.CONNECTED:
+                    await handle_recieve(websocket, kwargs)
+
+            async def forward():
+                while True:
+                    items = await broadcast.drain(queue, 128)
+                    items = [
+                        item
+                        for item in items
+                        if s.matches(item, **kwargs) and seen.add(item.position)
+                    ]
+                    if not items:
+                        continue
+
+                    update = dict(items=items, count=len(items))
+                    if log is None:
+                        data = s.model_validate(update)
+                    else:
+                        data = log.model_copy(update=update)
+
+                    if not await cls.send(websocket, data.model_dump(mode="json")):
                         return
 
-                    raise err
-                except fastapi.WebSocketDisconnect:
-                    return
+            tasks = {asyncio.create_task(recieve()), asyncio.create_task(forward())}
+            try:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for task in tasks:
+                    task.cancel()
 
-                count += data.count
+                await asyncio.gather(*tasks, return_exceptions=True)
 
-            # NOTE: Will wait atleast three seconds each time. Done here at the
-            #       end so that data is sent out immediately.
-            called = time()
-            if called_last and (diff := called - called_last) < 1:
-                await asyncio.sleep(diff)
-
-            await handle_recieve(websocket, kwargs)
+            for task in done:
+                task.result()
 
         # NOTE: Does not call ``close`` since closing is only on the part of
         #       client or on uvicorn reloads.
@@ -163,6 +206,7 @@ class LogRoutes(LogRoutesMixins, base.Router):
         cls,
         websocket: fastapi.WebSocket,
         database: depends.Db,
+        logs: depends.Logs,
     ):
         """Watch logs. Emits ``JSONL`` log data."""
 
@@ -174,7 +218,12 @@ class LogRoutes(LogRoutesMixins, base.Router):
 
         await websocket.accept()
         await cls.ws(
-            schemas.Log, websocket, database, last=64, handle_recieve=handle_recieve
+            schemas.Log,
+            websocket,
+            database,
+            logs,
+            last=64,
+            handle_recieve=handle_recieve,
         )
 
 
@@ -191,10 +240,14 @@ class QuartoRoutes(LogRoutesMixins, base.Router):
         "post_log": dict(url=""),
         "get_log_status": dict(url="/status"),
         "post_last_rendered": dict(url="/last", status_code=fastapi.status.HTTP_200_OK),
+        "get_recent": dict(url="/recent"),
+        "get_running": dict(url="/running"),
+        "post_cancel": dict(url="/cancel", status_code=fastapi.status.HTTP_200_OK),
         "delete_log": dict(url=""),
         "get_routes": dict(url="/routes"),
         "post_render": dict(url="/render"),
         "websocket_log": dict(url=""),
+        "websocket_progress": dict(url="/progress"),
     }
 
     @classmethod
@@ -211,6 +264,51 @@ class QuartoRoutes(LogRoutesMixins, base.Router):
 
         return res
 
+    @classmethod
+    async def get_recent(
+        cls,
+        recent: depends.QuartoRecent,
+        count: int | None = None,
+    ) -> list[str]:
+        """Get the most recently rendered documents, most recent first.
+
+        These are rendered again for defered changes, and are kept in memory
+        by the development server instead of read from the render history.
+        """
+
+        if recent is None:
+            return list()
+
+        return [os.path.relpath(item, env.WORKDIR) for item in recent.latest(count)]
+
+    @classmethod
+    async def get_running(cls, processes: depends.QuartoProcesses) -> list[str]:
+        """Get the documents currently being rendered."""
+
+        if processes is None:
+            return list()
+
+        return processes.targets()
+
+    @classmethod
+    async def post_cancel(
+        cls,
+        processes: depends.QuartoProcesses,
+        targets: list[str] | None = None,
+    ) -> list[str]:
+        """Cancel renders of :param:`targets`, or every render when none are
+        provided. Their process groups are killed and the renders are recorded
+        with the status ``cancelled``.
+
+        :param targets: Paths relative to the project root.
+        :returns: The targets whose renders were cancelled.
+        """
+
+        if processes is None:
+            return list()
+
+        return await processes.cancel(targets)
+
     @classmethod
     async def post_log(
         cls,
@@ -290,19 +388,24 @@ class QuartoRoutes(LogRoutesMixins, base.Router):
         res = await cls.delete(schemas.QuartoHistory, database)
         return res.deleted_count
 
-    # NOTE: Use chatroom model to reduce watchers to `1` per app instance
     @classmethod
     async def websocket_log(
         cls,
         websocket: fastapi.WebSocket,
         database: depends.Db,
+        renders: depends.QuartoRenders,
+        viewers: depends.QuartoViewers,
         last: int = 32,
     ):
         """Watch logs. Emits ``JSONL`` log data.
 
-        Will not emit logs until filtering parameters are sent in.
+        Will not emit logs until filtering parameters are sent in. The
+        ``targets`` of these filters are considered open in the browser until
+        the socket disconnects, so that they are rendered first.
         """
 
+        viewed: list[str] = list()
+
         # NOTE: Because a JSON body can not be sent in with the initial request
         #       the socket will wait for some filters to be written to it.
         # NOTE: https://github.com/Luka967/websocket-close-codes
@@ -312,27 +415,79 @@ class QuartoRoutes(LogRoutesMixins, base.Router):
             except fastapi.WebSocketDisconnect:
                 return
 
-            if data is not None:
-                try:
-                    filters = schemas.QuartoHistoryFilters.model_validate(data)
-                except pydantic.ValidationError as err:
-                    raise fastapi.WebSocketDisconnect(1003, err.json())
+            # NOTE: Clients send ``null`` to keep the socket alive, filters
+            #       are unchanged.
+            if data is None:
+                return
+
+            try:
+                filters = schemas.QuartoHistoryFilters.model_validate(data)
+            except pydantic.ValidationError as err:
+                raise fastapi.WebSocketDisconnect(1003, err.json())
 
-                kwargs["filters"] = filters
-            else:
-                filters = None
+            kwargs["filters"] = filters
+            if viewers is not None:
+                targets = filters.targets or []
+                viewers.update(viewed, targets)
+                viewed[:] = targets
 
         await websocket.accept()
 
         kwargs = dict(last=last)
-        await handle_recieve(websocket, kwargs)
-        await cls.ws(
-            schemas.QuartoHistoryFull,
-            websocket,
-            database,
-            handle_recieve=handle_recieve,
-            **kwargs,
-        )
+        try:
+            await handle_recieve(websocket, kwargs)
+            await cls.ws(
+                schemas.QuartoHistoryFull,
+                websocket,
+                database,
+                renders,
+                handle_recieve=handle_recieve,
+                **kwargs,
+            )
+        finally:
+            if viewers is not None:
+                viewers.update(viewed, [])
+
+    @classmethod
+    async def websocket_progress(
+        cls,
+        websocket: fastapi.WebSocket,
+        progress: depends.QuartoProgress,
+    ):
+        """Follow renders as they run. Emits ``JSONL`` progress events, e.g.
+        every line of output from ``quarto render`` as it is produced.
+
+        Complete renders are still available from ``websocket_log``.
+        """
+
+        await websocket.accept()
+        with progress.subscribe() as queue:
+
+            # NOTE: Must listen to hear disconnects, otherwise this only exits
+            #       once an event fails to send. Messages are ignored.
+            async def recieve():
+                while websocket.client_state == WebSocketState.CONNECTED:
+                    message = await websocket.receive()
+                    if message["type"] == "websocket.disconnect":
+                        return
+
+            async def forward():
+                while True:
+                    event = await queue.get()
+                    if not await cls.send(websocket, event.model_dump(mode="json")):
+                        return
+
+            tasks = {asyncio.create_task(recieve()), asyncio.create_task(forward())}
+            try:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+            for task in done:
+                task.result()
 
 
 class DevRoutes(base.Router):
@@ -15,15 +15,19 @@ from typing import (
     Literal,
     Self,
     TypeVar,
+    get_args,
 )
 
 import bson
 import fastapi
 import motor.motor_asyncio
 import pydantic
+import pymongo
+import pymongo.errors
 from typing_extensions import Doc
 
 from acederbergio import db, env, util
+from acederbergio.api import changed
 
 logger = env.create_logger(__name__)
 
@@ -102,7 +106,28 @@ def path_to_url(path: str, ext: str = "html"):
 
 UvicornUUID = Annotated[str, pydantic.Field(env.RUN_UUID)]
 QuartoRenderKind = Annotated[
-    Literal["defered", "direct", "static"], pydantic.Field("direct")
+    Literal["defered", "direct", "static", "style"], pydantic.Field("direct")
+]
+QuartoRenderArtifact = Annotated[
+    Literal["hit", "miss"] | None,
+    pydantic.Field(
+        None,
+        description=(
+            "Whether the output was restored from the artifact cache, see "
+            ":mod:`acederbergio.api.artifacts`."
+        ),
+    ),
+]
+QuartoRenderStatus = Annotated[
+    Literal["success", "failure", "timeout", "cancelled"] | None,
+    pydantic.Field(
+        None,
+        description=(
+            "Outcome of the render. Renders that timed out or were cancelled "
+            "are killed, so their ``status_code`` is that of the signal. "
+            "Determined from ``status_code`` when not provided."
+        ),
+    ),
 ]
 QuartoRenderFrom = Annotated[
     Literal["client", "lifespan"],
@@ -114,7 +139,27 @@ QuartoRenderFrom = Annotated[
 ]
 
 
-class LogItem(pydantic.BaseModel):
+class HasPosition(pydantic.BaseModel):
+    """Position of an item within the items of its run, set once it is pushed
+    (see :meth:`BaseLog.push`).
+
+    Not included in dumps, since items are stored with their position anyway.
+    Websockets use it to skip items that they already sent, see
+    ``LogRoutesMixins.ws``.
+    """
+
+    run: Annotated[db.FieldId, pydantic.Field(exclude=True)]
+    index: Annotated[int | None, pydantic.Field(None, exclude=True)]
+
+    @property
+    def position(self) -> tuple[str, int] | None:
+        if self.run is None or self.index is None:
+            return None
+
+        return self.run, self.index
+
+
+class LogItem(HasPosition):
     """Server log item schema."""
 
     created: util.FieldTimestamp
@@ -136,7 +181,7 @@ class LogItem(pydantic.BaseModel):
 
 
 KindHandlerResult = Annotated[
-    Literal["request", "job", "render"],
+    Literal["request", "job", "render", "cached"],
     Doc(
         "This is used in ``quarto.HandlerResult`` to indicate what the "
         "handler is returning from ``__call__``."
@@ -158,6 +203,19 @@ class QuartoRenderJob(util.HasTime):
     target: str
 
 
+class QuartoRenderCached(QuartoRenderJob):
+    """Schema for jobs skipped because their output is up to date.
+
+    :seealso: :class:`acederbergio.api.manifest.Manifest`.
+    """
+
+    kind_handler_result: ClassVar[KindHandlerResult] = "cached"
+
+    digest: str
+    output: str | None
+    artifact: QuartoRenderArtifact
+
+
 # class QuartoRenderExec(QuartoRenderJob):
 #     """Schema for a job currently being executed."""
 #
@@ -166,7 +224,7 @@ class QuartoRenderJob(util.HasTime):
 
 
 # TODO: Should have scheduled time, exec time, and completed time later.
-class QuartoRenderMinimal(util.HasTime):
+class QuartoRenderMinimal(util.HasTime, HasPosition):
     """This should not be used internally, only to serve partial results."""
 
     kind_handler_result: ClassVar[KindHandlerResult] = "render"
@@ -176,6 +234,19 @@ class QuartoRenderMinimal(util.HasTime):
     origin: str
     target: str
     status_code: int
+    duration: Annotated[
+        float | None,
+        pydantic.Field(None, description="Seconds spent rendering the target."),
+    ]
+    artifact: QuartoRenderArtifact
+    status: QuartoRenderStatus
+
+    @pydantic.model_validator(mode="after")
+    def determine_status(self) -> Self:
+        if self.status is None:
+            self.status = "failure" if self.status_code else "success"
+
+        return self
 
     @pydantic.computed_field  # type: ignore[prop-decorator]
     @property
@@ -199,16 +270,47 @@ class QuartoRenderMinimal(util.HasTime):
         _from: QuartoRenderFrom,
     ) -> Self:
         stdout, stderr = await process.communicate()
+        return cls.fromOutput(
+            target,
+            origin,
+            command=command,
+            stdout=cls.removeANSIEscape(stdout.decode()).split("\n"),
+            stderr=cls.removeANSIEscape(stderr.decode()).split("\n"),
+            status_code=process.returncode,  # type: ignore[arg-type]
+            kind=kind,
+            _from=_from,
+        )
+
+    @classmethod
+    def fromOutput(
+        cls,
+        target: pathlib.Path,
+        origin: pathlib.Path,
+        *,
+        command: list[str],
+        stdout: list[str],
+        stderr: list[str],
+        status_code: int,
+        kind: QuartoRenderKind,
+        _from: QuartoRenderFrom,
+        duration: float | None = None,
+        status: QuartoRenderStatus = None,
+    ) -> Self:
+        """Create from output that was already read, e.g. when streaming the
+        output of ``quarto render``."""
+
         return cls.model_validate(
             {
                 "target": str(os.path.relpath(target, env.WORKDIR)),
                 "origin": str(os.path.relpath(origin, env.WORKDIR)),
                 "command": command,
-                "stderr": cls.removeANSIEscape(stdout.decode()).split("\n"),
-                "stdout": cls.removeANSIEscape(stderr.decode()).split("\n"),
-                "status_code": process.returncode,
+                "stderr": stderr,
+                "stdout": stdout,
+                "status_code": status_code,
                 "kind": kind,
                 "from": _from,
+                "duration": duration,
+                "status": status,
             }
         )
 
@@ -219,19 +321,65 @@ class QuartoRender(QuartoRenderMinimal):
     stdout: list[str]
 
 
+class QuartoRenderProgress(util.HasTime):
+    """Schema for events published while a render is running.
+
+    A render publishes a ``start`` event, a ``line`` event for every line of
+    output as it is produced, and a ``done`` event with the exit code. The
+    complete output is still available from :class:`QuartoRender`.
+    """
+
+    event: Literal["start", "line", "done"]
+    target: str
+    origin: str
+    stream: Literal["stdout", "stderr"] | None = None
+    line: str | None = None
+    status_code: int | None = None
+
+
 class BaseLog(util.HasTime, db.HasMongoId):
+    """A run of the server and the items logged during it.
+
+    Runs are documents in ``_collection``. Their items are separate documents
+    in ``_collection_items`` that reference the run by ``run`` and are ordered
+    within it by ``index``, so that pushing an item never rewrites the run
+    and reads only scan the items that were asked for. Reads return the same
+    shape as when items were embedded in the run, with ``count`` being the
+    number of items returned.
+
+    :seealso: :meth:`migrate` for runs with embedded items.
+    """
+
     _collection: ClassVar[str]
+    _collection_items: ClassVar[str]
+    _indexes: ClassVar[list[list[tuple[str, int]]]] = [[("run", 1), ("index", 1)]]
 
     uuid_uvicorn: UvicornUUID
     count: Annotated[int, pydantic.Field(default=0)]
 
+    @classmethod
+    async def create_indexes(cls, db: motor.motor_asyncio.AsyncIOMotorDatabase):
+        """Create the indexes of ``_collection_items``. Indexes that exist are
+        left as they are."""
+
+        collection = db[cls._collection_items]
+        for index, keys in enumerate(cls._indexes):
+            # NOTE: Items are unique by run and position, which makes
+            #       ``migrate`` safe to run again after being interrupted.
+            await collection.create_index(keys, unique=not index)
+
+        await db[cls._collection].create_index([("timestamp", -1)])
+
     @classmethod
     async def spawn(cls, db: motor.motor_asyncio.AsyncIOMotorDatabase):
+        await cls.create_indexes(db)
+
         collection = db[cls._collection]
         res = await collection.insert_one(
             {
                 "timestamp": datetime.datetime.timestamp(datetime.datetime.now()),
-                "items": [],
+                "uuid_uvicorn": env.RUN_UUID,
+                "count": 0,
             }
         )
         return res
@@ -243,68 +391,79 @@ class BaseLog(util.HasTime, db.HasMongoId):
         mongo_id: bson.ObjectId,
         data: list[Any],
     ):
-        collection = db[cls._collection]
-        res = await collection.update_one(
+        """Add :param:`data` to the items of the run :param:`mongo_id`.
+
+        Positions are reserved by incrementing the ``count`` of the run, so
+        that concurrent pushes do not reuse them.
+
+        :returns: The items as inserted, with their ``run`` and ``index``.
+        """
+
+        if not data:
+            return list()
+
+        run = await db[cls._collection].find_one_and_update(
             {"_id": mongo_id},
-            {"$push": {"items": {"$each": data}}},
+            {"$inc": {"count": len(data)}},
+            projection={"count": True},
+            return_document=pymongo.ReturnDocument.AFTER,
         )
-        return res
+        if run is None:
+            raise ValueError(f"No run `{mongo_id}` in `{cls._collection}`.")
+
+        start = run["count"] - len(data)
+        items = [
+            {**item, "run": mongo_id, "index": start + index}
+            for index, item in enumerate(data)
+        ]
+        await db[cls._collection_items].insert_many(items)
+        return items
 
     @classmethod
-    def aggr_latest_projection(
-        cls,
-        *,
-        slice_start: int | None = None,
-        slice_count: int | None = None,
-    ):
-        if slice_start is None:
-            slice = {"$slice": ["$items", slice_count]}
-        else:
-            slice = {"$slice": ["$items", slice_start, slice_count]}
-
-        return {
-            "_id": "$_id",
-            "count": "$count",
-            "timestamp": "$timestamp",
-            "items": slice,
-        }
+    async def find_run(
+        cls, db: motor.motor_asyncio.AsyncIOMotorDatabase
+    ) -> dict[str, Any] | None:
+        """Find the latest run, without its items."""
+
+        return await db[cls._collection].find_one(
+            {}, projection={"items": False}, sort=[("timestamp", -1)]
+        )
 
     @classmethod
-    def aggr_latest(
+    async def find_items(
         cls,
+        db: motor.motor_asyncio.AsyncIOMotorDatabase,
+        query: dict[str, Any],
         *,
         slice_start: int | None = None,
         slice_count: int | None = None,
-        include_count: bool = True,
-    ):
-        # counts = {
-        #     f"count{item.title()}": {
-        #         "$size": {
-        #             "$filter": {
-        #                 "input": "$items",
-        #                 "as": "item",
-        #                 "cond": {"$eq": ["$$item.kind", item]},
-        #             }
-        #         }
-        #     }
-        #     for item in ("static", "defered", "direct")
-        # }
-        steps = [
-            {"$sort": {"timestamp": -1}},
-            {"$limit": 1},
-        ]
-
-        # NOTE: Add slice counting to steps.
+    ) -> list[dict[str, Any]]:
+        """Find the items matching :param:`query` in order, sliced like
+        ``$slice`` would slice the embedded items.
+
+        :param slice_start: Position of the first item, negative positions
+            count from the end. Ignored without :param:`slice_count`.
+        :param slice_count: Number of items. When :param:`slice_start` is not
+            provided, negative counts take the last items.
+        """
+
+        collection = db[cls._collection_items]
+        skip, limit = 0, 0
         if slice_count is not None:
-            projection = cls.aggr_latest_projection(
-                slice_start=slice_start,
-                slice_count=slice_count,
-            )
-            steps.append({"$addFields": projection})
+            if slice_start is None and slice_count < 0:
+                slice_start, slice_count = slice_count, -slice_count
+
+            if slice_count <= 0:
+                return list()
+
+            if slice_start is not None and slice_start < 0:
+                total = await collection.count_documents(query)
+                slice_start = max(total + slice_start, 0)
+
+            skip, limit = slice_start or 0, slice_count
 
-        if include_count:
-            steps.append({"$addFields": {"count": {"$size": "$items"}}})
-        return steps
+        cursor = collection.find(query, projection={"_id": False}, sort=[("index", 1)])
+        return await cursor.skip(skip).limit(limit).to_list(None)
 
     @classmethod
     async def clear(
@@ -314,11 +473,12 @@ class BaseLog(util.HasTime, db.HasMongoId):
         """Clear all log entries besides the latest."""
 
         collection = db[cls._collection]
-        steps = cls.aggr_latest()
-        steps.append({"$project": {"_id": "$_id"}})
+        run = await cls.find_run(db)
+        if run is None:
+            return await collection.delete_many({})
 
-        _id_no_rm = await collection.aggregate(steps).to_list(None)
-        res = await collection.delete_many({"_id": {"$not": {"$eq": _id_no_rm}}})
+        await db[cls._collection_items].delete_many({"run": {"$ne": run["_id"]}})
+        res = await collection.delete_many({"_id": {"$ne": run["_id"]}})
 
         return res
 
@@ -329,19 +489,105 @@ class BaseLog(util.HasTime, db.HasMongoId):
         *,
         slice_start: int | None = None,
         slice_count: int | None = None,
-        **kwargs,
+        query: dict[str, Any] | None = None,
     ):
-        """Find the latest log entry."""
+        """Find the latest log entry.
 
-        collection = db[cls._collection]
-        steps = cls.aggr_latest(
-            slice_start=slice_start, slice_count=slice_count, **kwargs
+        :param query: Only include items matching this query.
+        """
+
+        run = await cls.find_run(db)
+        if run is None:
+            return None
+
+        items = await cls.find_items(
+            db,
+            {**(query or dict()), "run": run["_id"]},
+            slice_start=slice_start,
+            slice_count=slice_count,
         )
+        return cls.model_validate({**run, "items": items, "count": len(items)})
 
-        async for item in collection.aggregate(steps):
-            return cls.model_validate(item)
+    @classmethod
+    def matches(cls, item: Any, **kwargs) -> bool:
+        """Check that a published :param:`item` would be returned by
+        :meth:`latest` with the same keyword arguments."""
 
-        return None
+        return True
+
+    @classmethod
+    async def follow(
+        cls,
+        db: motor.motor_asyncio.AsyncIOMotorDatabase,
+        callback: Callable[[Any], None],
+        *,
+        interval: float = 1,
+        grace: float = 10,
+    ) -> None:
+        """Call :param:`callback` with the items pushed to the latest run,
+        checking every :param:`interval` seconds. Runs until cancelled.
+
+        This is how items pushed by other processes (e.g. ``acederbergio
+        quarto render``) reach websockets, since only those of the current
+        process are published directly. Items are validated as the items of
+        :meth:`latest` and have their position set, so that those published
+        both ways can be told apart.
+
+        Since :meth:`push` reserves positions before inserting, concurrent
+        pushes may insert items out of order. Positions skipped over are
+        checked again for :param:`grace` seconds.
+        """
+
+        (item_type,) = get_args(cls.model_fields["items"].annotation)
+        loop = asyncio.get_running_loop()
+
+        run_id, index = None, 0
+        missing: dict[int, float] = dict()  # position -> deadline
+        while True:
+            run = await cls.find_run(db)
+            if run is not None and run["_id"] != run_id:
+                following = run_id is not None
+                run_id, index, missing = run["_id"], 0, dict()
+
+                # NOTE: Items of the run current when following started were
+                #       pushed before, unless they are not inserted yet.
+                if not following:
+                    index = run.get("count", 0)
+                    start = max(index - 128, 0)
+                    query = {"run": run_id, "index": {"$gte": start}}
+                    found = {item["index"] for item in await cls.find_items(db, query)}
+                    deadline = loop.time() + grace
+                    missing = {
+                        position: deadline
+                        for position in range(start, index)
+                        if position not in found
+                    }
+
+            if run_id is not None:
+                now = loop.time()
+                missing = {k: v for k, v in missing.items() if v > now}
+                query = {
+                    "run": run_id,
+                    "$or": [
+                        {"index": {"$gte": index}},
+                        {"index": {"$in": list(missing)}},
+                    ],
+                }
+                for item in await cls.find_items(db, query):
+                    if item["index"] >= index:
+                        missing.update(
+                            (position, now + grace)
+                            for position in range(index, item["index"])
+                        )
+                        index = item["index"] + 1
+
+                    missing.pop(item["index"], None)
+                    try:
+                        callback(item_type.model_validate(item))
+                    except pydantic.ValidationError as err:
+                        logger.warning("Not following invalid item: %s", err)
+
+            await asyncio.sleep(interval)
 
     @classmethod
     async def status(
@@ -354,11 +600,56 @@ class BaseLog(util.HasTime, db.HasMongoId):
         res = await collection.count_documents({})
         return res
 
+    @classmethod
+    async def migrate(cls, db: motor.motor_asyncio.AsyncIOMotorDatabase) -> int:
+        """Move the items embedded in runs into ``_collection_items``.
+
+        Runs are only updated after their items are inserted. When interrupted,
+        this can be run again since items that were already moved are skipped
+        by the unique index.
+
+        :returns: The number of runs migrated.
+        """
+
+        await cls.create_indexes(db)
+
+        collection = db[cls._collection]
+        count = 0
+        async for run in collection.find({"items": {"$type": "array"}}):
+            items = [
+                {**item, "run": run["_id"], "index": index}
+                for index, item in enumerate(run["items"])
+            ]
+            if items:
+                try:
+                    await db[cls._collection_items].insert_many(items, ordered=False)
+                except pymongo.errors.BulkWriteError as err:
+                    duplicate = all(
+                        item["code"] == 11000 for item in err.details["writeErrors"]
+                    )
+                    if not duplicate:
+                        raise
+
+            await collection.update_one(
+                {"_id": run["_id"]},
+                {"$set": {"count": len(items)}, "$unset": {"items": ""}},
+            )
+            logger.info("Migrated `%s` items of run `%s`.", len(items), run["_id"])
+            count += 1
+
+        return count
+
 
 # NOTE: This could be cleaned up using generics. However, fastapi does not like
 #       generics so I will not be using them here.
 class Log(BaseLog):
     _collection = "logs"
+    _collection_items = "logs_items"
+    _indexes = [
+        *BaseLog._indexes,
+        [("run", 1), ("created", -1)],
+        [("run", 1), ("levelno", 1), ("index", 1)],
+    ]
 
     items: Annotated[
         list[LogItem],
@@ -371,6 +662,15 @@ T_QuartoRender = TypeVar("T_QuartoRender", bound=QuartoRenderMinimal)
 
 class QuartoHistory(BaseLog, Generic[T_QuartoRender]):
     _collection = "quarto"
+    _collection_items = "quarto_items"
+    _indexes = [
+        *BaseLog._indexes,
+        [("run", 1), ("timestamp", -1)],
+        [("run", 1), ("target", 1), ("index", 1)],
+        [("run", 1), ("kind", 1), ("status_code", 1), ("index", 1)],
+        [("target", 1), ("timestamp", -1)],
+        [("kind", 1), ("timestamp", -1)],
+    ]
 
     items: Annotated[
         list[T_QuartoRender],
@@ -378,72 +678,101 @@ class QuartoHistory(BaseLog, Generic[T_QuartoRender]):
     ]
 
     @classmethod
-    def aggr_latest(
+    async def latest(
         cls,
+        db: motor.motor_asyncio.AsyncIOMotorDatabase,
         *,
         filters: "QuartoHistoryFilters | None" = None,
         slice_start: int | None = None,
         slice_count: int | None = None,
-        include_count: bool = True,
-        do_print: bool = False,
+        query: dict[str, Any] | None = None,
     ):
-        pipe = super().aggr_latest(
-            slice_start=slice_start,
-            slice_count=slice_count,
-            include_count=include_count,
-        )
+        """Find the latest run with items matching :param:`filters`, which
+        are applied before slicing."""
 
-        #  NOTE: Projections must occur separately.
         if filters is not None:
-            filter = filters.create_filter()
-            pipe.insert(2, {"$addFields": {"items": filter}})
+            query = {**(query or dict()), **filters.create_query()}
 
-        if do_print:
-            print("filters", filters)
-            print("pipe", pipe)
+        return await super().latest(
+            db, slice_start=slice_start, slice_count=slice_count, query=query
+        )
 
-        return pipe
+    @classmethod
+    def matches(
+        cls,
+        item: QuartoRenderMinimal,
+        *,
+        filters: "QuartoHistoryFilters | None" = None,
+        **kwargs,
+    ) -> bool:
+        return filters is None or filters.matches(item)
 
     @classmethod
-    def aggr_last_rendered(cls, filters: "QuartoHistoryFilters | None" = None):
+    async def last_rendered(
+        cls,
+        db: motor.motor_asyncio.AsyncIOMotorDatabase,
+        filters: "QuartoHistoryFilters | None" = None,
+    ) -> Self | None:
+        """Find the last render matching :param:`filters` in any run, along
+        with its run."""
+
+        query = filters.create_query() if filters is not None else dict()
+        item = await db[cls._collection_items].find_one(
+            query,
+            projection={"_id": False},
+            sort=[("timestamp", -1), ("run", -1), ("index", -1)],
+        )
+        if item is None:
+            return None
+
+        run = await db[cls._collection].find_one(
+            {"_id": item["run"]}, projection={"items": False}
+        )
+        if run is None:
+            return None
 
-        latest = cls.aggr_latest(filters=None, include_count=False)
+        return cls.model_validate({**run, "items": [item], "count": 1})
 
+    @classmethod
+    def aggr_recent_targets(
+        cls,
+        count: int,
+        filters: "QuartoHistoryFilters | None" = None,
+    ):
+        pipe: list[dict[str, Any]] = list()
         if filters is not None:
-            latest.insert(0, {"$addFields": {"items": filters.create_filter()}})
+            pipe.append({"$match": filters.create_query()})
 
-        latest.insert(
-            1,
+        order = {"$sort": {"timestamp": -1, "run": -1, "index": -1}}
+        pipe += [
+            order,
             {
-                "$addFields": {
-                    "items": {"$last": "$items"},
-                    "timestamp": "$timestamp",
-                    "_id": "$_id",
-                    "uuid_uvicorn": "$uuid_uvicorn",
-                    "count": 1,
+                "$group": {
+                    "_id": "$target",
+                    "timestamp": {"$first": "$timestamp"},
+                    "run": {"$first": "$run"},
+                    "index": {"$first": "$index"},
                 }
             },
-        )
-
-        latest.insert(2, {"$match": {"items": {"$exists": True}}})
+            order,
+            {"$limit": count},
+        ]
 
-        return latest
+        return pipe
 
     @classmethod
-    async def last_rendered(
+    async def recent_targets(
         cls,
         db: motor.motor_asyncio.AsyncIOMotorDatabase,
+        count: int,
         filters: "QuartoHistoryFilters | None" = None,
-    ) -> Self | None:
-
-        aggr = cls.aggr_last_rendered(filters)
-        res = db[cls._collection].aggregate(aggr)
-        async for item in res:
-            item["items"] = [item["items"]]
+    ) -> list[str]:
+        """The :param:`count` most recently rendered targets across every
+        run, most recent first."""
 
-            return cls.model_validate(item)
-
-        return None
+        aggr = cls.aggr_recent_targets(count, filters)
+        collection = db[cls._collection_items]
+        return [item["_id"] async for item in collection.aggregate(aggr)]
 
 
 QuartoHistoryFull = QuartoHistory[QuartoRender]
@@ -473,31 +802,74 @@ class QuartoHistoryFilters(pydantic.BaseModel):
     ]
     kind: Annotated[list[QuartoRenderKind] | None, pydantic.Field(default=None)]
 
-    def create_filter(self) -> dict[str, Any]:
-        conds: list[dict[str, Any]] = []
+    def create_query(self) -> dict[str, Any]:
+        """Query for the items of :class:`QuartoHistory` matching these
+        filters.
+
+        Style renders are not filtered by :ivar:`targets`, since their target
+        is a stylesheet which every page may link.
+        """
+
+        query: dict[str, Any] = dict()
         if self.errors is not None:
-            conds.append({"$ne" if self.errors else "$eq": ["$$item.status_code", 0]})
+            query["status_code"] = {"$ne": 0} if self.errors else 0
         if self.targets is not None:
-            conds.append({"$in": ["$$item.target", self.targets]})
+            query["$or"] = [{"target": {"$in": self.targets}}, {"kind": "style"}]
         if self.origins is not None:
-            conds.append({"$in": ["$$item.origin", self.origins]})
+            query["origin"] = {"$in": self.origins}
         if self.kind is not None:
-            conds.append({"$in": ["$$item.kind", self.kind]})
+            query["kind"] = {"$in": self.kind}
 
-        cond = {"$and": conds}
-        return {"$filter": {"input": "$items", "as": "item", "cond": cond}}
+        return query
+
+    def matches(self, item: QuartoRenderMinimal) -> bool:
+        """Check :param:`item` like :meth:`create_query` would."""
+
+        if self.errors is not None and self.errors != bool(item.status_code):
+            return False
+        if (
+            self.targets is not None
+            and item.target not in self.targets
+            and item.kind != "style"
+        ):
+            return False
+        if self.origins is not None and item.origin not in self.origins:
+            return False
+        if self.kind is not None and item.kind not in self.kind:
+            return False
+
+        return True
 
 
 class QuartoRenderRequestItem(pydantic.BaseModel):
+    """A file, directory, or glob pattern to render.
+
+    Glob patterns are relative to the project root, e.g. ``blog/posts/**/*.qmd``.
+    With ``since``, only what changed since a git ref is rendered, along with
+    the documents depending on changes.
+    """
 
     kind_handler_result: ClassVar[KindHandlerResult] = "request"
 
-    kind: Annotated[Literal["file", "directory"], pydantic.Field("file")]
+    kind: Annotated[Literal["file", "directory", "glob"], pydantic.Field("file")]
     path: Annotated[str, pydantic.Field()]
     directory_depth_max: Annotated[int, pydantic.Field(100, exclude=True)]
+    since: Annotated[
+        str | None,
+        pydantic.Field(
+            None,
+            description=(
+                "Git ref. Only render documents in ``path`` that changed since "
+                "this ref or depend on files that did."
+            ),
+        ),
+    ]
 
     @pydantic.model_validator(mode="before")
     def validate_path(cls, v):
+        if v.get("kind") == "glob":
+            return cls.validate_pattern(v)
+
         is_directory = v.get("kind") == "directory"
         path = parse_path(v["path"], directory=is_directory)
         v["path"] = str(path.relative_to(env.WORKDIR))
@@ -516,6 +888,24 @@ class QuartoRenderRequestItem(pydantic.BaseModel):
 
         return v
 
+    @pydantic.field_validator("since")
+    def validate_since(cls, v):
+        return v if v is None else changed.validate_since(v)
+
+    @classmethod
+    def validate_pattern(cls, v):
+        pattern = pathlib.PurePath(v["path"])
+        if pattern.is_absolute():
+            if not pattern.is_relative_to(env.WORKDIR):
+                raise ValueError(f"Pattern `{pattern}` is not in `{env.WORKDIR}`.")
+            pattern = pattern.relative_to(env.WORKDIR)
+
+        if not pattern.parts or ".." in pattern.parts:
+            raise ValueError(f"Pattern `{v['path']}` must be within the project.")
+
+        v["path"] = str(pattern)
+        return v
+
 
 class QuartoRenderRequest(pydantic.BaseModel):
     """Use this to request a render."""
@@ -547,6 +937,13 @@ class QuartoRenderResponse(pydantic.BaseModel, Generic[T_QuartoRenderResponseIte
     uuid_uvicorn: UvicornUUID
     ignored: Annotated[list[QuartoRenderRequestItem], pydantic.Field()]
     items: Annotated[list[T_QuartoRenderResponseItem], pydantic.Field()]
+    cached: Annotated[
+        list[QuartoRenderCached],
+        pydantic.Field(
+            default_factory=list,
+            description="Targets skipped because their output is up to date.",
+        ),
+    ]
 
     @property
     def kind_handler_result(self) -> KindHandlerResult | None:
@@ -578,12 +975,14 @@ class QuartoRenderResponse(pydantic.BaseModel, Generic[T_QuartoRenderResponseIte
         callback: Callable[["QuartoHandlerResult"], Awaitable[None]] | None = None,
     ) -> Self:
 
-        items, ignored = [], []  # type: ignore[var-annotated]
-        raw = dict(items=items, ignored=ignored)  # type: ignore[var-annotated]
+        items, ignored, cached = [], [], []  # type: ignore[var-annotated]
+        raw = dict(items=items, ignored=ignored, cached=cached)  # type: ignore[var-annotated]
 
         async for item in stream:
             if item.kind == "request":
                 ignored.append(item.data)
+            elif item.kind == "cached":
+                cached.append(item.data)
             else:
                 items.append(item.data)
 
@@ -597,6 +996,7 @@ T_QuartoHandlerResult = TypeVar(
     "T_QuartoHandlerResult",
     QuartoRender,
     QuartoRenderJob,
+    QuartoRenderCached,
     QuartoRenderRequestItem,
 )
 
@@ -613,7 +1013,10 @@ class QuartoHandlerResult(pydantic.BaseModel, Generic[T_QuartoHandlerResult]):
 QuartoHandlerRender = QuartoHandlerResult[QuartoRender]
 QuartoHandlerJob = QuartoHandlerResult[QuartoRenderJob]
 QuartoHandlerRequest = QuartoHandlerResult[QuartoRenderRequestItem]
-QuartoHandlerAny = QuartoHandlerRequest | QuartoHandlerJob | QuartoHandlerRender
+QuartoHandlerCached = QuartoHandlerResult[QuartoRenderCached]
+QuartoHandlerAny = (
+    QuartoHandlerRequest | QuartoHandlerJob | QuartoHandlerRender | QuartoHandlerCached
+)
 
 
 class LogStatus(pydantic.BaseModel):
@@ -0,0 +1,188 @@
+"""Split ``acederbergio quarto build`` between many runners.
+
+Every runner plans the whole build (see
+:meth:`acederbergio.api.quarto.Handler.plan`) and keeps only its share of the
+jobs. Shares are determined from the plan and the durations recorded in the
+build manifest only, so runners with the same tree and manifest agree on them
+without communicating. Jobs are assigned longest first to the shard with the
+least estimated work, which keeps the slowest shard (and so the build) short.
+
+Each shard writes its own report, ``quarto_renders.shard-<i>-of-<n>.jsonl``,
+to its build directory. Once every shard is done, their build directories are
+combined using :func:`merge` (``acederbergio quarto build merge``).
+"""
+
+import os
+import pathlib
+import re
+from typing import Any, Iterable, NamedTuple
+
+from acederbergio import env
+from acederbergio.api import manifest, report, schemas, sync
+
+logger = env.create_logger(__name__)
+
+PATTERN_SHARD = re.compile(r"^\s*(?P<index>\d+)\s*/\s*(?P<count>\d+)\s*$")
+REPORT_GLOB = "quarto_renders.shard-*.jsonl"
+
+
+class Shard(NamedTuple):
+    """A share of the build.
+
+    :ivar index: Which shard, starting at ``1``.
+    :ivar count: Total number of shards.
+    """
+
+    index: int
+    count: int
+
+    @classmethod
+    def parse(cls, v: str) -> "Shard":
+        """Parse ``i/n``, e.g. ``2/3`` for the second of three shards."""
+
+        if (match := PATTERN_SHARD.match(v)) is None:
+            raise ValueError(f"Shard must look like `i/n`, got `{v}`.")
+
+        shard = cls(int(match.group("index")), int(match.group("count")))
+        if not 1 <= shard.index <= shard.count:
+            raise ValueError(f"Shard index must be in `1..{shard.count}`, got `{v}`.")
+
+        return shard
+
+    @property
+    def report(self) -> str:
+        return f"quarto_renders.shard-{self.index}-of-{self.count}.jsonl"
+
+    def select(
+        self,
+        jobs: list[schemas.QuartoRenderJob],
+        estimates: dict[str, float],
+    ) -> list[schemas.QuartoRenderJob]:
+        """Jobs from :param:`jobs` belonging to this shard, in plan order."""
+
+        shares = partition(jobs, estimates, self.count)
+        mine = {job.target for job in shares[self.index - 1]}
+        return [job for job in jobs if job.target in mine]
+
+
+def partition(
+    jobs: Iterable[schemas.QuartoRenderJob],
+    estimates: dict[str, float],
+    count: int,
+) -> list[list[schemas.QuartoRenderJob]]:
+    """Partition :param:`jobs` between :param:`count` shards.
+
+    Jobs are assigned longest first to the shard with the least estimated
+    work. Ties are broken by target and then by shard, so the result only
+    depends on the inputs.
+
+    :param estimates: Estimated seconds for each target, see
+        :class:`acederbergio.api.quarto.Estimate`. Targets without an
+        estimate (e.g. those up to date) count as no work.
+    """
+
+    shares: list[list[schemas.QuartoRenderJob]] = [list() for _ in range(count)]
+    loads = [0.0] * count
+
+    ordered = sorted(jobs, key=lambda job: (-estimates.get(job.target, 0), job.target))
+    for job in ordered:
+        index = min(range(count), key=lambda item: (loads[item], item))
+        shares[index].append(job)
+        loads[index] += estimates.get(job.target, 0)
+
+    return shares
+
+
+def merge_reports(paths: list[pathlib.Path], dest: pathlib.Path) -> None:
+    """Combine the reports of shards (see :mod:`acederbergio.api.report`) into
+    :param:`dest`.
+
+    A target should only be in one report, however when it is in many the
+    first render is kept over it being cached or ignored.
+    """
+
+    def key(line: dict[str, Any]) -> str:
+        return line["data"].get("target") or line["data"]["path"]
+
+    rendered = {
+        key(line)
+        for path in paths
+        for line in report.read(path)
+        if line["kind"] == "render"
+    }
+
+    seen: set[str] = set()
+    with report.Writer(dest) as writer:
+        for path in paths:
+            for line in report.read(path, output=True):
+                if (target := key(line)) in seen:
+                    continue
+                elif line["kind"] != "render" and target in rendered:
+                    continue
+
+                seen.add(target)
+                writer.write_line(line)
+
+
+def merge_manifests(manifests: Iterable[manifest.Manifest]) -> manifest.Manifest:
+    """Combine the manifests of shards, the latest record of a target wins."""
+
+    out = manifest.Manifest()
+    for item in manifests:
+        for key, record in item.items.items():
+            current = out.items.get(key)
+            if current is None or record.timestamp > current.timestamp:
+                out.items[key] = record
+
+    return out
+
+
+def merge(
+    directories: list[pathlib.Path],
+    dest: pathlib.Path,
+) -> list[sync.SyncItem]:
+    """Combine the build directories of shards into :param:`dest`.
+
+    Files are copied when missing from :param:`dest` or newer than the copy
+    there, so outputs come from the shard that rendered them while files that
+    every shard writes (e.g. ``site_libs``) are only copied once. Reports and
+    manifests are merged instead, see :func:`merge_reports` and
+    :func:`merge_manifests`, and the merged report is summarized in
+    ``quarto_renders.yaml`` (see :func:`report.write_summary`).
+
+    :param directories: Build directories of the shards.
+    :param dest: Build directory to merge into.
+    :returns: What was done for each file.
+    """
+
+    dest = dest.resolve()
+    excluded = {manifest.PATH.name, report.PATH.name, report.PATH_SUMMARY.name}
+
+    def is_ignored(path: pathlib.Path) -> bool:
+        return path.name in excluded or path.match(REPORT_GLOB)
+
+    out: list[sync.SyncItem] = list()
+    reports: list[pathlib.Path] = list()
+    manifests: list[manifest.Manifest] = list()
+    for directory in directories:
+        directory = directory.resolve()
+        if not os.path.isdir(directory):
+            raise ValueError(f"No such directory `{directory}`.")
+
+        reports.extend(sorted(directory.glob(REPORT_GLOB)))
+        manifests.append(manifest.Manifest.load(directory / manifest.PATH.name))
+        if directory == dest:
+            continue
+
+        for item in sync.sync_directory(
+            directory, dest, remove_orphans=False, is_ignored=is_ignored, newer=True
+        ):
+            out.append(item)
+
+    logger.info("Merging `%s` reports.", len(reports))
+    dest.mkdir(parents=True, exist_ok=True)
+    merge_reports(reports, dest / report.PATH.name)
+    report.write_summary(dest / report.PATH.name, dest / report.PATH_SUMMARY.name)
+
+    merge_manifests(manifests).save(dest / manifest.PATH.name)
+    return out
@@ -0,0 +1,233 @@
+"""In-process synchronization of static assets into the build directory.
+
+Replaces spawning ``cp`` for every static change and deleting then copying
+``js`` during builds. Files are only copied when they differ, which is
+determined by size and modification time and, when these disagree, by the
+contents. Copies use ``shutil.copyfile``, which uses ``os.sendfile`` where
+the platform supports it, and are written to a temporary file first so that
+the development server never serves a partial file.
+
+Hard links are optional since ``quarto`` writes into the build directory and
+would modify the linked source.
+"""
+
+import contextlib
+import os
+import pathlib
+import re
+import shutil
+from typing import Annotated, Callable, Iterable, Literal
+
+import pydantic
+
+from acederbergio import env
+from acederbergio.api import manifest
+
+logger = env.create_logger(__name__)
+
+SyncAction = Literal["copied", "linked", "unchanged", "removed"]
+PATTERN_HASHED = re.compile(r"^(?P<stem>.+)-[0-9a-f]{8,}(?P<suffix>(\.min)?\.css)$")
+PATTERN_LINKED = re.compile(
+    r"""href=["'](?:[^"']*/)?site_libs/(?P<path>[^"']+\.css)["']"""
+)
+
+
+class SyncItem(pydantic.BaseModel):
+    source: Annotated[pathlib.Path | None, pydantic.Field()]
+    dest: Annotated[pathlib.Path, pydantic.Field()]
+    action: Annotated[SyncAction, pydantic.Field()]
+
+    def __str__(self) -> str:
+        if self.source is None:
+            return f"{self.action.title()} `{self.dest}`."
+
+        return f"{self.action.title()} `{self.source}` to `{self.dest}`."
+
+
+def is_unchanged(source: pathlib.Path, dest: pathlib.Path) -> bool:
+    """Check if :param:`dest` is already a copy of :param:`source`."""
+
+    try:
+        stat_dest = os.stat(dest)
+    except FileNotFoundError:
+        return False
+
+    stat_source = os.stat(source)
+    if stat_source.st_size != stat_dest.st_size:
+        return False
+    elif os.path.samestat(stat_source, stat_dest):
+        return True
+    elif stat_source.st_mtime_ns == stat_dest.st_mtime_ns:
+        return True
+
+    return manifest.hash_file(source) == manifest.hash_file(dest)
+
+
+def is_newer(path: pathlib.Path, other: pathlib.Path) -> bool:
+    """Check if :param:`path` exists and was modified no earlier than
+    :param:`other`."""
+
+    try:
+        return os.stat(path).st_mtime_ns >= os.stat(other).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def sync_file(
+    source: pathlib.Path,
+    dest: pathlib.Path,
+    *,
+    link: bool = False,
+    newer: bool = False,
+) -> SyncItem:
+    """Make :param:`dest` a copy of :param:`source` if it is not already.
+
+    :param link: Try to hard link instead of copying.
+    :param newer: Only replace :param:`dest` when :param:`source` was
+        modified more recently.
+    """
+
+    if newer and is_newer(dest, source):
+        return SyncItem(source=source, dest=dest, action="unchanged")
+
+    if is_unchanged(source, dest):
+        # NOTE: Matching modification times avoid hashing next time.
+        stat = os.stat(source)
+        if os.stat(dest).st_mtime_ns != stat.st_mtime_ns:
+            os.utime(dest, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+        return SyncItem(source=source, dest=dest, action="unchanged")
+
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    dest_tmp = dest.with_name(f".{dest.name}.sync")
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(dest_tmp)
+
+    action: SyncAction = "copied"
+    if link:
+        try:
+            os.link(source, dest_tmp)
+            action = "linked"
+        except OSError as err:
+            logger.debug("Could not link `%s`: %s", source, err)
+
+    if action == "copied":
+        shutil.copyfile(source, dest_tmp)
+        shutil.copystat(source, dest_tmp)
+
+    os.replace(dest_tmp, dest)
+    return SyncItem(source=source, dest=dest, action=action)
+
+
+def sync_directory(
+    source: pathlib.Path,
+    dest: pathlib.Path,
+    *,
+    link: bool = False,
+    newer: bool = False,
+    remove_orphans: bool = True,
+    is_ignored: Callable[[pathlib.Path], bool] | None = None,
+) -> list[SyncItem]:
+    """Make :param:`dest` a copy of :param:`source`.
+
+    :param link: See :func:`sync_file`.
+    :param newer: See :func:`sync_file`.
+    :param remove_orphans: Remove files (and then empty directories) in
+        :param:`dest` that are not in :param:`source`.
+    :param is_ignored: Skip files in :param:`source` for which this is true.
+    :returns: What was done for each file.
+    """
+
+    out = list()
+    synced: set[pathlib.Path] = set()
+    for directory, _, files in os.walk(source):
+        base = pathlib.Path(directory)
+        for name in files:
+            path = base / name
+            if is_ignored is not None and is_ignored(path):
+                continue
+
+            relpath = path.relative_to(source)
+            synced.add(relpath)
+            out.append(sync_file(path, dest / relpath, link=link, newer=newer))
+
+    if not remove_orphans or not os.path.isdir(dest):
+        return out
+
+    for directory, directories, files in os.walk(dest, topdown=False):
+        base = pathlib.Path(directory)
+        for name in files:
+            path = base / name
+            if path.relative_to(dest) in synced:
+                continue
+
+            os.remove(path)
+            out.append(SyncItem(source=None, dest=path, action="removed"))
+
+        for name in directories:
+            with contextlib.suppress(OSError):
+                os.rmdir(base / name)
+
+    return out
+
+
+def find_stylesheets(html: pathlib.Path) -> set[pathlib.Path]:
+    """Find the stylesheets from ``site_libs`` that :param:`html` links to.
+
+    :returns: Paths relative to ``site_libs``. Empty when :param:`html` does
+        not exist.
+    """
+
+    try:
+        content = html.read_text(errors="replace")
+    except FileNotFoundError:
+        return set()
+
+    return {
+        pathlib.Path(match.group("path")) for match in PATTERN_LINKED.finditer(content)
+    }
+
+
+def sync_stylesheets(
+    source: pathlib.Path,
+    dest: pathlib.Path,
+    linked: Iterable[pathlib.Path] = (),
+) -> list[SyncItem]:
+    """Sync the stylesheets of a ``site_libs`` directory into another.
+
+    ``quarto`` names compiled themes with a hash of their content, e.g.
+    ``bootstrap/bootstrap-<hash>.min.css``, and documents link to the name
+    that was current when they were rendered. Stylesheets in :param:`linked`
+    with the same name and another hash are replaced too, so that documents
+    which were not rendered again use the new styles. Other hashes belong to
+    other themes (e.g. set in a ``_metadata.yml``) and are left alone.
+
+    :param linked: Stylesheets that the document compiled into :param:`source`
+        linked before, relative to ``site_libs``. See :func:`find_stylesheets`.
+    :returns: What was done for each file.
+    """
+
+    linked = set(linked)
+    out = list()
+    for path in sorted(source.rglob("*.css")):
+        relpath = path.relative_to(source)
+        out.append(sync_file(path, dest / relpath))
+        if (match := PATTERN_HASHED.match(path.name)) is None:
+            continue
+
+        stem, suffix = match.group("stem"), match.group("suffix")
+        for other in sorted(linked):
+            match_other = PATTERN_HASHED.match(other.name)
+            if (
+                other == relpath
+                or other.parent != relpath.parent
+                or match_other is None
+                or match_other.group("stem") != stem
+                or match_other.group("suffix") != suffix
+                or not os.path.isfile(dest / other)
+            ):
+                continue
+
+            out.append(sync_file(path, dest / other))
+
+    return out
@@ -149,6 +149,24 @@ export function QuartoOverlayItem(item, { overlayRenders }) {
   return { elem, show }
 }
 
+/** Reload the stylesheets from ``site_libs`` without reloading the page.
+ *
+ * The new stylesheet is added before the old one is removed so that the page
+ * does not flash unstyled content.
+ */
+export function swapStylesheets() {
+  document.querySelectorAll('link[rel="stylesheet"][href*="site_libs/"]').forEach(link => {
+    const url = new URL(link.href)
+    url.searchParams.set("v", String(Date.now()))
+
+    const next = link.cloneNode()
+    next.href = url.toString()
+    next.addEventListener("load", () => link.remove())
+    link.after(next)
+  })
+  LIVE_QUARTO_VERBOSE && console.log("Swapped stylesheets.")
+}
+
 /** Create quarto table table row for a log item.
  *
  * Includes buttons to active the overlay and re-render, kind, origin, time,
@@ -164,6 +182,7 @@ export function QuartoLogItem(item) {
   elem.classList.add(!item.status_code ? "quarto-success" : "quarto-failure")
   elem.classList.add("quarto-row")
   if (item.kind === "static") elem.classList.add("quarto-static")
+  if (item.kind === "style") elem.classList.add("quarto-style")
 
   // RENDER CELL
   async function renderAction() {
@@ -223,6 +242,7 @@ export function QuartoLogItem(item) {
   kind.classList.add("quarto-log-kind")
   if (item.kind == "direct") kind.classList.add("text-warning")
   else if (item.kind == "defered") kind.classList.add("text-primary")
+  else if (item.kind == "style") kind.classList.add("text-info")
   // else kind.classList.add("text-white");
 
   from.textContent = item.item_from
@@ -324,6 +344,13 @@ export function Quarto({ filters, last, table, container, overlayRenders, banner
 
     if (reload && logItem.status_code && index + 1 === data.length) item.overlayItem.show()
 
+    // NOTE: Stylesheets are compiled in place, so there is no need to reload.
+    if (reload && !state.isInitial && logItem.kind === "style") {
+      if (!logItem.status_code) swapStylesheets()
+      banner && banner.show(logItem, { newItem: true })
+      return
+    }
+
     if (reload && !state.isInitial && (logItem.target_url_path == window.location.pathname || logItem.target_url_path == window.location.pathname + "index.html")) {
       ws.close(1000)
       window.location.reload()
@@ -0,0 +1,109 @@
+import os
+import pathlib
+
+import pytest
+
+from acederbergio import env
+from acederbergio.api import artifacts
+
+
+@pytest.fixture
+def build(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> pathlib.Path:
+    build = tmp_path / "build"
+    (build / "posts/example/index_files").mkdir(parents=True)
+    (build / "posts/example/index.html").write_text("<html></html>")
+    (build / "posts/example/index_files/figure.svg").write_text("<svg></svg>")
+    monkeypatch.setattr(env, "BUILD", build)
+    return build
+
+
+def check_roundtrip(build: pathlib.Path, store: artifacts.Store):
+    target = env.BLOG / "posts/example/index.qmd"
+    assert artifacts.find_outputs(target) == [
+        pathlib.Path("posts/example/index.html"),
+        pathlib.Path("posts/example/index_files"),
+    ]
+
+    cache = artifacts.Artifacts(store, toolchain=["quarto=1.6.28"])
+    assert not cache.restore(target, "digest")
+    assert cache.upload(target, "digest")
+
+    os.remove(build / "posts/example/index.html")
+    os.remove(build / "posts/example/index_files/figure.svg")
+    assert cache.restore(target, "digest")
+    assert (build / "posts/example/index.html").read_text() == "<html></html>"
+    assert (build / "posts/example/index_files/figure.svg").exists()
+
+    # NOTE: A different toolchain or digest is a different key.
+    other = artifacts.Artifacts(store, toolchain=["quarto=1.7.0"])
+    assert other.key("digest") != cache.key("digest")
+    assert not other.restore(target, "digest")
+    assert not cache.restore(target, "other")
+
+
+def test_shared(build: pathlib.Path, tmp_path: pathlib.Path):
+    (build / "site_libs").mkdir()
+    (build / "site_libs/quarto.js").write_text("")
+    (build / "search.json").write_text("[]")
+    (build / "posts/example/index.xml").write_text("<rss></rss>")
+    assert artifacts.find_shared() == [
+        pathlib.Path("site_libs"),
+        pathlib.Path("search.json"),
+    ]
+
+    # NOTE: Feeds of listings belong to their page.
+    target = env.BLOG / "posts/example/index.qmd"
+    assert pathlib.Path("posts/example/index.xml") in artifacts.find_outputs(target)
+
+    cache = artifacts.Artifacts(
+        artifacts.LocalStore(tmp_path / "artifacts"), toolchain=[]
+    )
+    assert not cache.restore_shared()
+    assert cache.upload_shared()
+
+    os.remove(build / "site_libs/quarto.js")
+    os.remove(build / "search.json")
+    assert cache.restore_shared()
+    assert artifacts.find_shared() == [
+        pathlib.Path("site_libs"),
+        pathlib.Path("search.json"),
+    ]
+
+    with pytest.raises(TypeError):
+        artifacts.Store()  # type: ignore[abstract]
+
+
+def test_local(build: pathlib.Path, tmp_path: pathlib.Path):
+    store = artifacts.create_store(str(tmp_path / "artifacts"))
+    assert isinstance(store, artifacts.LocalStore)
+    check_roundtrip(build, store)
+
+
+def test_bucket(
+    build: pathlib.Path,
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    # NOTE: Stand in for ``s3cmd``, keeping objects in a local directory.
+    script = tmp_path / "bin/s3cmd"
+    script.parent.mkdir()
+    script.write_text(
+        "#!/bin/sh\n"
+        "shift\n"
+        'if [ "$1" = get ]; then\n'
+        '  path="$S3_ROOT/${3#s3://}"\n'
+        '  [ -f "$path" ] || { echo "404 (Not Found)" >&2; exit 12; }\n'
+        '  cp "$path" "$4"\n'
+        "else\n"
+        '  path="$S3_ROOT/${3#s3://}"\n'
+        '  mkdir -p "$(dirname "$path")" && cp "$2" "$path"\n'
+        "fi\n"
+    )
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{script.parent}:{os.environ['PATH']}")
+    monkeypatch.setenv("S3_ROOT", str(tmp_path / "bucket"))
+
+    store = artifacts.create_store("s3://bucket/artifacts/")
+    assert isinstance(store, artifacts.BucketStore)
+    check_roundtrip(build, store)
+    assert len(list((tmp_path / "bucket/bucket/artifacts").iterdir())) == 1
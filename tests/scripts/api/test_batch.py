@@ -0,0 +1,84 @@
+import asyncio
+import os
+import pathlib
+
+import pytest
+
+from acederbergio.api import quarto
+from acederbergio.api.batch import Batch
+
+
+@pytest.fixture
+def targets(tmp_path: pathlib.Path) -> list[pathlib.Path]:
+    return [tmp_path / "index.qmd", tmp_path / "posts/a/index.qmd", tmp_path / "b.qmd"]
+
+
+class TestBatch:
+
+    def test_success(self, tmp_path: pathlib.Path, targets: list[pathlib.Path]):
+        batch = Batch(targets, tmp_path)
+        first, second, third = targets
+
+        assert batch.feed("stderr", "pandoc") == first
+        assert batch.feed("stderr", "Output created: build/index.html") == first
+        assert batch.current == second
+
+        # NOTE: Outputs are matched on the trailing parts of their paths.
+        assert batch.feed("stderr", "Output created: build/b.html") == third
+        assert batch.current == second
+        assert batch.feed("stdout", "whatever") == second
+
+        status_codes, remaining = batch.status_codes(0)
+        assert status_codes == {first: 0, second: 0, third: 0}
+        assert not remaining
+        assert batch.stderr[first] == ["pandoc", "Output created: build/index.html"]
+        assert batch.stdout[second] == ["whatever"]
+
+    def test_failure(self, tmp_path: pathlib.Path, targets: list[pathlib.Path]):
+        batch = Batch(targets, tmp_path)
+        first, second, third = targets
+
+        batch.feed("stderr", "Output created: build/index.html")
+        assert batch.feed("stderr", "ERROR: oops") == second
+
+        status_codes, remaining = batch.status_codes(1)
+        assert status_codes == {first: 0, second: 1}
+        assert remaining == [third]
+
+
+def test_render_batch(
+    tmp_path: pathlib.Path,
+    targets: list[pathlib.Path],
+    monkeypatch: pytest.MonkeyPatch,
+):
+    # NOTE: Stand in for ``quarto`` which renders its inputs in order and
+    #       stops at the first failure.
+    calls = tmp_path / "calls"
+    script = tmp_path / "bin/quarto"
+    script.parent.mkdir()
+    script.write_text(
+        "#!/bin/sh\n"
+        f'echo "$@" >> {calls}\n'
+        "shift\n"
+        'for arg in "$@"; do\n'
+        '  echo "rendering $arg" >&2\n'
+        "  case \"$arg\" in *posts*) echo 'ERROR: oops' >&2; exit 1;; esac\n"
+        '  echo "Output created: build/$(basename $arg .qmd).html" >&2\n'
+        "done\n"
+    )
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{script.parent}:{os.environ['PATH']}")
+
+    context = quarto.Context(quarto.Config(handler={"batch": 3}))  # type: ignore
+    handler = quarto.Handler(
+        context, quarto.Filter(context), mongo_id=None, _from="client"
+    )
+    results = asyncio.run(handler.render_batch(targets))
+    first, second, third = (item.data for item in results)
+
+    assert first.status_code == 0 and first.target.endswith("index.qmd")
+    assert second.status_code == 1 and "ERROR: oops" in second.stderr
+    assert third.status_code == 0 and third.target.endswith("b.qmd")
+
+    # NOTE: The target after the failure is rendered again.
+    assert len(calls.read_text().splitlines()) == 2
@@ -0,0 +1,37 @@
+import asyncio
+
+from acederbergio.api import broadcast
+
+
+def test_broadcaster():
+    broadcaster: broadcast.Broadcaster[int] = broadcast.Broadcaster(maxsize=2)
+
+    async def doit():
+        with broadcaster.subscribe() as fast, broadcaster.subscribe() as slow:
+            broadcaster.publish(1)
+            assert await broadcast.drain(fast, 8) == [1]
+
+            # NOTE: Slow subscribers lose their oldest messages.
+            broadcaster.publish(2)
+            broadcaster.publish(3)
+            assert await broadcast.drain(fast, 8) == [2, 3]
+            assert await broadcast.drain(slow, 1) == [2]
+            assert await broadcast.drain(slow, 8) == [3]
+
+        assert not broadcaster.subscribers
+        broadcaster.publish(4)
+
+    asyncio.run(doit())
+
+
+def test_seen():
+    seen = broadcast.Seen(size=2)
+    assert seen.add(("run", 0)) and seen.add(("run", 1))
+    assert not seen.add(("run", 0))
+
+    # NOTE: Items without a position are never skipped, the oldest keys are
+    #       forgotten.
+    assert seen.add(None) and seen.add(None)
+    assert seen.add(("run", 2))
+    assert seen.add(("run", 0))
+    assert not seen.add(("run", 2))
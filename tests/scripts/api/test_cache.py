@@ -0,0 +1,63 @@
+import datetime
+import pathlib
+
+import pytest
+
+from acederbergio.api import cache
+
+
+def test_parse_size():
+    assert cache.parse_size("512") == 512
+    assert cache.parse_size("2K") == 2048
+    assert cache.parse_size("1.5mb") == 3 * 2**19
+    assert cache.parse_size(7) == 7
+    assert cache.format_size(3 * 2**29) == "1.5G"
+
+    with pytest.raises(ValueError):
+        cache.parse_size("lots")
+
+
+def test_find_caches(tmp_path: pathlib.Path):
+    for directory in ("posts/a", "posts/b", "node_modules/c"):
+        (tmp_path / directory / cache.NAME / "executed").mkdir(parents=True)
+
+    (tmp_path / "posts/a" / cache.NAME / "executed/x").write_text("12345")
+    assert cache.size_of(tmp_path / "posts/a" / cache.NAME) == 5
+
+    found = cache.find_caches(
+        tmp_path, is_ignored=lambda path: path.name == "node_modules"
+    )
+    assert found == [
+        tmp_path / "posts/a" / cache.NAME,
+        tmp_path / "posts/b" / cache.NAME,
+    ]
+
+
+def test_prune():
+    now = datetime.datetime.now()
+    entries = [
+        cache.CacheEntry(
+            cache=pathlib.Path(f"posts/{name}/{cache.NAME}"),
+            pk=pk,
+            uri=f"posts/{name}/index.ipynb",
+            accessed=now - datetime.timedelta(days=age),
+            size=size,
+        )
+        for pk, (name, age, size) in enumerate(
+            (("a", 1, 100), ("b", 10, 300), ("a", 5, 200), ("c", 0, 50))
+        )
+    ]
+
+    stats = cache.stats(entries)
+    assert [(item.cache.parent.name, item.entries, item.size) for item in stats] == [
+        ("a", 2, 300),
+        ("b", 1, 300),
+        ("c", 1, 50),
+    ]
+    assert stats[0].accessed == entries[0].accessed
+
+    # NOTE: Least recently used entries go first, until the rest fit.
+    removed = cache.prune(entries, size_max=300, dry_run=True)
+    assert [entry.pk for entry in removed] == [1, 2]
+    assert cache.prune(entries, size_max=650, dry_run=True) == []
+    assert cache.list_entries([]) == []
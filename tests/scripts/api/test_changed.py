@@ -0,0 +1,55 @@
+import pathlib
+
+import git
+import pytest
+
+from acederbergio.api import changed
+
+
+def test_find_changed(tmp_path: pathlib.Path):
+    repo = git.Repo.init(tmp_path, initial_branch="main")
+    with repo.config_writer() as config:
+        config.set_value("user", "name", "test")
+        config.set_value("user", "email", "test@example.com")
+
+    for name in ("a.qmd", "b.qmd", "c.qmd"):
+        (tmp_path / name).write_text(name)
+
+    repo.index.add(["a.qmd", "b.qmd", "c.qmd"])
+    repo.index.commit("Initial.")
+
+    # NOTE: Changes on ``main`` after branching are not included.
+    repo.create_head("feature").checkout()
+    (tmp_path / "a.qmd").write_text("changed")
+    repo.index.add(["a.qmd"])
+    repo.index.commit("Change.")
+
+    repo.heads.main.checkout()
+    (tmp_path / "c.qmd").write_text("changed on main")
+    repo.index.add(["c.qmd"])
+    repo.index.commit("Main.")
+    repo.heads.feature.checkout()
+
+    (tmp_path / "b.qmd").unlink()
+    (tmp_path / "d.qmd").write_text("untracked")
+
+    assert changed.find_changed("main", root=tmp_path) == [
+        tmp_path / "a.qmd",
+        tmp_path / "b.qmd",
+        tmp_path / "d.qmd",
+    ]
+    assert changed.find_changed("HEAD", root=tmp_path) == [
+        tmp_path / "b.qmd",
+        tmp_path / "d.qmd",
+    ]
+
+    with pytest.raises(ValueError, match="Invalid git ref"):
+        changed.find_changed("missing", root=tmp_path)
+
+
+def test_find_changed_no_repo(tmp_path: pathlib.Path):
+    with pytest.raises(ValueError, match="not within a git repository"):
+        changed.validate_since("main", root=tmp_path)
+
+    with pytest.raises(ValueError, match="not within a git repository"):
+        changed.find_changed("main", root=tmp_path / "missing")
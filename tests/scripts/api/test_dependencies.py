@@ -0,0 +1,131 @@
+import pathlib
+
+import pytest
+
+from acederbergio.api.dependencies import DependencyIndex
+
+
+def write(path: pathlib.Path, content: str = "") -> pathlib.Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    return path
+
+
+@pytest.fixture
+def project(tmp_path: pathlib.Path) -> pathlib.Path:
+    root = tmp_path / "blog"
+    scripts = tmp_path / "acederbergio"
+
+    write(
+        root / "_quarto.yaml",
+        "theme:\n  light:\n    - themes/main.scss\n    - cosmo\n"
+        "filters:\n  - iconify\n  - ./filters/live.py\n",
+    )
+    write(root / "themes/main.scss")
+    write(root / "filters/live.py", "from acederbergio.filters import live\n")
+    write(root / "filters/resume.py", "from acederbergio.filters import resume\n")
+    write(
+        scripts / "filters/live.py", "from acederbergio.filters import (\n  util,\n)\n"
+    )
+    write(scripts / "filters/resume.py", "from acederbergio.filters import util\n")
+    write(scripts / "filters/util.py")
+
+    write(root / "index.qmd", "---\ntitle: Home\n---\n\nHello.\n")
+    write(root / "resume/_metadata.yml", "format:\n  html:\n    css: ./resume.css\n")
+    write(root / "resume/resume.css")
+    write(
+        root / "resume/index.qmd",
+        "---\ntitle: Resume\nfilters:\n  - ../filters/resume.py\n"
+        "format:\n  html:\n    include-in-header:\n      - file: ../includes/x.html\n"
+        "---\n\n{{< include ./partials/_profile.qmd >}}\n",
+    )
+    write(root / "resume/partials/_profile.qmd", '{{< include "_nested.qmd" >}}\n')
+    write(root / "resume/partials/_nested.qmd")
+    write(root / "includes/x.html")
+    write(root / "themed.qmd", "---\nformat:\n  html:\n    theme: cyborg\n---\n")
+
+    # NOTE: Ignored directories should not be indexed.
+    write(root / "build/index.qmd")
+
+    return tmp_path
+
+
+@pytest.fixture
+def index(project: pathlib.Path) -> DependencyIndex:
+    root = project / "blog"
+    return DependencyIndex.fromDirectory(
+        root,
+        scripts=project / "acederbergio",
+        is_ignored=lambda path: path.is_relative_to(root / "build"),
+    )
+
+
+class TestDependencyIndex:
+
+    def test_documents(self, index: DependencyIndex):
+        assert set(index.dependencies) == {
+            index.root / "index.qmd",
+            index.root / "resume/index.qmd",
+            index.root / "themed.qmd",
+        }
+
+    def test_dependents(self, index: DependencyIndex, project: pathlib.Path):
+        root, scripts = index.root, index.scripts
+        everything = {
+            root / "index.qmd",
+            root / "resume/index.qmd",
+            root / "themed.qmd",
+        }
+        resume = {root / "resume/index.qmd"}
+
+        # NOTE: Project wide dependencies.
+        assert index.get_dependents(root / "_quarto.yaml") == everything
+        assert index.get_dependents(root / "themes/main.scss") == everything
+        assert index.get_dependents(root / "filters/live.py") == everything
+        assert index.get_dependents(scripts / "filters/live.py") == everything
+        assert index.get_dependents(scripts / "filters/util.py") == everything
+        assert not index.has_dependents(root / "cosmo")
+
+        # NOTE: Partials, filters, and includes of a single document.
+        assert index.get_dependents(root / "resume/_metadata.yml") == resume
+        assert index.get_dependents(root / "resume/resume.css") == resume
+        assert index.get_dependents(root / "resume/partials/_profile.qmd") == resume
+        assert index.get_dependents(root / "resume/partials/_nested.qmd") == resume
+        assert index.get_dependents(root / "includes/x.html") == resume
+        assert index.get_dependents(scripts / "filters/resume.py") == resume
+
+    def test_update(self, index: DependencyIndex):
+        root = index.root
+        partial = root / "resume/partials/_profile.qmd"
+        extra = write(root / "resume/partials/_extra.qmd")
+
+        # NOTE: Partial now includes another partial.
+        assert not index.has_dependents(extra)
+        write(partial, "{{< include _extra.qmd >}}\n")
+        assert index.update(partial) == {root / "resume/index.qmd"}
+        assert index.get_dependents(extra) == {root / "resume/index.qmd"}
+        assert not index.has_dependents(root / "resume/partials/_nested.qmd")
+
+        # NOTE: New documents are indexed, removed documents are dropped.
+        document = write(root / "posts/new.qmd", "{{< include /includes/x.html >}}")
+        assert index.update(document) == {document}
+        assert document in index.get_dependents(root / "includes/x.html")
+
+        document.unlink()
+        index.update(document)
+        assert document not in index.dependencies
+        assert document not in index.get_dependents(root / "includes/x.html")
+
+        # NOTE: Configuration changes reindex documents in their directory.
+        write(root / "resume/_metadata.yml", "css: ./other.css\n")
+        assert index.update(root / "resume/_metadata.yml") == {
+            root / "resume/index.qmd"
+        }
+        assert not index.has_dependents(root / "resume/resume.css")
+        assert index.has_dependents(root / "resume/other.css")
+
+    def test_find_theme(self, index: DependencyIndex):
+        root = index.root
+        assert index.find_theme(root / "index.qmd") == root / "_quarto.yaml"
+        assert index.find_theme(root / "resume/index.qmd") == root / "_quarto.yaml"
+        assert index.find_theme(root / "themed.qmd") == root / "themed.qmd"
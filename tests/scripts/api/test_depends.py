@@ -0,0 +1,10 @@
+from types import SimpleNamespace
+
+from acederbergio.api import depends
+
+
+def test_broadcasters_without_lifespan():
+    # NOTE: Websockets close themselves instead, so these should not raise.
+    connection = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace()))
+    assert depends.quarto_renders(connection) is None  # type: ignore
+    assert depends.logs(connection) is None  # type: ignore
@@ -0,0 +1,70 @@
+import os
+import pathlib
+import sys
+
+import pytest
+
+from acederbergio.api import kernels
+
+DOCUMENT = """---
+title: Example
+---
+
+```{python}
+import numpy as np, mymodule
+from mypackage import sub as alias  # comment
+```
+
+```{.python}
+import not_executed
+```
+"""
+
+
+def test_find_imports():
+    cells = kernels.find_cells(DOCUMENT)
+    assert len(cells) == 1
+    assert kernels.find_imports(cells) == {
+        "numpy",
+        "mymodule",
+        "mypackage",
+        "mypackage.sub",
+    }
+
+
+def test_find_module(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch):
+    (tmp_path / "mypackage").mkdir()
+    (tmp_path / "mypackage/__init__.py").write_text("")
+    (tmp_path / "mypackage/sub.py").write_text("")
+    monkeypatch.setattr(sys, "path", [str(tmp_path), *sys.path])
+
+    assert kernels.find_module("mypackage.sub") == tmp_path / "mypackage/sub.py"
+    assert kernels.find_module("mypackage.missing") is None
+    assert "mypackage" not in sys.modules
+
+
+def test_flags(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch):
+    module = tmp_path / "mymodule.py"
+    module.write_text("")
+    monkeypatch.setattr(sys, "path", [str(tmp_path), *sys.path])
+
+    document, plain = tmp_path / "index.qmd", tmp_path / "plain.qmd"
+    document.write_text(DOCUMENT)
+    plain.write_text("No code here.")
+
+    warm = kernels.Kernels(idle=60)
+    assert warm.flags(plain) == []
+    assert warm.flags(document) == ["--execute-daemon", "60"]
+    assert warm.flags(document) == ["--execute-daemon", "60"]
+
+    # NOTE: An imported module changed, so the kernel must restart once.
+    os.utime(module, ns=(0, 0))
+    assert warm.flags(document)[-1] == "--execute-daemon-restart"
+    assert warm.flags(document) == ["--execute-daemon", "60"]
+
+    # NOTE: Idle kernels are forgotten, their next render starts fresh.
+    now = kernels.time.monotonic()
+    monkeypatch.setattr(kernels.time, "monotonic", lambda: now + 61)
+    assert warm.evict() == [document]
+    os.utime(module, ns=(1, 1))
+    assert warm.flags(document) == ["--execute-daemon", "60"]
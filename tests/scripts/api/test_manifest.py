@@ -0,0 +1,103 @@
+import asyncio
+import pathlib
+
+import pytest
+
+from acederbergio import env
+from acederbergio.api import quarto, schemas
+from acederbergio.api.manifest import Manifest
+
+
+@pytest.fixture
+def project(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch):
+    blog, build = tmp_path / "blog", tmp_path / "blog/build"
+    build.mkdir(parents=True)
+    monkeypatch.setattr(env, "BLOG", blog)
+    monkeypatch.setattr(env, "BUILD", build)
+
+    (blog / "index.qmd").write_text("Hello.")
+    (blog / "_quarto.yaml").write_text("project: {}")
+
+    return blog
+
+
+class TestManifest:
+
+    def test_digest(self, project: pathlib.Path):
+        manifest = Manifest()
+        target, config = project / "index.qmd", project / "_quarto.yaml"
+
+        digest = manifest.digest(target, [config])
+        assert digest == Manifest().digest(target, [config])
+        assert digest != Manifest().digest(target, [config], "--no-cache")
+        assert digest != Manifest().digest(target, [])
+
+        config.write_text("project: {type: website}")
+        assert digest != Manifest().digest(target, [config])
+
+    def test_fresh(self, project: pathlib.Path):
+        manifest = Manifest()
+        target = project / "index.qmd"
+        digest = manifest.digest(target)
+
+        # NOTE: Output must exist.
+        assert not manifest.is_fresh(target, digest)
+        manifest.update(target, digest)
+        assert not manifest.is_fresh(target, digest)
+
+        (env.BUILD / "index.html").write_text("<p>Hello.</p>")
+        item = manifest.update(target, digest, duration=2)
+        assert item.output == "index.html"
+        assert manifest.durations() == {manifest.key(target): 2}
+        assert manifest.is_fresh(target, digest)
+        assert not manifest.is_fresh(target, "other")
+
+        manifest.save(path := env.BUILD / "manifest.json")
+        assert Manifest.load(path).is_fresh(target, digest)
+
+    def test_handler(self, project: pathlib.Path):
+        context = quarto.Context()
+        handler = quarto.Handler(
+            context,
+            quarto.Filter(context),
+            mongo_id=None,
+            _from="client",
+            manifest=Manifest(),
+        )
+        target = project / "index.qmd"
+        calls = list()
+
+        async def task():
+            calls.append(target)
+            (env.BUILD / "index.html").write_text("<p>Hello.</p>")
+            data = schemas.QuartoRender(
+                target=str(target),
+                origin=str(target),
+                status_code=0,
+                kind="direct",
+                item_from="client",
+                command=[],
+                stderr=[],
+                stdout=[],
+            )
+            return schemas.QuartoHandlerRender(data=data)
+
+        def doit():
+            return asyncio.run(handler.do_manifest(target, task, kind="direct"))
+
+        assert doit().kind == "render"
+        assert (cached := doit()).kind == "cached"
+        assert cached.data.output == "index.html"
+        assert len(calls) == 1
+
+        target.write_text("Goodbye.")
+        assert doit().kind == "render"
+        assert len(calls) == 2
+
+        # NOTE: Forced renders skip nothing, but are still recorded.
+        assert doit().kind == "cached"
+        handler.force = True
+        assert doit().kind == "render"
+        assert len(calls) == 3
+        assert handler.manifest is not None
+        assert handler.manifest.key(target) in handler.manifest.items
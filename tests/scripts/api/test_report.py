@@ -0,0 +1,80 @@
+import pathlib
+
+import yaml
+
+from acederbergio.api import report, schemas
+
+
+def create_render(
+    target: str, status_code: int, status: schemas.QuartoRenderStatus = None
+) -> schemas.QuartoHandlerRender:
+    data = schemas.QuartoRender(
+        target=target,
+        origin=target,
+        status_code=status_code,
+        kind="direct",
+        item_from="client",
+        command=["quarto", "render", target],
+        stdout=["a lot of output"],
+        stderr=["ERROR: oops"] if status_code else [],
+        duration=1.5,
+        status=status,
+    )
+    return schemas.QuartoHandlerResult(data=data)
+
+
+def test_report(tmp_path: pathlib.Path):
+    path = tmp_path / "quarto_renders.jsonl"
+    cached = schemas.QuartoRenderCached(
+        item_from="client",
+        kind="direct",
+        origin="c",
+        target="c",
+        digest="",
+        output=None,
+        artifact="hit",
+    )
+
+    with report.Writer(path) as writer:
+        writer.write(create_render("a", 0))
+        writer.write(schemas.QuartoHandlerCached(data=cached))
+        writer.write(create_render("b", 1))
+        writer.write(create_render("d", 1, "timeout"))
+
+        # NOTE: Lines are readable while the report is still being written.
+        assert len(list(report.read(path))) == 4
+
+    # NOTE: Simulate a crash in the middle of writing a line.
+    with open(path, "a") as file:
+        file.write('{"kind": "render", "data": {"tar')
+
+    lines = list(report.read(path))
+    assert [line["kind"] for line in lines] == ["render", "cached", "render", "render"]
+    assert [line["data"].get("status") for line in lines] == [
+        "success",
+        None,
+        "failure",
+        "timeout",
+    ]
+    assert all("stdout" not in line["data"] for line in lines)
+
+    summary = report.summarize(path)
+    assert summary.rendered == 3 and summary.failed == 2 and summary.cached == 1
+    assert summary.timed_out == 1
+    assert summary.duration == 4.5
+    assert summary.artifacts_hit == 1 and summary.artifacts_miss == 0
+    assert summary.targets_failed == ["b", "d"]
+
+    failed = report.get_failed(path)
+    assert [item.target for item in failed.items] == ["b", "d"]
+    assert failed.items[1].status == "timeout"
+    assert failed.items[0].stderr == ["ERROR: oops"]
+    assert failed.items[0].item_from == "client"
+
+    dest = tmp_path / "quarto_renders.yaml"
+    assert report.write_summary(path, dest) == summary
+    with open(dest) as file:
+        loaded = yaml.safe_load(file)
+
+    assert loaded["summary"]["targets_failed"] == ["b", "d"]
+    assert [item["target"] for item in loaded["failed"]["items"]] == ["b", "d"]
@@ -0,0 +1,68 @@
+import asyncio
+
+from starlette.websockets import WebSocketState
+
+from acederbergio.api import quarto, routes, schemas
+
+
+class FakeWebSocket:
+    """Websocket that disconnects once :ivar:`disconnect` is set."""
+
+    def __init__(self):
+        self.client_state = WebSocketState.CONNECTED
+        self.disconnect = asyncio.Event()
+        self.sent = list()
+        self.closed: int | None = None
+
+    async def accept(self):
+        pass
+
+    async def receive(self):
+        await self.disconnect.wait()
+        self.client_state = WebSocketState.DISCONNECTED
+        return {"type": "websocket.disconnect", "code": 1000}
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+    async def close(self, code: int = 1000, reason: str | None = None):
+        self.closed = code
+        self.client_state = WebSocketState.DISCONNECTED
+
+
+def test_websocket_progress_disconnect():
+    progress = quarto.Progress()
+
+    async def doit():
+        websocket = FakeWebSocket()
+        task = asyncio.create_task(
+            routes.QuartoRoutes.websocket_progress(websocket, progress)  # type: ignore
+        )
+        await asyncio.sleep(0.01)
+        assert len(progress.subscribers) == 1
+
+        # NOTE: Should exit without any events being published.
+        websocket.disconnect.set()
+        await asyncio.wait_for(task, 1)
+        assert not progress.subscribers
+
+    asyncio.run(doit())
+
+
+def test_ws_without_broadcaster():
+    # NOTE: Should not poll mongodb for each socket, so there is no database.
+    websocket = FakeWebSocket()
+
+    async def handle_recieve(websocket, kwargs):
+        pass
+
+    asyncio.run(
+        routes.LogRoutes.ws(
+            schemas.Log,
+            websocket,  # type: ignore
+            None,  # type: ignore
+            None,
+            handle_recieve=handle_recieve,
+        )
+    )
+    assert websocket.closed == 1013 and not websocket.sent
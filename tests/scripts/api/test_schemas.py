@@ -1,7 +1,17 @@
+import asyncio
+
+import bson
 import pydantic
 import pytest
 
-from acederbergio.api.schemas import QuartoRenderRequest, QuartoRenderRequestItem
+from acederbergio import env
+from acederbergio.api.schemas import (
+    Log,
+    QuartoHistoryFilters,
+    QuartoHistoryMinimal,
+    QuartoRenderRequest,
+    QuartoRenderRequestItem,
+)
 
 
 class TestQuartoRenderRequest:
@@ -38,3 +48,201 @@ class TestQuartoRenderRequest:
             QuartoRenderRequest.model_validate({"items": ["foo"]})
 
         assert "`foo` is not a file or does not exist" in str(err.value)
+
+    def test_glob(self):
+        req = QuartoRenderRequest.model_validate(
+            {"items": [{"path": str(env.BLOG / "posts/*.qmd"), "kind": "glob"}]}
+        )
+        assert req.items[0].path == "blog/posts/*.qmd"
+
+        with pytest.raises(pydantic.ValidationError) as err:
+            QuartoRenderRequest.model_validate(
+                {"items": [{"path": "../**/*.qmd", "kind": "glob"}]}
+            )
+
+        assert "must be within the project" in str(err.value)
+
+    def test_since(self):
+        with pytest.raises(pydantic.ValidationError) as err:
+            QuartoRenderRequest.model_validate(
+                {"items": [{"path": "blog", "kind": "directory", "since": "nope/"}]}
+            )
+
+        assert "Invalid git ref" in str(err.value)
+
+
+class TestQuartoHistory:
+
+    def test_create_query(self):
+        filters = QuartoHistoryFilters(
+            targets=["blog/index.qmd"], errors=True, kind=["direct"]
+        )
+        assert filters.create_query() == {
+            "status_code": {"$ne": 0},
+            "$or": [{"target": {"$in": ["blog/index.qmd"]}}, {"kind": "style"}],
+            "kind": {"$in": ["direct"]},
+        }
+        assert QuartoHistoryFilters(errors=False).create_query() == {"status_code": 0}
+        assert QuartoHistoryFilters().create_query() == {}
+
+    def test_matches(self):
+        run = QuartoHistoryMinimal.model_validate(
+            {
+                "timestamp": 1,
+                "items": [
+                    {
+                        "target": "blog/index.qmd",
+                        "origin": "blog/index.qmd",
+                        "status_code": 1,
+                        "kind": "direct",
+                        "from": "lifespan",
+                    }
+                ],
+            }
+        )
+        item = run.items[0]
+        assert QuartoHistoryMinimal.matches(item)
+        assert QuartoHistoryFilters(errors=True, kind=["direct"]).matches(item)
+        assert not QuartoHistoryFilters(errors=False).matches(item)
+        assert not QuartoHistoryMinimal.matches(
+            item, filters=QuartoHistoryFilters(targets=["blog/about.qmd"])
+        )
+
+    def test_matches_style(self):
+        # NOTE: Pages only subscribe to their own targets, but should still
+        #       hear about stylesheets.
+        item = QuartoHistoryMinimal.model_validate(
+            {
+                "timestamp": 1,
+                "items": [
+                    {
+                        "target": "blog/themes/live.scss",
+                        "origin": "blog/themes/live.scss",
+                        "status_code": 0,
+                        "kind": "style",
+                        "from": "lifespan",
+                    }
+                ],
+            }
+        ).items[0]
+        filters = QuartoHistoryFilters(targets=["blog/index.qmd"])
+        assert filters.matches(item)
+        assert not QuartoHistoryFilters(
+            targets=["blog/index.qmd"], kind=["direct"]
+        ).matches(item)
+
+    def test_from_items(self):
+        # NOTE: Items are stored with references to their run.
+        run = bson.ObjectId()
+        item = {
+            "target": "blog/index.qmd",
+            "origin": "blog/index.qmd",
+            "status_code": 0,
+            "kind": "direct",
+            "from": "lifespan",
+            "run": run,
+            "index": 3,
+        }
+        history = QuartoHistoryMinimal.model_validate(
+            {"_id": run, "timestamp": 1, "count": 1, "items": [item]}
+        )
+        assert history.mongo_id == str(run)
+        assert history.items[0].status == "success"
+        assert "run" not in history.items[0].model_dump(mode="json")
+        assert history.items[0].position == (str(run), 3)
+
+
+class TestLog:
+
+    @staticmethod
+    def create_item(run: bson.ObjectId, index: int):
+        return {
+            "run": run,
+            "index": index,
+            "created": 1,
+            "filename": "main.py",
+            "funcName": "main",
+            "levelname": "INFO",
+            "levelno": 20,
+            "lineno": 1,
+            "module": "main",
+            "msg": f"message {index}",
+            "name": "main",
+            "pathname": "main.py",
+            "threadName": "MainThread",
+        }
+
+    @staticmethod
+    def patch(monkeypatch: pytest.MonkeyPatch, runs: list, items: dict):
+        """Serve :param:`runs` and :param:`items` instead of mongodb."""
+
+        def match(item, query) -> bool:
+            if "$or" in query:
+                return any(match(item, q) for q in query["$or"])
+
+            index = query["index"]
+            if "$in" in index:
+                return item["index"] in index["$in"]
+
+            return item["index"] >= index["$gte"]
+
+        async def find_run(db):
+            return runs[-1]
+
+        async def find_items(db, query):
+            found = [item for item in items[query["run"]] if match(item, query)]
+            return sorted(found, key=lambda item: item["index"])
+
+        monkeypatch.setattr(Log, "find_run", find_run)
+        monkeypatch.setattr(Log, "find_items", find_items)
+
+    @staticmethod
+    async def follow(steps):
+        """Follow while taking :param:`steps`, with a poll between each."""
+
+        followed = list()
+        task = asyncio.create_task(
+            Log.follow(None, followed.append, interval=0.01)  # type: ignore
+        )
+        await asyncio.sleep(0.05)
+        for step in steps:
+            step()
+            await asyncio.sleep(0.05)
+
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return [item.position for item in followed], followed
+
+    def test_follow(self, monkeypatch: pytest.MonkeyPatch):
+        first, second = bson.ObjectId(), bson.ObjectId()
+        runs = [{"_id": first, "count": 2}]
+        items = {first: [self.create_item(first, k) for k in range(2)], second: []}
+        self.patch(monkeypatch, runs, items)
+
+        # NOTE: Items pushed before following started are not followed.
+        positions, followed = asyncio.run(
+            self.follow(
+                [
+                    lambda: items[first].append(self.create_item(first, 2)),
+                    lambda: runs.append({"_id": second, "count": 1}),
+                    lambda: items[second].append(self.create_item(second, 0)),
+                ]
+            )
+        )
+        assert positions == [(str(first), 2), (str(second), 0)]
+        assert "run" not in followed[0].model_dump()
+
+    def test_follow_interleaved(self, monkeypatch: pytest.MonkeyPatch):
+        # NOTE: Two pushers reserved positions 1 and 2, but neither inserted
+        #       when following started. Then another two pushers reserve 3
+        #       and 4, and insert them in reverse order.
+        run = bson.ObjectId()
+        runs = [{"_id": run, "count": 3}]
+        items = {run: [self.create_item(run, 0)]}
+        self.patch(monkeypatch, runs, items)
+
+        def push(index: int):
+            return lambda: items[run].append(self.create_item(run, index))
+
+        positions, _ = asyncio.run(self.follow([push(2), push(4), push(3), push(1)]))
+        assert positions == [(str(run), k) for k in (2, 4, 3, 1)]
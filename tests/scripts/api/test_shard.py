@@ -0,0 +1,93 @@
+import os
+import pathlib
+
+import pytest
+
+from acederbergio.api import manifest, report, schemas, shard
+
+
+def create_job(target: str) -> schemas.QuartoRenderJob:
+    return schemas.QuartoRenderJob(
+        item_from="client", kind="direct", origin=target, target=target
+    )
+
+
+def test_parse():
+    assert shard.Shard.parse("2/3") == shard.Shard(2, 3)
+    assert shard.Shard.parse(" 1 / 1 ") == shard.Shard(1, 1)
+
+    for bad in ("0/3", "4/3", "1", "a/b"):
+        with pytest.raises(ValueError):
+            shard.Shard.parse(bad)
+
+
+def test_partition():
+    jobs = [create_job(target) for target in "abcdefg"]
+    estimates = dict(a=60, b=30, c=30, d=10, e=10, f=5, g=5)
+
+    shares = shard.partition(jobs, estimates, 2)
+    assert shares == shard.partition(reversed(jobs), estimates, 2)
+    assert [[job.target for job in share] for share in shares] == [
+        ["a", "d", "f"],
+        ["b", "c", "e", "g"],
+    ]
+
+    # NOTE: Every job belongs to exactly one shard, in plan order.
+    selected = [
+        job.target
+        for index in (1, 2, 3)
+        for job in shard.Shard(index, 3).select(jobs, estimates)
+    ]
+    assert sorted(selected) == list("abcdefg")
+    assert [job.target for job in shard.Shard(3, 3).select(jobs, estimates)] == [
+        "c",
+        "e",
+        "g",
+    ]
+
+
+def test_merge(tmp_path: pathlib.Path):
+    first, second, dest = tmp_path / "1", tmp_path / "2", tmp_path / "build"
+    for index, (directory, target) in enumerate(((first, "a"), (second, "b"))):
+        (directory / "site_libs").mkdir(parents=True)
+        (directory / "site_libs/quarto.js").write_text("shared")
+        (directory / f"{target}.html").write_text(target)
+
+        # NOTE: ``c.qmd`` is up to date in the first shard, and rendered by
+        #       the second.
+        path = directory / shard.Shard(index + 1, 2).report
+        with report.Writer(path) as writer:
+            for item in (target, "c"):
+                kind = "render" if item == target or index else "cached"
+                data = dict(target=f"{item}.qmd", status_code=0)
+                writer.write_line(dict(kind=kind, data=data))
+
+        build_manifest = manifest.Manifest()
+        build_manifest.items[f"{target}.qmd"] = manifest.ManifestItem(
+            digest=target, output=f"{target}.html"
+        )
+        build_manifest.save(directory / manifest.PATH.name)
+
+    # NOTE: The newest copy of a file wins.
+    (first / "a.html").write_text("stale")
+    os.utime(first / "a.html", ns=(0, 0))
+    dest.mkdir()
+    (dest / "a.html").write_text("a")
+
+    shard.merge([first, second], dest)
+    assert (dest / "a.html").read_text() == "a"
+    assert (dest / "b.html").read_text() == "b"
+    assert (dest / "site_libs/quarto.js").read_text() == "shared"
+    assert not list(dest.glob(shard.REPORT_GLOB))
+
+    lines = list(report.read(dest / report.PATH.name))
+    assert [(line["kind"], line["data"]["target"]) for line in lines] == [
+        ("render", "a.qmd"),
+        ("render", "b.qmd"),
+        ("render", "c.qmd"),
+    ]
+
+    assert (dest / report.PATH_SUMMARY.name).exists()
+
+    merged = manifest.Manifest.load(dest / manifest.PATH.name)
+    assert set(merged.items) == {"a.qmd", "b.qmd"}
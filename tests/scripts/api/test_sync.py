@@ -0,0 +1,92 @@
+import os
+import pathlib
+
+from acederbergio.api import sync
+
+
+def test_sync_file(tmp_path: pathlib.Path):
+    source, dest = tmp_path / "src/a.js", tmp_path / "build/a.js"
+    source.parent.mkdir()
+    source.write_text("let a = 1;")
+
+    assert sync.sync_file(source, dest).action == "copied"
+    assert dest.read_text() == "let a = 1;"
+    assert sync.sync_file(source, dest).action == "unchanged"
+
+    # NOTE: Same contents but different modification time.
+    os.utime(dest, ns=(0, 0))
+    assert sync.sync_file(source, dest).action == "unchanged"
+    assert os.stat(dest).st_mtime_ns == os.stat(source).st_mtime_ns
+
+    # NOTE: Same size and modification time but different contents.
+    stat = os.stat(source)
+    dest.write_text("let b = 1;")
+    os.utime(dest, ns=(stat.st_atime_ns, stat.st_mtime_ns - 1))
+    assert sync.sync_file(source, dest).action == "copied"
+    assert dest.read_text() == "let a = 1;"
+
+    linked = tmp_path / "build/linked.js"
+    assert sync.sync_file(source, linked, link=True).action == "linked"
+    assert os.path.samefile(source, linked)
+
+
+def test_sync_directory(tmp_path: pathlib.Path):
+    source, dest = tmp_path / "js", tmp_path / "build/js"
+    (source / "nested").mkdir(parents=True)
+    (source / "a.js").write_text("a")
+    (source / "nested/b.js").write_text("b")
+
+    actions = {item.dest: item.action for item in sync.sync_directory(source, dest)}
+    assert actions == {dest / "a.js": "copied", dest / "nested/b.js": "copied"}
+
+    (dest / "orphans").mkdir()
+    (dest / "orphans/c.js").write_text("c")
+    (source / "nested/b.js").write_text("bb")
+
+    actions = {item.dest: item.action for item in sync.sync_directory(source, dest)}
+    assert actions == {
+        dest / "a.js": "unchanged",
+        dest / "nested/b.js": "copied",
+        dest / "orphans/c.js": "removed",
+    }
+    assert not (dest / "orphans").exists()
+    assert (dest / "nested/b.js").read_text() == "bb"
+
+
+def test_sync_stylesheets(tmp_path: pathlib.Path):
+    source, dest = tmp_path / "scratch/site_libs", tmp_path / "build/site_libs"
+    (source / "bootstrap").mkdir(parents=True)
+    (dest / "bootstrap").mkdir(parents=True)
+    (source / "bootstrap/bootstrap-0123456789abcdef.min.css").write_text("new")
+    (source / "bootstrap/bootstrap-icons.css").write_text("icons")
+    (source / "bootstrap/bootstrap.min.js").write_text("js")
+    (dest / "bootstrap/bootstrap-fedcba9876543210.min.css").write_text("old")
+    (dest / "bootstrap/bootstrap-aaaaaaaa11111111.min.css").write_text("other")
+    (dest / "bootstrap/bootstrap-icons.css").write_text("icons")
+
+    html = tmp_path / "build/index.html"
+    html.write_text(
+        '<link href="./site_libs/bootstrap/bootstrap-fedcba9876543210.min.css">\n'
+        "<link href='site_libs/bootstrap/bootstrap-icons.css'>\n"
+    )
+    linked = sync.find_stylesheets(html)
+    assert linked == {
+        pathlib.Path("bootstrap/bootstrap-fedcba9876543210.min.css"),
+        pathlib.Path("bootstrap/bootstrap-icons.css"),
+    }
+    assert sync.find_stylesheets(tmp_path / "missing.html") == set()
+
+    items = sync.sync_stylesheets(source, dest, linked)
+    assert sorted((item.dest.name, item.action) for item in items) == [
+        ("bootstrap-0123456789abcdef.min.css", "copied"),
+        ("bootstrap-fedcba9876543210.min.css", "copied"),
+        ("bootstrap-icons.css", "unchanged"),
+    ]
+
+    # NOTE: Documents linking the previous hash get the new styles.
+    assert (dest / "bootstrap/bootstrap-fedcba9876543210.min.css").read_text() == "new"
+    # NOTE: Other hashes belong to other themes.
+    assert (
+        dest / "bootstrap/bootstrap-aaaaaaaa11111111.min.css"
+    ).read_text() == "other"
+    assert not (dest / "bootstrap/bootstrap.min.js").exists()
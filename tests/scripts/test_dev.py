@@ -1,9 +1,14 @@
+import asyncio
+import functools
+import os
 import pathlib
+import shutil
 
 import pytest
+import watchfiles
 
 from acederbergio import env
-from acederbergio.api import quarto
+from acederbergio.api import artifacts, dependencies, kernels, manifest, quarto, schemas
 
 
 def test_ignore_node():
@@ -25,6 +30,20 @@ def test_ignore_node():
     assert not node.has_prefix("/home")
 
 
+def test_matcher():
+    paths = [pathlib.Path("/home/docker/.venv"), "/home/docker/app/build/"]
+    matcher = quarto.Matcher.fromPaths(*paths)
+
+    # NOTE: Compiled once for the same paths.
+    assert matcher is quarto.Matcher.fromPaths(*reversed(paths))
+
+    assert matcher.has_prefix("/home/docker/.venv")
+    assert matcher.has_prefix("/home/docker/.venv/bin/python")
+    assert matcher.has_prefix("/home/docker/app/build/../build/index.html")
+    assert not matcher.has_prefix("/home/docker/.venvs")
+    assert not matcher.has_prefix("/home/docker")
+
+
 @pytest.fixture(scope="session")
 def filter() -> quarto.Filter:
     context = quarto.Context()
@@ -71,3 +90,890 @@ def filter() -> quarto.Filter:
 )
 def test_context(filter: quarto.Filter, case: pathlib.Path, result: tuple[bool, str]):
     assert filter.is_ignored(case) == result
+
+
+def test_find_roots(tmp_path: pathlib.Path):
+    for item in ("blog/posts/a", "blog/build/posts", "blog/themes", "scripts/filters"):
+        (tmp_path / item).mkdir(parents=True)
+    (tmp_path / "blog/index.qmd").write_text("")
+    (tmp_path / "config").mkdir()
+
+    ignore = quarto.Matcher.fromPaths(tmp_path / "blog/build", tmp_path / ".venv")
+    roots = quarto.find_roots(
+        (
+            tmp_path / "blog",
+            tmp_path / "blog/themes",
+            tmp_path / "blog/build/posts",
+            tmp_path / "scripts/filters",
+            tmp_path / "config/dev.yaml",
+            tmp_path / "missing/dev.yaml",
+        ),
+        ignore,
+    )
+
+    # NOTE: ``build`` is never watched, ``blog`` only for its direct children.
+    assert roots.recursive == (
+        tmp_path / "blog/posts",
+        tmp_path / "blog/themes",
+        tmp_path / "scripts/filters",
+    )
+    assert roots.shallow == (tmp_path / "blog", tmp_path / "config")
+
+
+def test_watch_reload(monkeypatch: pytest.MonkeyPatch, tmp_path: pathlib.Path):
+    config = tmp_path / "dev.yaml"
+    config.write_text(f"filter:\n  ignore:\n    - {tmp_path / 'ignored'}\n")
+    monkeypatch.setattr(quarto, "CONFIG", config)
+    monkeypatch.setitem(
+        quarto.Config.model_config, "yaml_files", {config: {"required": False}}
+    )
+
+    watch = quarto.Watch(quarto.Context(quarto.Config()), include_mongo=False)
+    assert watch.filter.ignore.has_prefix(tmp_path / "ignored")
+    assert watch.is_restart(watchfiles.Change.modified, str(config))
+
+    config.write_text(f"filter:\n  ignore:\n    - {tmp_path / 'other'}\n")
+    assert watch.reload()
+    assert not watch.filter.ignore.has_prefix(tmp_path / "ignored")
+    assert watch.filter.ignore.has_prefix(tmp_path / "other")
+
+    config.write_text("filter: [")
+    assert not watch.reload()
+    assert watch.filter.ignore.has_prefix(tmp_path / "other")
+
+    # NOTE: Directories added to shallow roots are not watched until restart.
+    watch.roots = quarto.Roots((), (tmp_path,))
+    (tmp_path / "posts").mkdir()
+    assert watch.is_restart(watchfiles.Change.added, str(tmp_path / "posts"))
+    (tmp_path / "index.qmd").write_text("")
+    assert not watch.is_restart(watchfiles.Change.added, str(tmp_path / "index.qmd"))
+
+
+def test_watch_added(monkeypatch: pytest.MonkeyPatch, tmp_path: pathlib.Path):
+    watch = quarto.Watch(quarto.Context(), include_mongo=False)
+    monkeypatch.setattr(watch, "find_roots", lambda: quarto.Roots((), (tmp_path,)))
+    monkeypatch.setattr(watch, "filter", lambda _, path: path.endswith(".qmd"))
+
+    async def doit():
+        stop_event = asyncio.Event()
+        seen: set[tuple[watchfiles.Change, str]] = set()
+
+        async def consume():
+            async for changes in watch.changes(stop_event):
+                seen.update(changes)
+                if any(path.endswith("a.qmd") for _, path in changes):
+                    stop_event.set()
+
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.5)
+
+        # NOTE: Written before the directory is watched, see ``walk_added``.
+        (tmp_path / "posts").mkdir()
+        (tmp_path / "posts/a.qmd").write_text("")
+        await asyncio.wait_for(task, 10)
+        return seen
+
+    seen = asyncio.run(doit())
+    assert (watchfiles.Change.added, str(tmp_path / "posts/a.qmd")) in seen
+
+
+def test_filter_classify(tmp_path: pathlib.Path):
+    context = quarto.Context()
+    filter = quarto.Filter(context, static=[tmp_path])
+    path = tmp_path / "a.json"
+
+    assert filter.classify(path) == (False, None, "static")
+    assert filter.classify(path) is filter.classify(path)
+
+    # NOTE: Replaced by a directory. Only additions and deletions invalidate.
+    path.mkdir()
+    assert filter(watchfiles.Change.modified, str(path))
+    assert not filter(watchfiles.Change.added, str(path))
+    assert filter.classify(path) == (True, "directory", None)
+
+    # NOTE: Changing configuration invalidates everything.
+    config = context.config.filter.model_copy(update=dict(ignore={tmp_path}))
+    filter.configure(config)
+    assert filter.classify(tmp_path / "b.json") == (True, "explicit", "static")
+
+
+def test_filter_classify_style(filter: quarto.Filter):
+    assert filter.classify(env.BLOG / "themes/live.scss").dispatch_kind == "style"
+    assert (
+        filter.classify(env.BLOG / "includes/overlay.html").dispatch_kind == "defered"
+    )
+
+    jobs = quarto.Handler(
+        quarto.Context(), filter, mongo_id=None, _from="client"
+    ).plan_path(env.BLOG / "themes/live.scss")
+    assert [(job.kind, job.target) for job in jobs] == [
+        ("style", "blog/themes/live.scss")
+    ]
+
+
+def test_matcher_agrees_with_node(filter: quarto.Filter):
+    paths = quarto.create_bench_paths(filter, 2000)
+    for name in ("ignore", "filters", "assets", "static"):
+        matcher: quarto.Matcher = getattr(filter, name)
+        node = quarto.Node.fromPaths(*matcher.paths)
+        assert [matcher.has_prefix(item) for item in paths] == [
+            node.has_prefix(item) for item in paths
+        ]
+
+
+def create_render(target: str, status_code: int = 0) -> schemas.QuartoHandlerRender:
+    data = schemas.QuartoRender(
+        target=target,
+        origin=target,
+        status_code=status_code,
+        kind="direct",
+        item_from="client",
+        command=[],
+        stderr=[],
+        stdout=[],
+    )
+    return schemas.QuartoHandlerRender(data=data)
+
+
+@pytest.fixture
+def handler(filter: quarto.Filter) -> quarto.Handler:
+    context = quarto.Context(quarto.Config(handler={"jobs": 2}))  # type: ignore
+    return quarto.Handler(context, filter, mongo_id=None, _from="client")
+
+
+class TestHandlerPool:
+
+    def test_concurrency(self, handler: quarto.Handler):
+        state = dict(running=0, running_max=0)
+
+        async def task(target: str, delay: float):
+            state["running"] += 1
+            state["running_max"] = max(state["running_max"], state["running"])
+            await asyncio.sleep(delay)
+            state["running"] -= 1
+            return create_render(target)
+
+        async def doit():
+            tasks = (
+                functools.partial(task, "slow", 0.2),
+                functools.partial(task, "fast", 0.01),
+                functools.partial(task, "last", 0.01),
+            )
+            return [item.data.target async for item in handler.pool(tasks)]
+
+        # NOTE: Results come out in completion order, not submission order.
+        assert asyncio.run(doit()) == ["fast", "last", "slow"]
+        assert state["running_max"] == 2
+
+    def test_exit_on_failure(self, handler: quarto.Handler):
+        started = list()
+
+        async def task(target: str, status_code: int):
+            started.append(target)
+            await asyncio.sleep(0.01 if status_code else 0.5)
+            return create_render(target, status_code)
+
+        async def doit(exit_on_failure: bool):
+            tasks = (
+                functools.partial(task, "ok", 0),
+                functools.partial(task, "bad", 1),
+                functools.partial(task, "never", 0),
+            )
+            return [
+                item.data.target
+                async for item in handler.pool(tasks, exit_on_failure=exit_on_failure)
+            ]
+
+        assert asyncio.run(doit(True)) == ["bad"]
+        assert "never" not in started
+
+        started.clear()
+        assert asyncio.run(doit(False)) == ["bad", "ok", "never"]
+
+
+def test_handler_defered_dependents(filter: quarto.Filter):
+    context = quarto.Context(quarto.Config(handler={"render": False}))  # type: ignore
+    index = dependencies.DependencyIndex.fromDirectory(
+        env.BLOG, is_ignored=filter.ignore.has_prefix
+    )
+    handler = quarto.Handler(
+        context, filter, mongo_id=None, _from="client", index=index
+    )
+
+    async def doit(path: pathlib.Path):
+        return [item.data async for item in handler(path)]
+
+    partial = env.BLOG / "resume/partials/_profile.qmd"
+    jobs = asyncio.run(doit(partial))
+    assert len(jobs) == len(index.get_dependents(partial)) > 0
+    assert all(job.kind == "defered" and job.origin == str(partial) for job in jobs)
+    assert str(env.BLOG / "resume/index.qmd") in {job.target for job in jobs}
+
+    jobs = asyncio.run(doit(env.BLOG / "resume/index.qmd"))
+    assert len(jobs) == 1 and jobs[0].kind == "direct"
+
+
+def test_handler_find_targets(filter: quarto.Filter, monkeypatch: pytest.MonkeyPatch):
+    context = quarto.Context(quarto.Config(handler={"render": False}))  # type: ignore
+    handler = quarto.Handler(context, filter, mongo_id=None, _from="client")
+
+    item = schemas.QuartoRenderRequestItem(kind="glob", path="blog/resume/*.qmd")
+    targets = handler.find_targets(item)
+    assert env.BLOG / "resume/index.qmd" in targets
+    assert all(path.parent == env.BLOG / "resume" for path in targets)
+
+    # NOTE: Changed documents in the item and dependents of changed partials.
+    partial = env.BLOG / "resume/partials/_profile.qmd"
+    changes = [env.BLOG / "about.qmd", partial, env.BLOG / "deleted.qmd"]
+    monkeypatch.setattr(quarto.changed, "find_changed", lambda since: changes)
+
+    item = schemas.QuartoRenderRequestItem(
+        kind="directory", path="blog/resume", since="HEAD"
+    )
+    targets = handler.find_targets(item)
+    assert env.BLOG / "resume/index.qmd" in targets
+    assert env.BLOG / "about.qmd" not in targets
+
+    # NOTE: The partial itself is only rendered through its dependents.
+    jobs = handler.plan(schemas.QuartoRenderRequest(items=[item]))
+    assert {job.target for job in jobs} == {
+        os.path.relpath(path, env.WORKDIR) for path in targets if path != partial
+    }
+
+
+def test_handler_walk(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch):
+    for relpath in (
+        "index.qmd",
+        "notes.txt",
+        "posts/a/index.qmd",
+        "posts/a/b/c/index.qmd",
+        "_freeze/posts/index.qmd",
+    ):
+        (tmp_path / relpath).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / relpath).write_text("")
+
+    context = quarto.Context(
+        quarto.Config(filter={"ignore": {tmp_path / "_freeze"}})  # type: ignore
+    )
+    handler = quarto.Handler(
+        context, quarto.Filter(context), mongo_id=None, _from="client"
+    )
+
+    assert list(handler.walk(tmp_path, depth_max=4)) == [
+        tmp_path / "index.qmd",
+        tmp_path / "posts/a/index.qmd",
+        tmp_path / "posts/a/b/c/index.qmd",
+    ]
+    assert list(handler.walk(tmp_path, depth_max=3)) == [
+        tmp_path / "index.qmd",
+        tmp_path / "posts/a/index.qmd",
+    ]
+    assert list(handler.walk(tmp_path, depth_max=0)) == [tmp_path / "index.qmd"]
+
+    # NOTE: Ignored trees are not listed at all, and the walk is lazy.
+    listed = list()
+    scandir = os.scandir
+
+    def scandir_spy(path):
+        listed.append(pathlib.Path(path))
+        return scandir(path)
+
+    monkeypatch.setattr(quarto.os, "scandir", scandir_spy)
+    walk = handler.walk(tmp_path, depth_max=4)
+    assert next(walk) == tmp_path / "index.qmd"
+    assert listed == [tmp_path]
+
+    list(walk)
+    assert tmp_path / "_freeze" not in listed
+
+
+def test_handler_plan(filter: quarto.Filter):
+    context = quarto.Context(quarto.Config(handler={"render": False}))  # type: ignore
+    handler = quarto.Handler(context, filter, mongo_id=None, _from="client")
+    data = schemas.QuartoRenderRequest(
+        items=[
+            schemas.QuartoRenderRequestItem(path="blog/resume", kind="directory"),
+            schemas.QuartoRenderRequestItem(path="blog/resume/index.qmd"),
+        ]
+    )
+
+    jobs = handler.plan(data)
+    targets = [job.target for job in jobs]
+    assert "blog/resume/index.qmd" in targets
+    assert len(set(targets)) == len(targets)
+    assert all(job.origin == job.target for job in jobs)
+
+    async def doit():
+        return [item async for item in handler.execute(jobs)]
+
+    results = asyncio.run(doit())
+    assert all(item.kind == "job" for item in results)
+    assert {os.path.relpath(item.data.target, env.WORKDIR) for item in results} == set(
+        targets
+    )
+
+
+def test_estimate():
+    def create_job(target: str) -> schemas.QuartoRenderJob:
+        return schemas.QuartoRenderJob(
+            item_from="client", kind="direct", origin=target, target=target
+        )
+
+    cached = schemas.QuartoRenderCached(
+        item_from="client",
+        kind="direct",
+        origin="d",
+        target="d",
+        digest="",
+        output=None,
+    )
+    jobs = [create_job("a"), create_job("b"), create_job("c"), cached]
+    estimate = quarto.Estimate(jobs, {"a": 10, "b": 20, "d": 100}, workers=2)
+
+    # NOTE: ``c`` has no history and is assumed to take the average.
+    assert estimate.total == 3
+    assert estimate.estimates == {"a": 10, "b": 20, "c": 15}
+    assert estimate.remaining == 22.5
+
+    # NOTE: Renders are taking twice as long as they used to.
+    estimate.finish("a", 20)
+    assert estimate.remaining == 35
+    estimate.finish("b", None)
+    assert estimate.remaining == 30
+    assert estimate.format() == "0:30"
+
+    estimate.finish("c", 1)
+    assert estimate.remaining == 0
+
+
+def test_handler_longest_first(filter: quarto.Filter):
+    targets = [env.BLOG / f"{name}.qmd" for name in ("fast", "slow", "new", "medium")]
+    build_manifest = manifest.Manifest()
+    for target, duration in zip(targets, (1, 100, None, 10)):
+        build_manifest.items[build_manifest.key(target)] = manifest.ManifestItem(
+            digest="", output=None, duration=duration
+        )
+
+    def create_handler(batch: int) -> quarto.Handler:
+        context = quarto.Context(quarto.Config(handler={"batch": batch}))  # type: ignore
+        return quarto.Handler(
+            context, filter, mongo_id=None, _from="client", manifest=build_manifest
+        )
+
+    jobs = list()
+    for target in targets:
+        relpath = build_manifest.key(target)
+        jobs.append(
+            schemas.QuartoRenderJob(
+                item_from="client", kind="direct", origin=relpath, target=relpath
+            )
+        )
+
+    # NOTE: ``new`` has no history, so it is estimated as the average.
+    tasks = create_handler(1).tasks_jobs(jobs)
+    fast, slow, new, medium = targets
+    assert [task.args[0] for task in tasks] == [slow, new, medium, fast]  # type: ignore
+
+    tasks = create_handler(2).tasks_jobs(jobs)
+    assert [task.args[0] for task in tasks] == [[slow, new], [medium, fast]]  # type: ignore
+
+    # NOTE: Targets open in the browser go first.
+    handler = create_handler(1)
+    handler.viewers = quarto.Viewers()
+    handler.viewers.update([], [build_manifest.key(fast)])
+    tasks = handler.tasks_jobs(jobs)
+    assert [task.args[0] for task in tasks] == [fast, slow, new, medium]  # type: ignore
+
+    handler.config.batch = 2
+    tasks = handler.tasks_jobs(jobs)
+    assert [task.args[0] for task in tasks] == [[fast, slow], [new, medium]]  # type: ignore
+
+
+def test_viewers():
+    viewers = quarto.Viewers()
+    viewers.update([], ["blog/index.qmd", "blog/about.qmd"])
+    viewers.update([], ["blog/index.qmd"])
+    assert env.BLOG / "index.qmd" in viewers
+    assert "blog/about.qmd" in viewers
+
+    # NOTE: Another tab still views ``index.qmd``.
+    viewers.update(["blog/index.qmd", "blog/about.qmd"], [])
+    assert "blog/index.qmd" in viewers
+    assert "blog/about.qmd" not in viewers
+    assert dict(viewers.counts) == {"blog/index.qmd": 1}
+
+
+class TestScheduler:
+
+    def create_scheduler(self, handler: quarto.Handler, calls: list, delay: float):
+        async def task(target: pathlib.Path):
+            calls.append(target)
+            await asyncio.sleep(delay)
+            return create_render(str(target))
+
+        def targets(v):
+            path = pathlib.Path(v)
+            return {path: functools.partial(task, path)}
+
+        handler.targets = targets  # type: ignore
+        return quarto.Scheduler(handler, debounce=0.05)
+
+    def test_coalesce(self, handler: quarto.Handler):
+        calls = list()
+        scheduler = self.create_scheduler(handler, calls, 0)
+
+        async def doit():
+            runner = asyncio.create_task(scheduler())
+            for _ in range(3):
+                scheduler.schedule("a.qmd")
+                await asyncio.sleep(0.01)
+
+            scheduler.schedule("b.qmd")
+            assert len(scheduler.pending) == 2
+            await asyncio.sleep(0.2)
+
+            runner.cancel()
+            await asyncio.gather(runner, return_exceptions=True)
+
+        asyncio.run(doit())
+        assert sorted(calls) == [pathlib.Path("a.qmd"), pathlib.Path("b.qmd")]
+
+    def test_cancel_superseded(self, handler: quarto.Handler):
+        calls = list()
+        scheduler = self.create_scheduler(handler, calls, 0.2)
+
+        async def doit():
+            runner = asyncio.create_task(scheduler())
+            scheduler.schedule("a.qmd")
+            await asyncio.sleep(0.1)
+
+            first = scheduler.running[pathlib.Path("a.qmd")]
+            scheduler.schedule("a.qmd")
+            await asyncio.sleep(0)
+            assert first.cancelled()
+
+            await asyncio.sleep(0.4)
+            assert not scheduler.running and not scheduler.pending
+
+            runner.cancel()
+            await asyncio.gather(runner, return_exceptions=True)
+
+        asyncio.run(doit())
+        assert calls == [pathlib.Path("a.qmd")] * 2
+
+    def test_viewed_first(self, handler: quarto.Handler):
+        calls = list()
+        scheduler = self.create_scheduler(handler, calls, 0.05)
+        handler.viewers = quarto.Viewers()
+
+        async def doit():
+            runner = asyncio.create_task(scheduler())
+            for name in ("a.qmd", "b.qmd", "c.qmd", "d.qmd"):
+                scheduler.schedule(name)
+
+            # NOTE: A tab opens while the renders wait for ``a.qmd``.
+            await asyncio.sleep(0.07)
+            handler.viewers.update([], ["d.qmd"])  # type: ignore[union-attr]
+            await asyncio.sleep(0.3)
+
+            assert not scheduler.running and not scheduler.waiting
+            runner.cancel()
+            await asyncio.gather(runner, return_exceptions=True)
+
+        asyncio.run(doit())
+        # NOTE: Two renders run at once, ``c.qmd`` and ``d.qmd`` had to wait.
+        assert calls[2:] == [pathlib.Path("d.qmd"), pathlib.Path("c.qmd")]
+
+    def test_release_cancelled(self, handler: quarto.Handler):
+        handler.config.jobs = 1
+        scheduler = quarto.Scheduler(handler, debounce=0.05)
+        a, b, c = (pathlib.Path(name) for name in ("a.qmd", "b.qmd", "c.qmd"))
+        started: list[pathlib.Path] = list()
+
+        async def hold(target: pathlib.Path, event: asyncio.Event):
+            async with scheduler.slot(target):
+                started.append(target)
+                await event.wait()
+
+        async def doit():
+            release = asyncio.Event()
+            holder = asyncio.create_task(hold(a, release))
+            await asyncio.sleep(0)
+            waiter = asyncio.create_task(hold(b, asyncio.Event()))
+            await asyncio.sleep(0)
+            assert len(scheduler.waiting) == 1
+
+            # NOTE: The holder releases and the waiter is cancelled in the
+            #       same tick, so the slot must not be lost.
+            release.set()
+            waiter.cancel()
+            await asyncio.gather(holder, waiter, return_exceptions=True)
+            assert waiter.cancelled()
+            assert not scheduler.waiting and scheduler._slots == 1
+
+            last = asyncio.Event()
+            last.set()
+            await asyncio.wait_for(hold(c, last), 1)
+
+        asyncio.run(doit())
+        assert started == [a, c]
+
+
+def test_handler_progress(
+    filter: quarto.Filter,
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    # NOTE: Stand in for ``quarto`` so that output can be checked.
+    script = tmp_path / "quarto"
+    script.write_text(
+        "#!/bin/sh\n"
+        "echo one\n"
+        "echo two >&2\n"
+        "printf '\\033[31mthree\\033[0m\\n'\n"
+        "exit 3\n"
+    )
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}:{os.environ['PATH']}")
+
+    events: list[schemas.QuartoRenderProgress] = list()
+    renders: list[schemas.QuartoRender] = list()
+    context = quarto.Context()
+    handler = quarto.Handler(
+        context,
+        filter,
+        mongo_id=None,
+        _from="client",
+        progress=events.append,
+        renders=renders.append,
+    )
+
+    target = env.BLOG / "index.qmd"
+    result = asyncio.run(handler.render_qmd(target, origin=target))
+
+    assert result.kind == "render"
+    assert result.data.status_code == 3
+    assert result.data.stdout == ["one", "three"]
+    assert result.data.stderr == ["two"]
+    assert result.data.duration is not None
+
+    assert events[0].event == "start" and events[-1].event == "done"
+    assert events[-1].status_code == 3
+    lines = [(item.stream, item.line) for item in events if item.event == "line"]
+    assert sorted(lines) == [("stderr", "two"), ("stdout", "one"), ("stdout", "three")]
+    assert all(item.target == "blog/index.qmd" for item in events)
+    assert renders == [result.data]
+
+
+def test_handler_long_lines(
+    filter: quarto.Filter,
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    # NOTE: Lines past the stream limit of ``run_quarto`` (1 MiB).
+    script = tmp_path / "quarto"
+    script.write_text(
+        "#!/bin/sh\n"
+        "head -c 3145728 /dev/zero | tr '\\0' a\n"
+        "echo\n"
+        "echo after\n"
+        "head -c 2097152 /dev/zero | tr '\\0' b >&2\n"
+        "exit 2\n"
+    )
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}:{os.environ['PATH']}")
+
+    handler = quarto.Handler(quarto.Context(), filter, mongo_id=None, _from="client")
+    target = env.BLOG / "index.qmd"
+    result = asyncio.run(handler.render_qmd(target, origin=target))
+
+    assert result.data.status_code == 2
+    assert result.data.status == "failure"
+    assert len(result.data.stdout) == 2
+    assert result.data.stdout[0].endswith("a [truncated]")
+    assert result.data.stdout[1] == "after"
+    assert len(result.data.stderr) == 1
+    assert result.data.stderr[0].endswith("b [truncated]")
+    assert not handler.processes.targets()
+
+
+def test_handler_kernels(
+    filter: quarto.Filter,
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    script = tmp_path / "quarto"
+    script.write_text('#!/bin/sh\necho "$@"\n')
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}:{os.environ['PATH']}")
+
+    context = quarto.Context()
+    handler = quarto.Handler(
+        context,
+        filter,
+        mongo_id=None,
+        _from="client",
+        kernels=kernels.Kernels(idle=30),
+    )
+
+    target = env.BLOG / "posts/pandas-typing.qmd"
+    result = asyncio.run(handler.render_qmd(target, origin=target))
+    assert result.data.stdout[0].endswith("--execute-daemon 30")
+    assert target in handler.kernels.kernels  # type: ignore[union-attr]
+
+
+def test_handler_recent(
+    filter: quarto.Filter,
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    script = tmp_path / "quarto"
+    script.write_text('#!/bin/sh\necho "$@"\n')
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}:{os.environ['PATH']}")
+
+    context = quarto.Context()
+    context.config.handler.defered_count = 2
+    handler = quarto.Handler(
+        context, filter, mongo_id=None, _from="client", recent=quarto.Recent(2)
+    )
+
+    origin = env.BLOG / "themes/terminal.scss"
+    assert handler.do_defered(origin) is None
+
+    a, b, c = (env.BLOG / item for item in ("index.qmd", "about.qmd", "build.qmd"))
+    for target in (a, b, a, c):
+        asyncio.run(handler.render_qmd(target, origin=target))
+
+    # NOTE: Oldest targets are forgotten, defered renders do not count.
+    assert handler.recent.latest() == [c, a]
+    tasks = handler.do_defered(origin)
+    assert tasks is not None and list(tasks) == [c, a]
+
+    async def doit():
+        return [item async for item in handler.pool(tasks.values())]
+
+    # NOTE: Renders run concurrently, so they may complete in any order.
+    results = asyncio.run(doit())
+    assert {env.WORKDIR / item.data.target for item in results} == {c, a}
+    assert all(item.data.kind == "defered" for item in results)
+    assert handler.recent.latest(1) == [c]
+
+
+def test_handler_timeout(
+    filter: quarto.Filter,
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    # NOTE: Stand in for a hung kernel that outlives ``quarto``.
+    marker = tmp_path / "marker"
+    script = tmp_path / "quarto"
+    script.write_text(f"#!/bin/sh\n(sleep 1 && touch {marker}) &\necho started\nwait\n")
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}:{os.environ['PATH']}")
+
+    context = quarto.Context()
+    target = env.BLOG / "index.qmd"
+    context.config.handler.timeouts = {target: 0.25}
+    handler = quarto.Handler(context, filter, mongo_id=None, _from="client")
+    assert handler.timeout(target) == 0.25
+    assert handler.timeout(env.BLOG / "about.qmd") == context.config.handler.timeout
+
+    result = asyncio.run(handler.render_qmd(target, origin=target))
+    assert result.data.status == "timeout"
+    assert result.data.status_code
+    assert result.data.stdout == ["started"]
+    assert not handler.processes.targets()
+
+    # NOTE: The whole process group is killed, not just ``quarto``.
+    asyncio.run(asyncio.sleep(1.25))
+    assert not marker.exists()
+
+
+def test_handler_cancel(
+    filter: quarto.Filter,
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    script = tmp_path / "quarto"
+    script.write_text("#!/bin/sh\nsleep 30\n")
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}:{os.environ['PATH']}")
+
+    handler = quarto.Handler(quarto.Context(), filter, mongo_id=None, _from="client")
+    target = env.BLOG / "index.qmd"
+
+    async def doit():
+        task = asyncio.create_task(handler.render_qmd(target, origin=target))
+        while not handler.processes.targets():
+            await asyncio.sleep(0.05)
+
+        assert await handler.processes.cancel(["blog/about.qmd"]) == []
+        assert await handler.processes.cancel(["blog/index.qmd"]) == ["blog/index.qmd"]
+        return await asyncio.wait_for(task, 5)
+
+    result = asyncio.run(doit())
+    assert result.data.status == "cancelled"
+    assert result.data.stderr[-1] == "Cancelled."
+    assert not handler.processes.targets() and not handler.processes.cancelled
+
+
+def test_handler_style(
+    filter: quarto.Filter,
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    # NOTE: Stand in for ``quarto``, writing a compiled theme to the output
+    #       directory like ``quarto render --output-dir`` would.
+    script = tmp_path / "quarto"
+    script.write_text(
+        "#!/bin/sh\n"
+        'echo "$@"\n'
+        'while [ "$1" != "--output-dir" ]; do shift; done\n'
+        'mkdir -p "$2/site_libs/bootstrap"\n'
+        'echo new > "$2/site_libs/bootstrap/bootstrap-0123456789abcdef.min.css"\n'
+    )
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}:{os.environ['PATH']}")
+
+    # NOTE: ``index.html`` links the theme of ``config.style_target``, the
+    #       other hash belongs to another theme.
+    build = tmp_path / "build"
+    (build / "site_libs/bootstrap").mkdir(parents=True)
+    (build / "site_libs/bootstrap/bootstrap-fedcba9876543210.min.css").write_text("old")
+    (build / "site_libs/bootstrap/bootstrap-aaaaaaaa11111111.min.css").write_text(
+        "other"
+    )
+    (build / "index.html").write_text(
+        '<link href="site_libs/bootstrap/bootstrap-fedcba9876543210.min.css" '
+        'rel="stylesheet">'
+    )
+    monkeypatch.setattr(quarto.env, "BUILD", build)
+
+    events: list[schemas.QuartoRenderProgress] = list()
+    handler = quarto.Handler(
+        quarto.Context(), filter, mongo_id=None, _from="client", progress=events.append
+    )
+
+    stylesheet = env.BLOG / "themes/live.scss"
+    tasks = handler.targets(stylesheet)
+    assert list(tasks) == [stylesheet]
+
+    result = asyncio.run(tasks[stylesheet]())
+    assert result.data.kind == "style"
+    assert result.data.status_code == 0
+    assert result.data.target == "blog/themes/live.scss"
+    assert "--no-execute" in result.data.stdout[0].split()
+    assert events[0].event == "start" and events[-1].status_code == 0
+
+    # NOTE: Documents linking the previous theme get the new styles.
+    assert (
+        build / "site_libs/bootstrap/bootstrap-fedcba9876543210.min.css"
+    ).read_text() == "new\n"
+    assert (
+        build / "site_libs/bootstrap/bootstrap-aaaaaaaa11111111.min.css"
+    ).read_text() == "other"
+
+
+def test_handler_style_variants(filter: quarto.Filter):
+    context = quarto.Context(quarto.Config(handler={"render": False}))  # type: ignore
+    index = dependencies.DependencyIndex.fromDirectory(
+        env.BLOG, is_ignored=filter.ignore.has_prefix
+    )
+    handler = quarto.Handler(
+        context, filter, mongo_id=None, _from="client", index=index
+    )
+
+    # NOTE: ``dev`` and ``components/floaty`` set their own themes.
+    stylesheet = env.BLOG / "themes/live.scss"
+    tasks = handler.targets(stylesheet)
+    assert next(iter(tasks)) == stylesheet
+    assert env.BLOG / "dev/index.qmd" in tasks
+    assert env.BLOG / "components/floaty/index.qmd" in tasks
+    assert env.BLOG / "index.qmd" not in tasks
+    assert env.BLOG / "posts/pandas-typing.qmd" not in tasks
+
+
+def test_handler_artifacts(
+    filter: quarto.Filter,
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    build = tmp_path / "build"
+    build.mkdir()
+    monkeypatch.setattr(env, "BUILD", build)
+
+    cache = artifacts.Artifacts(artifacts.LocalStore(tmp_path / "store"), toolchain=[])
+    handler = quarto.Handler(
+        quarto.Context(),
+        filter,
+        mongo_id=None,
+        _from="client",
+        manifest=manifest.Manifest(),
+        artifacts=cache,
+    )
+
+    # NOTE: A previous build rendered ``index.qmd``.
+    target = env.BLOG / "index.qmd"
+    digest, _ = handler.check_manifest(target, kind="direct")
+    (build / "index.html").write_text("<html></html>")
+    data = create_render("blog/index.qmd").data
+    asyncio.run(handler.record(target, digest, data))
+    assert data.artifact == "miss"
+    os.remove(build / "index.html")
+
+    def create_job(target: str) -> schemas.QuartoRenderJob:
+        return schemas.QuartoRenderJob(
+            item_from="lifespan", kind="direct", origin=target, target=target
+        )
+
+    jobs = handler.restore([create_job("blog/index.qmd"), create_job("blog/about.qmd")])
+    assert isinstance(jobs[0], schemas.QuartoRenderCached)
+    assert jobs[0].artifact == "hit" and jobs[0].output == "index.html"
+    assert type(jobs[1]) is schemas.QuartoRenderJob
+    assert (build / "index.html").exists()
+    assert handler.manifest.is_fresh(target, digest)  # type: ignore[union-attr]
+
+
+def test_handler_artifacts_all_hits(
+    filter: quarto.Filter,
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    build = tmp_path / "build"
+    (build / "site_libs").mkdir(parents=True)
+    monkeypatch.setattr(env, "BUILD", build)
+
+    cache = artifacts.Artifacts(artifacts.LocalStore(tmp_path / "store"), toolchain=[])
+    handler = quarto.Handler(
+        quarto.Context(),
+        filter,
+        mongo_id=None,
+        _from="client",
+        manifest=manifest.Manifest(),
+        artifacts=cache,
+    )
+
+    # NOTE: A previous build rendered everything, including shared outputs.
+    target = env.BLOG / "index.qmd"
+    digest, _ = handler.check_manifest(target, kind="direct")
+    (build / "index.html").write_text("<html></html>")
+    (build / "site_libs/quarto.js").write_text("")
+    (build / "search.json").write_text("[]")
+    asyncio.run(handler.record(target, digest, create_render("blog/index.qmd").data))
+    assert cache.upload_shared()
+    shutil.rmtree(build)
+    build.mkdir()
+
+    # NOTE: Nothing renders, so shared outputs must come from the cache too.
+    job = schemas.QuartoRenderJob(
+        item_from="lifespan",
+        kind="direct",
+        origin="blog/index.qmd",
+        target="blog/index.qmd",
+    )
+    jobs = handler.restore([job])
+    assert all(isinstance(item, schemas.QuartoRenderCached) for item in jobs)
+    assert (build / "index.html").exists()
+    assert (build / "site_libs/quarto.js").exists()
+    assert (build / "search.json").read_text() == "[]"